@@ -9,6 +9,7 @@ import os
 import sys
 import argparse
 import subprocess
+import threading
 import time
 
 # 添加项目根目录到Python路径
@@ -119,6 +120,8 @@ CRAWL_CONFIG = {
     'validation_strict_level': 'medium',
     'enable_detailed_logs': True,
     'screenshot_interval': 0,
+    # 搜索结果排序权重（None使用默认值），如 {'comments': 1.0, 'collects': 0.6, 'likes': 0.4}
+    'ranking_weights': None,
 }
 
 def get_crawl_config():
@@ -367,15 +370,97 @@ def check_port(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('localhost', port)) == 0
 
-def main():
+def resolve_config(mode=None):
+    """
+    确定运行配置：命令行/XHS_MODE 指定的模式 > CRAWL_CONFIG 环境变量 > 交互菜单；
+    非交互环境（如容器内）没有指定时使用标准模式
+    """
+    if mode:
+        return get_config_by_mode(mode)
+    
+    if os.environ.get('CRAWL_CONFIG'):
+        config = dict(get_crawl_config())
+        config.setdefault('name', '环境变量配置')
+        return config
+    
+    if not sys.stdin.isatty():
+        return get_config_by_mode(1)
+    
+    # 显示配置菜单
+    mode = show_config_menu()
+    if mode == 5:  # 自定义模式
+        return get_custom_config()
+    return get_config_by_mode(mode)
+
+def parse_args(argv=None):
+    """解析命令行参数（均可用环境变量指定，便于容器部署）"""
+    parser = argparse.ArgumentParser(description='小红书搜索工具')
+    parser.add_argument('--mode', type=int, choices=[1, 2, 3, 4],
+                        default=int(os.environ['XHS_MODE']) if os.environ.get('XHS_MODE') else None,
+                        help='运行模式：1标准 2调试 3快速 4双向（指定后不显示交互菜单，环境变量 XHS_MODE）')
+    parser.add_argument('--server', choices=['production', 'dev'], default=os.environ.get('XHS_SERVER', 'production'),
+                        help='production 使用gunicorn多进程多线程服务，dev 使用Flask开发服务器（环境变量 XHS_SERVER）')
+    parser.add_argument('--role', choices=['all', 'web', 'crawler'], default=os.environ.get('XHS_ROLE', 'all'),
+                        help='all 同时启动Web服务和爬虫工作进程，web/crawler 只启动其中一层（环境变量 XHS_ROLE）')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', 1)),
+                        help='生产模式的工作进程数（环境变量 WEB_WORKERS）')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 16)),
+                        help='生产模式每个工作进程的线程数（环境变量 WEB_THREADS）')
+    parser.add_argument('--prewarm', action='store_true', default=os.environ.get('BROWSER_PREWARM', '').lower() == 'true',
+                        help='启动后在后台预热浏览器（启动浏览器并加载Cookie），首个搜索无需等待（环境变量 BROWSER_PREWARM）')
+    parser.add_argument('--check-deps', action='store_true', default=os.environ.get('XHS_CHECK_DEPS', '').lower() == 'true',
+                        help='启动前执行 pip install -r requirements.txt 并检查Chrome（耗时数秒，默认跳过，环境变量 XHS_CHECK_DEPS）')
+    parser.add_argument('--crawl-workers', type=int, default=int(os.environ.get('CRAWL_WORKERS', 2)),
+                        help='爬虫工作进程数，每个进程持有自己的浏览器（环境变量 CRAWL_WORKERS）')
+    return parser.parse_args(argv)
+
+def start_crawl_workers_process(crawl_workers):
+    """启动爬虫层进程（继承当前进程的配置环境变量，任务通过 JOB_BROKER_URL 指定的任务队列传递）"""
+    print(f"🕷️ 启动 {crawl_workers} 个爬虫工作进程...")
+    return subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--role', 'crawler', '--crawl-workers', str(crawl_workers)
+    ], cwd=PROJECT_ROOT)
+
+def run_web_server(server, workers, threads):
+    """启动Web服务（生产模式缺少gunicorn时退回开发服务器）"""
+    if server == 'production':
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("⚠️  未安装gunicorn，改用Flask开发服务器（pip install gunicorn）")
+            server = 'dev'
+    
+    if server == 'production':
+        os.environ['WEB_WORKERS'] = str(workers)
+        os.environ['WEB_THREADS'] = str(threads)
+        os.environ['PORT'] = str(APP_CONFIG['PORT'])
+        print(f"🏭 生产模式: gunicorn {workers} 个工作进程 × {threads} 个线程")
+        return subprocess.run([
+            sys.executable, "-m", "gunicorn",
+            "-c", os.path.join(PROJECT_ROOT, 'src', 'server', 'gunicorn_conf.py'),
+            "src.server.wsgi:app"
+        ], cwd=PROJECT_ROOT).returncode
+    
+    os.environ["FLASK_APP"] = "src.server.main_server"
+    return subprocess.run([
+        sys.executable, "-m", "flask", "run", 
+        "--host=0.0.0.0", f"--port={APP_CONFIG['PORT']}"
+    ], cwd=PROJECT_ROOT).returncode
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    
+    # 爬虫层：配置由启动它的进程通过环境变量传入
+    if args.role == 'crawler':
+        create_directories()
+        from src.crawler.crawl_service import run_crawl_workers
+        run_crawl_workers(args.crawl_workers)
+        return
+    
+    crawl_process = None
     try:
-        # 显示配置菜单
-        mode = show_config_menu()
-        config = get_config_by_mode(mode)
-        
-        if mode == 5:  # 自定义模式
-            config = get_custom_config()
+        config = resolve_config(args.mode)
         
         print(f"\n✅ 已选择：{config['name']}")
         print("=" * 50)
@@ -385,13 +470,20 @@ def main():
         os.environ['CRAWL_CONFIG'] = json.dumps(config)  # 将配置传递给爬虫
         os.environ['ENABLE_BACKEND_EXTRACTION'] = str(config.get('enable_backend_extraction', True)).lower()  # 设置后台提取开关
         
-        print("🔍 检查Python依赖...")
-        check_dependencies()
-        print("✅ 依赖检查完成")
+        if args.prewarm:
+            os.environ['BROWSER_PREWARM'] = 'true'
         
-        print("🧹 清理临时文件...")
-        cleanup_count = cleanup_temp_files()
-        print(f"✅ 临时文件清理完成 - 清理 {cleanup_count} 个文件")
+        # 生产模式下浏览器只在爬虫工作进程中运行
+        if args.server == 'production':
+            os.environ.setdefault('CRAWL_TIER', 'remote')
+        
+        # 依赖安装和Chrome检查耗时数秒，只在显式要求时执行（生产镜像中依赖已在构建时安装）
+        if args.check_deps:
+            check_dependencies()
+            check_chrome()
+        
+        # 临时文件在后台清理，不推迟服务启动
+        threading.Thread(target=cleanup_temp_files, name='temp-cleanup', daemon=True).start()
         
         print("📁 创建目录...")
         create_directories()
@@ -401,21 +493,31 @@ def main():
         print(f"📍 项目根目录: {PROJECT_ROOT}")
         print(f"🌐 服务地址: http://localhost:{APP_CONFIG['PORT']}")
         print(f"📊 配置模式: {config['name']}")
+        print(f"🕷️ 爬虫层: {os.environ.get('CRAWL_TIER', 'inline')}")
+        print(f"🔥 浏览器预热: {'开启' if args.prewarm else '关闭'}")
         print(f"💾 缓存目录: {os.path.join(PROJECT_ROOT, 'cache')}")
         print("=" * 50)
         
+        if args.role == 'all' and os.environ.get('CRAWL_TIER') == 'remote':
+            crawl_process = start_crawl_workers_process(args.crawl_workers)
+        
         # 启动服务器
-        os.environ["FLASK_APP"] = "src.server.main_server"
-        subprocess.run([
-            sys.executable, "-m", "flask", "run", 
-            "--host=0.0.0.0", f"--port={APP_CONFIG['PORT']}"
-        ])
+        returncode = run_web_server(args.server, args.workers, args.threads)
+        if returncode:
+            sys.exit(returncode)
         
     except KeyboardInterrupt:
         print("\n👋 用户中断，正在退出...")
     except Exception as e:
         print(f"❌ 启动失败: {e}")
         sys.exit(1)
+    finally:
+        if crawl_process is not None and crawl_process.poll() is None:
+            crawl_process.terminate()
+            try:
+                crawl_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                crawl_process.kill()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大模型生成吞吐基准（离线）
+启动本地模拟大模型服务，对比以下方式生成同一批提示词的耗时和实际请求数：
+1. 旧方式 - 每个提示词单独 requests.post（不复用连接、串行）
+2. LLMClient - 连接池 + 并发上限，逐个提交
+3. LLMClient - 连接池 + 并发上限 + 微批处理（批量 /completions 接口）
+4. 缓存命中 - 同一批提示词再次生成
+
+用法:
+    python scripts/bench_llm_generation.py [--prompts 64] [--latency 0.1] [--concurrency 4] [--batch-size 8]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from fake_llm_server import start_fake_server
+from src.server.llm_client import LLMClient, OpenAICompatibleProvider
+
+
+def server_stats(base_url):
+    """读取模拟服务的请求计数"""
+    return requests.get(base_url.rsplit('/v1', 1)[0] + '/stats', timeout=5).json()
+
+
+def run_legacy(base_url, prompts):
+    """每个提示词单独发起一次新连接的请求"""
+    for prompt in prompts:
+        response = requests.post(f'{base_url}/chat/completions', json={
+            'model': 'fake', 'messages': [{'role': 'user', 'content': prompt}]
+        }, timeout=60)
+        json.loads(response.json()['choices'][0]['message']['content'])
+
+
+def measure(name, base_url, func):
+    """执行一次并打印耗时、吞吐和服务端收到的请求数"""
+    before = server_stats(base_url)
+    started = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - started
+    after = server_stats(base_url)
+    print(f"{name:<28} {elapsed:>8.2f}s {count / elapsed:>10.1f}/s {after['requests'] - before['requests']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大模型生成吞吐基准')
+    parser.add_argument('--prompts', type=int, default=64, help='提示词数量')
+    parser.add_argument('--latency', type=float, default=0.1, help='模拟服务每个请求的延迟（秒）')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(latency=args.latency, chunk_delay=0)
+    prompts = [f"请参考笔记 #{i} 写一篇同类笔记" for i in range(args.prompts)]
+    print(f"🤖 模拟服务: {base_url}，提示词数: {len(prompts)}，单请求延迟: {args.latency}s")
+    print(f"{'方式':<28} {'耗时':>9} {'吞吐':>11} {'请求数':>8}")
+
+    def legacy():
+        run_legacy(base_url, prompts)
+        return len(prompts)
+    measure('旧方式（串行、无连接池）', base_url, legacy)
+
+    pooled = LLMClient(OpenAICompatibleProvider(base_url, pool_size=args.concurrency),
+                       model='fake', max_concurrency=args.concurrency, max_batch_size=1)
+    measure(f'连接池 并发{args.concurrency}', base_url, lambda: len(pooled.generate_many(prompts)))
+    pooled.close()
+
+    batched = LLMClient(OpenAICompatibleProvider(base_url, pool_size=args.concurrency, batch_endpoint=True,
+                                                 max_batch_size=args.batch_size),
+                        model='fake', max_concurrency=args.concurrency, max_batch_size=args.batch_size)
+    measure(f'连接池 并发{args.concurrency} 批量{args.batch_size}', base_url,
+            lambda: len(batched.generate_many(prompts)))
+    measure('缓存命中', base_url, lambda: len(batched.generate_many(prompts)))
+    print(f"📊 客户端统计: {batched.stats()}")
+    batched.close()
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记页面解析性能基准
+对比旧流程（html.parser，每个页面构建两次DOM）与新流程（ParsedNotePage，单次解析+预编译选择器）
+的单篇笔记CPU耗时
+
+用法:
+    python scripts/bench_note_parsing.py [目录或文件...] [--repeat N]
+默认扫描 cache/notes 下所有 *_source.html 文件
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from bs4 import BeautifulSoup
+from src.crawler.note_page_parser import ParsedNotePage, HTML_PARSER
+
+# 旧流程使用的选择器（字符串形式，每次调用时重新解析）
+LEGACY_SELECTORS = {
+    'title': ['h1.title', '.note-title', '[data-testid="note-title"]', 'h1', '.content-title', 'title'],
+    'content': ['.note-content', '.content-text', '[data-testid="note-content"]', '.desc', '.note-desc', '.content-desc'],
+    'author': ['.author-name', '.user-name', '[data-testid="author"]', '.note-author', '.username'],
+    'tags': ['.tag', '.hashtag', '.topic', '[data-testid="tag"]', '.note-tag', '.topic-tag'],
+}
+
+
+def legacy_parse(page_source):
+    """复现旧流程：内容解析和图片提取各构建一次 html.parser DOM"""
+    soup = BeautifulSoup(page_source, 'html.parser')
+    result = {}
+    for field in ('title', 'content', 'author'):
+        for selector in LEGACY_SELECTORS[field]:
+            element = soup.select_one(selector)
+            if element and element.get_text(strip=True):
+                result[field] = element.get_text(strip=True)
+                break
+    tags = []
+    for selector in LEGACY_SELECTORS['tags']:
+        for element in soup.select(selector):
+            tag_text = element.get_text(strip=True).replace('#', '').strip()
+            if tag_text and tag_text not in tags:
+                tags.append(tag_text)
+    soup.get_text()
+    result['tags'] = tags
+
+    # 图片下载阶段再次解析同一页面
+    image_soup = BeautifulSoup(page_source, 'html.parser')
+    result['images'] = [
+        img.get('src') or img.get('data-src') or img.get('data-original')
+        for img in image_soup.find_all('img')
+    ]
+    return result
+
+
+def current_parse(page_source):
+    """新流程：单次解析，所有提取器共享"""
+    page = ParsedNotePage(page_source)
+    return {
+        'title': page.extract_title(),
+        'content': page.extract_content(),
+        'tags': page.extract_tags(),
+        'author': page.extract_author(),
+        'images': page.extract_image_urls(),
+    }
+
+
+def collect_files(paths):
+    """收集待测试的HTML文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '**', '*_source.html'), recursive=True))
+        elif os.path.isfile(path):
+            files.append(path)
+    return sorted(files)
+
+
+def measure(parse_func, sources, repeat):
+    """返回每篇笔记的CPU耗时列表（毫秒）"""
+    timings = []
+    for source in sources:
+        best = None
+        for _ in range(repeat):
+            start = time.process_time()
+            parse_func(source)
+            elapsed = (time.process_time() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='笔记页面解析CPU耗时基准')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(PROJECT_ROOT, 'cache', 'notes')])
+    parser.add_argument('--repeat', type=int, default=3, help='每个文件重复次数（取最小值）')
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    if not files:
+        print("❌ 未找到 *_source.html 文件")
+        return 1
+
+    sources = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            sources.append(f.read())
+
+    print(f"📄 测试文件数: {len(sources)}, 新流程解析器: {HTML_PARSER}")
+
+    legacy = measure(legacy_parse, sources, args.repeat)
+    current = measure(current_parse, sources, args.repeat)
+
+    for name, timings in (('旧流程(html.parser x2)', legacy), ('新流程(单次解析)', current)):
+        print(f"{name:<24} 平均: {statistics.mean(timings):8.2f} ms  "
+              f"中位数: {statistics.median(timings):8.2f} ms  总计: {sum(timings):9.1f} ms")
+
+    print(f"⚡ 加速比: {sum(legacy) / max(sum(current), 1e-9):.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
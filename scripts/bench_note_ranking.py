@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果排序性能基准
+对比旧流程（逐条 str().isdigit() 转换排序 + 拼接小写字符串做灵活验证 + 去重后再排序一次）
+与 NoteRanker（NumPy向量化 / 纯Python）在不同批量下的耗时
+
+用法:
+    python scripts/bench_note_ranking.py [--keyword 关键词] [--sizes 10,100,1000,10000] [--repeat N]
+优先使用 cache 目录下的 search_*.json 缓存结果，不足时循环复用；没有缓存时生成模拟数据
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.crawler.note_record import records_from_dicts
+from src.crawler import note_ranking
+from src.crawler.note_ranking import NoteRanker, NUMPY_AVAILABLE
+
+
+def load_cached_notes(cache_dir):
+    """读取搜索缓存中的全部笔记"""
+    notes = []
+    for path in glob.glob(os.path.join(cache_dir, 'search_*.json')):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                notes.extend(json.load(f).get('data') or [])
+        except (OSError, ValueError):
+            continue
+    return notes
+
+
+def synthetic_notes(count, keyword):
+    """生成模拟搜索结果（互动数据混合整数和“1.2万”形式的字符串）"""
+    rng = random.Random(42)
+    words = ['穿搭', '推荐', '测评', '分享', '日常', keyword]
+    notes = []
+    for i in range(count):
+        likes = rng.randint(0, 50000)
+        notes.append({
+            'id': f"{i:024x}",
+            'url': f"https://www.xiaohongshu.com/explore/{i:024x}",
+            'title': ' '.join(rng.sample(words, 3)),
+            'desc': ' '.join(rng.choice(words) for _ in range(8)),
+            'author': f"用户{rng.randint(1, 200)}",
+            'cover': '' if i % 7 == 0 else 'https://example.com/cover.jpg',
+            'likes': f"{likes / 10000:.1f}万" if likes >= 10000 else likes,
+            'comments': rng.randint(0, 500),
+            'collects': str(rng.randint(0, 2000)),
+            'views': rng.randint(0, 100000),
+            'tags': rng.sample(words, 2),
+        })
+    return notes
+
+
+def legacy_rank(notes, keyword, top_k):
+    """复现旧流程：isdigit排序、灵活验证、去重后再次排序"""
+    notes = sorted(notes, key=lambda x: (
+        int(x.get('comments', 0)) if str(x.get('comments', '0')).isdigit() else 0,
+        int(x.get('likes', 0)) if str(x.get('likes', '0')).isdigit() else 0
+    ), reverse=True)
+
+    seen, unique = set(), []
+    for note in notes:
+        if note.get('id') not in seen:
+            seen.add(note['id'])
+            unique.append(note)
+    unique.sort(key=lambda x: (
+        -(int(x.get('comments', 0)) if str(x.get('comments', '0')).isdigit() else 0),
+        -(int(x.get('collects', 0)) if str(x.get('collects', '0')).isdigit() else 0),
+    ))
+    unique = unique[:top_k]
+
+    keyword_lower = keyword.lower()
+    keyword_words = keyword_lower.split()
+    validated = []
+    for note in unique:
+        all_text = f"{note.get('title', '').lower()} {note.get('desc', '').lower()} " \
+                   f"{note.get('author', '').lower()} {' '.join(note.get('tags', [])).lower()}"
+        if keyword_lower in all_text or sum(1 for w in keyword_words if w in all_text) >= max(1, len(keyword_words) // 2) \
+                or note.get('cover') or note.get('likes') or note.get('comments'):
+            validated.append(note)
+    return validated
+
+
+def best_of(func, repeat):
+    """重复执行取最短耗时（毫秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索结果排序耗时基准')
+    parser.add_argument('--keyword', default='连衣裙')
+    parser.add_argument('--sizes', default='10,100,1000,10000', help='批量大小，逗号分隔')
+    parser.add_argument('--top-k', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5, help='每组重复次数（取最小值）')
+    parser.add_argument('--cache-dir', default=os.path.join(PROJECT_ROOT, 'cache'))
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    # 基准中所有批量都走NumPy实现，便于对比
+    note_ranking.NUMPY_MIN_BATCH = 0
+    cached = load_cached_notes(args.cache_dir)
+    print(f"📄 缓存笔记数: {len(cached)}（不足时{'循环复用' if cached else '使用模拟数据'}）, NumPy可用: {NUMPY_AVAILABLE}")
+
+    numpy_ranker = NoteRanker(use_numpy=True)
+    python_ranker = NoteRanker(use_numpy=False)
+
+    print(f"{'批量':>8} {'旧流程':>12} {'构造记录':>12} {'NumPy排序':>12} {'纯Python排序':>14}")
+    for size in sizes:
+        if cached:
+            notes = [dict(cached[i % len(cached)], id=f"{cached[i % len(cached)].get('id')}-{i}") for i in range(size)]
+        else:
+            notes = synthetic_notes(size, args.keyword)
+
+        records = records_from_dicts(notes)
+        legacy_ms = best_of(lambda: legacy_rank(notes, args.keyword, args.top_k), args.repeat)
+        build_ms = best_of(lambda: records_from_dicts(notes), args.repeat)
+        numpy_ms = best_of(lambda: numpy_ranker.rank(records, args.keyword, args.top_k), args.repeat) \
+            if NUMPY_AVAILABLE else float('nan')
+        python_ms = best_of(lambda: python_ranker.rank(records, args.keyword, args.top_k), args.repeat)
+
+        print(f"{size:>8} {legacy_ms:>10.2f}ms {build_ms:>10.2f}ms {numpy_ms:>10.2f}ms {python_ms:>12.2f}ms")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+服务冷启动基准
+1. 导入耗时 - 新进程中导入 src.server.main_server 的耗时（取多次最小值），超过预算时返回非零退出码
+2. 导入明细 - 用 -X importtime 列出累计耗时最高的模块，并检查应延迟导入的重型模块没有在导入时加载
+3. 首个请求 - 启动服务进程，从启动到第一个HTTP响应的耗时（dev 为 Flask 开发服务器，
+   production 为 gunicorn，包含 preload 预热）
+
+用法:
+    python scripts/bench_startup.py [--repeat 5] [--budget-ms 400] [--server dev] [--path /]
+"""
+
+import os
+import sys
+import time
+import json
+import socket
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 main_server 的时间预算（毫秒）
+IMPORT_BUDGET_MS = 400
+
+# 只应在首次使用时导入的模块
+DEFERRED_MODULES = [
+    'selenium', 'bs4', 'requests', 'jieba', 'numpy',
+    'src.crawler.XHS_crawler', 'src.server.note_generator', 'src.server.note_content_extractor',
+]
+
+# 只记录在导入线程中执行的延迟模块（预热线程在后台导入的不算）
+IMPORT_SNIPPET = """
+import sys, time, json, threading, importlib.machinery
+deferred = %r
+loaded = []
+
+class RecordingFinder:
+    def find_spec(self, name, path=None, target=None):
+        if name not in deferred:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(name, path)
+        if spec is not None and hasattr(spec.loader, 'exec_module'):
+            exec_module = spec.loader.exec_module
+            def recording_exec_module(module):
+                if threading.current_thread() is threading.main_thread():
+                    loaded.append(name)
+                exec_module(module)
+            spec.loader.exec_module = recording_exec_module
+        return spec
+
+sys.meta_path.insert(0, RecordingFinder())
+started = time.perf_counter()
+import src.server.main_server
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': loaded}))
+"""
+
+
+def child_env():
+    """子进程环境：从项目根目录导入，不启动独立爬虫层"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env.pop('CRAWL_TIER', None)
+    return env
+
+
+def measure_import(workdir):
+    """新进程中导入 main_server，返回耗时（秒）和导入时已加载的延迟模块"""
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET % DEFERRED_MODULES],
+        cwd=workdir, env=child_env(), capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], result['loaded']
+
+
+def import_profile(workdir, top):
+    """-X importtime 输出中累计耗时最高的模块（微秒）"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.server.main_server'],
+        cwd=workdir, env=child_env(), capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def free_port():
+    """取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workdir):
+    """启动服务的命令"""
+    if server == 'production':
+        return [sys.executable, '-m', 'gunicorn', '-c', os.path.join(PROJECT_ROOT, 'src', 'server', 'gunicorn_conf.py'),
+                '--chdir', workdir, '--bind', f'127.0.0.1:{port}', 'src.server.wsgi:app']
+    return [sys.executable, '-m', 'flask', '--app', 'src.server.main_server', 'run', '--port', str(port)]
+
+
+def time_to_first_request(workdir, server, path, timeout=60):
+    """从启动服务进程到收到第一个HTTP响应的耗时（秒）"""
+    port = free_port()
+    url = f'http://127.0.0.1:{port}{path}'
+    started = time.perf_counter()
+    process = subprocess.Popen(server_command(server, port, workdir), cwd=workdir, env=child_env(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'服务进程已退出（退出码 {process.returncode}）')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    return time.perf_counter() - started, response.status
+            except urllib.error.HTTPError as e:
+                return time.perf_counter() - started, e.code
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f'{timeout} 秒内没有收到响应')
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务冷启动基准')
+    parser.add_argument('--repeat', type=int, default=5, help='导入耗时重复次数（取最小值）')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS, help='导入耗时预算（毫秒）')
+    parser.add_argument('--top', type=int, default=15, help='列出累计耗时最高的模块数')
+    parser.add_argument('--server', choices=['dev', 'production'], default='dev')
+    parser.add_argument('--path', default='/', help='首个请求的路径')
+    parser.add_argument('--workdir', default=PROJECT_ROOT, help='服务工作目录（cache 目录所在位置）')
+    args = parser.parse_args()
+
+    timings = []
+    loaded = []
+    for _ in range(args.repeat):
+        seconds, loaded = measure_import(args.workdir)
+        timings.append(seconds)
+    import_ms = min(timings) * 1000
+    print(f"📦 导入 src.server.main_server: 最小 {import_ms:.0f}ms，最大 {max(timings) * 1000:.0f}ms"
+          f"（预算 {args.budget_ms:.0f}ms）")
+    if loaded:
+        print(f"⚠️  导入时已加载应延迟导入的模块: {', '.join(loaded)}")
+
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative_us, self_us, name in import_profile(args.workdir, args.top):
+        print(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+
+    seconds, status = time_to_first_request(args.workdir, args.server, args.path)
+    print(f"🚀 首个请求（{args.server} {args.path} -> {status}）: {seconds * 1000:.0f}ms")
+
+    return 1 if import_ms > args.budget_ms or loaded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟大模型服务（OpenAI兼容接口）
+用于离线联调和压测笔记生成，不访问任何外部服务：
+- POST /v1/chat/completions  支持 stream=true 的SSE流式输出
+- POST /v1/completions       prompt 可以是列表（批量接口）
+- GET  /stats                已处理的请求数和提示词数（另按接口分别计数）
+每个请求固定延迟 --latency 秒，流式输出每段额外延迟 --chunk-delay 秒，
+输出内容由提示词哈希决定（相同提示词得到相同输出）；
+测试中可设置 server.error_status 让接口返回错误状态码，设置 server.output 固定输出内容
+
+用法:
+    python scripts/fake_llm_server.py [--port 8765] [--latency 0.2] [--chunk-delay 0.01]
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 LLM_BATCH_ENDPOINT=true python app.py
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOPIC_WORDS = ['穿搭', '护肤', '美食', '旅行', '家居', '好物', '探店', '健身']
+
+# 流式输出每段的字符数
+CHUNK_SIZE = 8
+
+
+def fake_completion(prompt: str) -> str:
+    """根据提示词哈希生成固定的JSON笔记"""
+    digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+    topic = TOPIC_WORDS[int(digest[:4], 16) % len(TOPIC_WORDS)]
+    note = {
+        'title': f"{topic}分享｜这次真的被惊艳到了✨{digest[:4]}",
+        'content': f"最近在研究{topic}，整理了几点心得。\n第一，先想清楚需求。\n第二，多对比再决定。\n"
+                   f"第三，记录下自己的体验。\n希望对大家有帮助～（{digest[:12]}）",
+        'tags': [topic, '经验分享', '日常记录'],
+    }
+    return json.dumps(note, ensure_ascii=False)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI兼容接口的最小实现"""
+
+    # 保持连接，客户端连接池才能复用
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """关闭逐请求日志"""
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, endpoint: str, prompts: int):
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+            self.server.stats['prompts'] += prompts
+            self.server.stats[endpoint] += 1
+
+    def _output(self, prompt: str) -> str:
+        return self.server.output if self.server.output is not None else fake_completion(prompt)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'invalid json'})
+            return
+
+        time.sleep(self.server.latency)
+        if self.server.error_status:
+            self._send_json(self.server.error_status, {'error': 'injected error'})
+            return
+
+        if self.path.endswith('/chat/completions'):
+            messages = payload.get('messages') or [{}]
+            text = self._output(str(messages[-1].get('content', '')))
+            self._count('stream_requests' if payload.get('stream') else 'chat_requests', 1)
+            if payload.get('stream'):
+                self._stream(text, payload.get('model'))
+            else:
+                self._send_json(200, {
+                    'object': 'chat.completion',
+                    'model': payload.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                })
+        elif self.path.endswith('/completions'):
+            prompts = payload.get('prompt')
+            prompts = prompts if isinstance(prompts, list) else [prompts or '']
+            self._count('batch_requests', len(prompts))
+            self._send_json(200, {
+                'object': 'text_completion',
+                'model': payload.get('model'),
+                'choices': [
+                    {'index': i, 'text': self._output(str(prompt)), 'finish_reason': 'stop'}
+                    for i, prompt in enumerate(prompts)
+                ],
+            })
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _stream(self, text: str, model: str):
+        """按固定长度切片，以SSE分块输出"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write_chunk(data: bytes):
+            self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+            self.wfile.flush()
+
+        for start in range(0, len(text), CHUNK_SIZE):
+            event = {'model': model, 'choices': [{'index': 0, 'delta': {'content': text[start:start + CHUNK_SIZE]}}]}
+            write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+            time.sleep(self.server.chunk_delay)
+        write_chunk(b'data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """多线程HTTP服务，客户端断开连接时不打印异常"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_fake_server(port: int = 0, latency: float = 0.2, chunk_delay: float = 0.01):
+    """
+    在后台线程启动模拟服务
+
+    Returns:
+        (server, base_url)，用 server.shutdown() 停止
+    """
+    server = FakeLLMServer(('127.0.0.1', port), FakeLLMHandler)
+    server.latency = latency
+    server.chunk_delay = chunk_delay
+    server.error_status = None
+    server.output = None
+    server.stats = {'requests': 0, 'prompts': 0, 'chat_requests': 0, 'batch_requests': 0, 'stream_requests': 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟大模型服务')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help='流式输出每段的延迟（秒）')
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(args.port, args.latency, args.chunk_delay)
+    print(f"🤖 模拟大模型服务已启动: {base_url}（Ctrl+C 停止）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,6 +14,7 @@ import logging
 import hashlib
 import os
 import sys
+import threading
 import urllib.parse
 from urllib.parse import quote
 import re
@@ -68,6 +69,18 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from src.server.metrics import (
+    DRIVER_LAUNCH_SECONDS, PAGE_NAVIGATION_SECONDS, ANTI_BOT_SECONDS,
+    EXTRACTION_STRATEGY_SECONDS, EXTRACTION_STRATEGY_RESULTS, TOKEN_EXTRACTION_SECONDS,
+    VALIDATION_SECONDS, CACHE_REQUESTS, HTML_RENDER_SECONDS
+)
+from src.crawler.note_search_index import note_search_index
+from src.crawler.near_duplicate import near_duplicate_index
+from src.crawler.note_record import parse_count, records_from_dicts, records_to_dicts
+from src.crawler.note_ranking import NoteRanker
+from src.server.text_patterns import text_patterns
+from src.crawler.cookie_priming import prime_cookies
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -97,8 +110,11 @@ class XiaoHongShuCrawler:
         self.proxy = proxy
         self.cookies_file = cookies_file or FILE_PATHS['COOKIES_FILE']
         
-        # WebDriver相关
+        # WebDriver相关（预热线程和请求线程可能同时触发启动，用锁保证只启动一个浏览器）
         self.driver = None
+        self._driver_lock = threading.RLock()
+        # 搜索使用浏览器期间持有，保活检查不会探测或关闭正在使用的浏览器
+        self._busy_lock = threading.Lock()
         
         # 缓存配置
         self.cache_dir = DIRECTORIES['TEMP_DIR']
@@ -145,9 +161,44 @@ class XiaoHongShuCrawler:
     
     def _ensure_driver_initialized(self):
         """确保WebDriver已初始化"""
-        if self.driver is None:
-            return self._init_selenium()
-        return True
+        with self._driver_lock:
+            if self.driver is None:
+                return self._init_selenium()
+            return True
+    
+    def warm_up(self):
+        """提前启动浏览器并加载cookie（服务启动时在后台调用，首个搜索不再等待浏览器启动）"""
+        return self._ensure_driver_initialized()
+    
+    def ping(self):
+        """
+        浏览器健康检查：浏览器已退出时丢弃，下次使用时重新启动
+        
+        Returns:
+            bool: 浏览器是否在运行（尚未启动时返回False，正在搜索时视为运行中）
+        """
+        if not self._busy_lock.acquire(blocking=False):
+            # 搜索正在使用浏览器，跳过本次检查
+            return True
+        try:
+            driver = self.driver
+            if driver is None:
+                return False
+            try:
+                driver.current_url
+                return True
+            except Exception as e:
+                logger.warning(f"浏览器已失去响应，将重新启动: {str(e)}")
+                with self._driver_lock:
+                    if self.driver is driver:
+                        self.driver = None
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                return False
+        finally:
+            self._busy_lock.release()
     
     def _load_cookies(self):
         """加载cookie"""
@@ -221,7 +272,8 @@ class XiaoHongShuCrawler:
                 logger.info(f"使用本地ChromeDriver: {chromedriver_path}")
                 os.chmod(chromedriver_path, 0o755)
                 service = Service(chromedriver_path)
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                with DRIVER_LAUNCH_SECONDS.time('search'):
+                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
             else:
                 logger.error(f"ChromeDriver不存在: {chromedriver_path}")
                 return False
@@ -243,25 +295,10 @@ class XiaoHongShuCrawler:
             return False
     
     def _add_cookies(self):
-        """添加cookie到浏览器"""
+        """添加cookie到浏览器（第一次导航前预置，后续打开的页面直接带上cookie，无需打开主页再刷新）"""
         try:
             logger.info("尝试添加cookie...")
-            self.driver.get("https://www.xiaohongshu.com")
-            time.sleep(3)
-            
-            for cookie in self.cookies:
-                try:
-                    # 移除可能导致问题的字段
-                    cookie_clean = {k: v for k, v in cookie.items() 
-                                  if k in ['name', 'value', 'domain', 'path', 'secure']}
-                    self.driver.add_cookie(cookie_clean)
-                except Exception as e:
-                    logger.warning(f"添加cookie失败: {cookie.get('name', '未知')} - {str(e)}")
-            
-            # 刷新页面使cookie生效
-            self.driver.refresh()
-            time.sleep(5)
-            logger.info("已添加cookie并刷新页面")
+            prime_cookies(self.driver, self.cookies, URLS['XIAOHONGSHU_BASE'])
             
         except Exception as e:
             logger.error(f"添加cookie过程出错: {str(e)}")
@@ -279,6 +316,7 @@ class XiaoHongShuCrawler:
                 self._debug_log("⚠️ 数据为空，跳过缓存保存", "WARNING")
                 return
             
+            data = records_to_dicts(data)
             cache_path = self._get_cache_path(keyword)
             cache_data = {
                 'timestamp': time.time(),
@@ -289,6 +327,12 @@ class XiaoHongShuCrawler:
                 json.dump(cache_data, f, ensure_ascii=False, indent=2)
             logger.info(f"数据已缓存: {cache_path}")
             
+            # 搜索结果同时写入本地索引，供无浏览器检索
+            try:
+                note_search_index.add_notes(data, source='search')
+            except Exception as e:
+                logger.warning(f"更新本地索引失败: {str(e)}")
+            
             # 🔧 修复：只有有有效数据时才生成HTML页面
             self._debug_log("📄 生成HTML结果页面...")
             self._generate_result_html(keyword, data)
@@ -308,7 +352,8 @@ class XiaoHongShuCrawler:
             html_path = os.path.join(results_dir, html_filename)
             
             # 生成HTML内容
-            html_content = self._create_html_template(keyword, data)
+            with HTML_RENDER_SECONDS.time():
+                html_content = self._create_html_template(keyword, data)
             
             # 保存HTML文件
             with open(html_path, 'w', encoding='utf-8') as f:
@@ -1166,7 +1211,7 @@ ${{window.currentGeneratedNote.suggestions}}`;
                 return None
             
             logger.info(f"从缓存加载数据: {cache_path}")
-            return cached_data
+            return records_to_dicts(cached_data)
         except Exception as e:
             logger.error(f"加载缓存失败: {str(e)}")
             return None
@@ -1456,47 +1501,49 @@ ${{window.currentGeneratedNote.suggestions}}`;
     
     def _recreate_visible_browser(self):
         """重新创建可见的浏览器实例"""
-        try:
-            logger.info("🔄 重新创建可见浏览器...")
+        # 持有浏览器锁，避免保活线程在重建期间另外启动浏览器
+        with self._driver_lock:
+            try:
+                logger.info("🔄 重新创建可见浏览器...")
             
-            # 保存当前URL
-            current_url = self.driver.current_url if self.driver else None
+                # 保存当前URL
+                current_url = self.driver.current_url if self.driver else None
             
-            # 关闭当前浏览器
-            if self.driver:
-                try:
-                    self.driver.quit()
-                except Exception:
-                    pass
-                self.driver = None
+                # 关闭当前浏览器
+                if self.driver:
+                    try:
+                        self.driver.quit()
+                    except Exception:
+                        pass
+                    self.driver = None
             
-            # 临时设置为非无头模式
-            original_headless = self.headless
-            self.headless = False
+                # 临时设置为非无头模式
+                original_headless = self.headless
+                self.headless = False
             
-            # 重新初始化浏览器
-            success = self._init_selenium()
+                # 重新初始化浏览器
+                success = self._init_selenium()
             
-            if success and current_url:
-                # 重新访问之前的URL
-                try:
-                    self.driver.get(current_url)
-                    time.sleep(3)
-                    logger.info("✅ 可见浏览器创建成功，已重新载入页面")
-                except Exception as e:
-                    logger.warning(f"重新载入页面失败: {str(e)}")
+                if success and current_url:
+                    # 重新访问之前的URL
+                    try:
+                        self.driver.get(current_url)
+                        time.sleep(3)
+                        logger.info("✅ 可见浏览器创建成功，已重新载入页面")
+                    except Exception as e:
+                        logger.warning(f"重新载入页面失败: {str(e)}")
                 
-                # 恢复原始设置
-                self.headless = original_headless
-                return True
-            else:
-                logger.error("❌ 可见浏览器创建失败")
-                self.headless = original_headless
-                return False
+                    # 恢复原始设置
+                    self.headless = original_headless
+                    return True
+                else:
+                    logger.error("❌ 可见浏览器创建失败")
+                    self.headless = original_headless
+                    return False
                 
-        except Exception as e:
-            logger.error(f"重新创建浏览器失败: {str(e)}")
-            return False
+            except Exception as e:
+                logger.error(f"重新创建浏览器失败: {str(e)}")
+                return False
 
     def _save_page_source(self, page_source, keyword):
         """保存页面源码"""
@@ -1687,12 +1734,19 @@ ${{window.currentGeneratedNote.suggestions}}`;
         if use_cache:
             self._debug_log("📂 检查缓存...")
             cached_result = self._load_from_cache(keyword)
+            CACHE_REQUESTS.inc('search', 'hit' if cached_result else 'miss')
             if cached_result:
                 self._debug_log(f"✅ 从缓存获取到 {len(cached_result)} 条结果")
                 return cached_result[:max_results]
             else:
                 self._debug_log("ℹ️ 缓存中无数据，进行实时搜索")
 
+        # 实时搜索期间占用浏览器，保活检查会跳过正在使用的浏览器
+        with self._busy_lock:
+            return self._search_live(keyword, max_results, use_cache)
+
+    def _search_live(self, keyword, max_results, use_cache):
+        """打开搜索页面并提取结果（调用方需持有 _busy_lock）"""
         try:
             # 尝试多种搜索URL格式
             search_urls = [
@@ -1716,7 +1770,8 @@ ${{window.currentGeneratedNote.suggestions}}`;
                     self._debug_log(f"🔗 尝试搜索URL {i+1}/{len(search_urls)}: {search_url[:80]}...")
                     
                     # 访问搜索页面
-                    self.driver.get(search_url)
+                    with PAGE_NAVIGATION_SECONDS.time('search'):
+                        self.driver.get(search_url)
                     
                     # 等待页面加载
                     self._debug_log("⏳ 等待页面加载...")
@@ -1742,7 +1797,9 @@ ${{window.currentGeneratedNote.suggestions}}`;
             
             # 等待并检测反爬虫
             self._debug_log("🛡️ 检测反爬虫机制...")
-            if not self._handle_anti_bot():
+            with ANTI_BOT_SECONDS.time():
+                anti_bot_passed = self._handle_anti_bot()
+            if not anti_bot_passed:
                 self._debug_log("❌ 反爬虫检测处理失败", "ERROR") 
                 return []
             
@@ -1766,11 +1823,9 @@ ${{window.currentGeneratedNote.suggestions}}`;
             results = self.extract_notes_advanced(keyword, max_results)
             
             if results:
-                self._debug_log(f"📊 初步提取到 {len(results)} 条结果")
-                
-                # 验证结果是否与关键词相关
-                self._debug_log("🔍 验证结果与关键词的相关性...")
-                validated_results = self._validate_search_results(results, keyword)
+                # 提取阶段已按关键词完成相关性验证和排序
+                self._debug_log(f"📊 提取到 {len(results)} 条相关结果")
+                validated_results = results
                 
                 # 🔧 修复：只有当真正有结果时才缓存和生成HTML
                 if validated_results and len(validated_results) > 0:
@@ -1780,7 +1835,7 @@ ${{window.currentGeneratedNote.suggestions}}`;
                         self._save_to_cache(keyword, validated_results)
                     
                     self._debug_log(f"🎉 搜索完成！找到 {len(validated_results)} 条相关结果")
-                    return validated_results[:max_results]
+                    return records_to_dicts(validated_results[:max_results])
                 else:
                     # 🔧 修复：删除可能存在的空缓存文件
                     self._debug_log(f"⚠️ 未找到与关键词 '{keyword}' 相关的搜索结果，清理空缓存", "WARNING")
@@ -1864,6 +1919,14 @@ ${{window.currentGeneratedNote.suggestions}}`;
             logger.error(f"验证搜索页面时出错: {str(e)}")
             return False
 
+    def _get_ranker(self):
+        """按当前配置的权重获取排序器（配置项 ranking_weights）"""
+        weights = self.crawl_config.get('ranking_weights')
+        if getattr(self, '_ranker', None) is None or self._ranker_weights != weights:
+            self._ranker = NoteRanker(weights)
+            self._ranker_weights = weights
+        return self._ranker
+
     def _validate_search_results(self, results, keyword):
         """验证搜索结果是否与关键词相关 - 根据配置调整严格程度"""
         if not results or not keyword:
@@ -1888,69 +1951,21 @@ ${{window.currentGeneratedNote.suggestions}}`;
             logger.error(f"验证搜索结果时出错: {str(e)}")
             return results
     
+    def _filter_relevant(self, results, keyword, validation_level):
+        """按相关性掩码过滤结果（保持原有顺序）"""
+        records = records_from_dicts(results)
+        mask = self._get_ranker().relevance_mask(records, keyword, validation_level)
+        return [record for record, relevant in zip(records, mask) if relevant]
+    
     def _strict_validate(self, results, keyword):
-        """高严格度验证"""
-        validated_results = []
-        keyword_lower = keyword.lower()
-        
-        for result in results:
-            title = result.get('title', '').lower()
-            description = result.get('description', '').lower()
-            author = result.get('author', '').lower()
-            tags = ' '.join(result.get('tags', [])).lower()
-            
-            # 必须包含完整关键词
-            if any([
-                keyword_lower in title,
-                keyword_lower in description,
-                keyword_lower in author,
-                keyword_lower in tags,
-            ]):
-                validated_results.append(result)
-                logger.debug(f"严格验证通过: {result.get('title', '')[:50]}...")
-            else:
-                logger.debug(f"严格验证失败: {result.get('title', '')[:50]}...")
-        
+        """高严格度验证：标题、描述、作者或标签中必须包含完整关键词"""
+        validated_results = self._filter_relevant(results, keyword, 'high')
         logger.info(f"严格验证结果: {len(results)} -> {len(validated_results)} 条相关结果")
         return validated_results
     
     def _flexible_validate(self, results, keyword):
-        """中等严格度验证 - 灵活匹配"""
-        validated_results = []
-        keyword_lower = keyword.lower()
-        keyword_words = keyword_lower.split()
-        
-        for result in results:
-            title = result.get('title', '').lower()
-            description = result.get('description', '').lower()
-            author = result.get('author', '').lower()
-            tags = ' '.join(result.get('tags', [])).lower()
-            
-            # 组合所有文本进行匹配
-            all_text = f"{title} {description} {author} {tags}"
-            
-            # 多种匹配策略
-            is_relevant = any([
-                # 完整关键词匹配
-                keyword_lower in all_text,
-                # 关键词部分匹配（至少匹配一半的词）
-                sum(1 for word in keyword_words if word in all_text) >= max(1, len(keyword_words) // 2),
-                # 如果标题和描述都有内容，则认为是有效结果（来自搜索页面）
-                (len(title.strip()) > 3 and len(description.strip()) > 10),
-                # 如果有封面图片，则认为是有效笔记
-                bool(result.get('cover_image')),
-                # 如果有互动数据，则认为是有效笔记
-                bool(result.get('like_count') or result.get('comment_count')),
-            ])
-            
-            if is_relevant:
-                validated_results.append(result)
-                if self.crawl_config.get('enable_detailed_logs', True):
-                    logger.debug(f"灵活验证通过: {result.get('title', '')[:50]}...")
-            else:
-                if self.crawl_config.get('enable_detailed_logs', True):
-                    logger.debug(f"灵活验证失败: {result.get('title', '')[:50]}...")
-        
+        """中等严格度验证 - 灵活匹配（关键词命中、部分命中、内容完整、有封面或有互动数据之一即可）"""
+        validated_results = self._filter_relevant(results, keyword, 'medium')
         logger.info(f"灵活验证结果: {len(results)} -> {len(validated_results)} 条相关结果")
         return validated_results
 
@@ -1966,7 +1981,9 @@ ${{window.currentGeneratedNote.suggestions}}`;
             if self.crawl_config.get('enable_strategy_1', True):
                 try:
                     logger.info("==================== 执行策略1: 探索链接提取 ====================")
-                    results_1 = self._extract_by_explore_links(max_results)
+                    with EXTRACTION_STRATEGY_SECONDS.time('explore_links'):
+                        results_1 = self._extract_by_explore_links(max_results)
+                    EXTRACTION_STRATEGY_RESULTS.inc('explore_links', amount=len(results_1 or []))
                     if results_1:
                         all_results.extend(results_1)
                         logger.info(f"✅ 策略1(探索链接): 成功提取到 {len(results_1)} 条结果")
@@ -1986,7 +2003,9 @@ ${{window.currentGeneratedNote.suggestions}}`;
                     logger.info("==================== 执行策略2: 数据属性提取 ====================")
                     remaining_needed = max_results - len(all_results)
                     if remaining_needed > 0:
-                        results_2 = self._extract_by_data_attributes(remaining_needed)
+                        with EXTRACTION_STRATEGY_SECONDS.time('data_attributes'):
+                            results_2 = self._extract_by_data_attributes(remaining_needed)
+                        EXTRACTION_STRATEGY_RESULTS.inc('data_attributes', amount=len(results_2 or []))
                         if results_2:
                             all_results.extend(results_2)
                             logger.info(f"✅ 策略2(数据属性): 成功提取到 {len(results_2)} 条结果")
@@ -2009,7 +2028,9 @@ ${{window.currentGeneratedNote.suggestions}}`;
                     logger.info("==================== 执行策略3: JavaScript提取 ====================")
                     remaining_needed = max_results - len(all_results)
                     if remaining_needed > 0:
-                        results_3 = self._extract_by_javascript(remaining_needed)
+                        with EXTRACTION_STRATEGY_SECONDS.time('javascript'):
+                            results_3 = self._extract_by_javascript(remaining_needed)
+                        EXTRACTION_STRATEGY_RESULTS.inc('javascript', amount=len(results_3 or []))
                         if results_3:
                             all_results.extend(results_3)
                             logger.info(f"✅ 策略3(JavaScript): 成功提取到 {len(results_3)} 条结果")
@@ -2031,23 +2052,20 @@ ${{window.currentGeneratedNote.suggestions}}`;
             logger.info(f"已执行策略: {', '.join(strategies_executed)}")
             logger.info(f"原始结果总数: {len(all_results)}")
             
-            # 按照互动数据排序
-            if all_results:
-                try:
-                    all_results.sort(key=lambda x: (
-                        int(x.get('comment_count', 0)) if str(x.get('comment_count', '0')).isdigit() else 0,
-                        int(x.get('like_count', 0)) if str(x.get('like_count', '0')).isdigit() else 0
-                    ), reverse=True)
-                    logger.info("笔记已按互动数据排序: 评论数降序 + 收藏数降序")
-                except Exception as e:
-                    logger.warning(f"排序失败: {str(e)}")
+            # 各策略的结果统一为 NoteRecord（字段名归一，互动数据转为整数）
+            all_results = records_from_dicts(all_results)
             
             # 去重处理
             unique_results = self._deduplicate_results(all_results)
             logger.info(f"去重后结果数: {len(unique_results)}")
             
-            # 限制结果数量
-            final_results = unique_results[:max_results]
+            # 排序、相关性验证和数量限制在一次向量化计算中完成
+            validation_level = self.crawl_config.get('validation_strict_level', 'medium')
+            with VALIDATION_SECONDS.time(validation_level):
+                final_results = self._get_ranker().rank(
+                    unique_results, keyword, top_k=max_results, validation_level=validation_level
+                )
+            logger.info(f"相关性验证({validation_level}): {len(unique_results)} -> {len(final_results)} 条")
             logger.info(f"最终返回结果数: {len(final_results)}")
             logger.info(f"==================== 三种策略执行完成 ====================")
             
@@ -2097,7 +2115,8 @@ ${{window.currentGeneratedNote.suggestions}}`;
             
             # 批量提取所有笔记的xsec_token
             logger.info(f"开始批量提取 {len(note_links)} 个笔记的xsec_token...")
-            note_tokens = self._extract_all_xsec_tokens([item['note_id'] for item in note_links])
+            with TOKEN_EXTRACTION_SECONDS.time():
+                note_tokens = self._extract_all_xsec_tokens([item['note_id'] for item in note_links])
             
             # 处理每个笔记
             for i, note_link in enumerate(note_links):
@@ -3052,16 +3071,8 @@ ${{window.currentGeneratedNote.suggestions}}`;
         if text.isdigit():
             return False
             
-        # 排除常见的无意义文本
-        exclude_keywords = [
-            '点赞', '评论', '收藏', '分享', '关注', 
-            '更多', '查看', '详情', '全文', '展开',
-            '赞', '评', '藏', '更多内容', '阅读全文',
-            '笔记', '小红书', '作者', '发布', '时间',
-            'like', 'comment', 'share', 'follow'
-        ]
-        
-        if any(keyword in text.lower() for keyword in exclude_keywords):
+        # 排除常见的无意义文本（词典见 src/server/data/text_patterns.json 的 tag_exclude 分组）
+        if text_patterns.contains(text, 'tag_exclude'):
             return False
             
         # 包含中文、英文或数字的组合
@@ -3256,41 +3267,23 @@ ${{window.currentGeneratedNote.suggestions}}`;
 
     def _parse_number(self, num_str):
         """解析数字字符串，支持万、k等单位"""
-        try:
-            num_str = str(num_str).lower().strip()
-            
-            if '万' in num_str:
-                return int(float(num_str.replace('万', '')) * 10000)
-            elif 'k' in num_str:
-                return int(float(num_str.replace('k', '')) * 1000)
-            elif 'm' in num_str:
-                return int(float(num_str.replace('m', '')) * 1000000)
-            else:
-                return int(float(num_str))
-                
-        except Exception:
-            return 0
+        return parse_count(num_str)
 
     def _deduplicate_results(self, results):
-        """去重处理并按互动数据排序"""
+        """去重处理（排序由 NoteRanker 统一完成）"""
         seen_ids = set()
         unique_results = []
         
-        for result in results:
-            if result.get('id') not in seen_ids:
-                seen_ids.add(result['id'])
+        for result in records_from_dicts(results):
+            if result.id not in seen_ids:
+                seen_ids.add(result.id)
                 unique_results.append(result)
         
-        # 按评论数降序 + 收藏数降序排序
-        # 首先按评论数排序，评论数相同时按收藏数排序
+        # 近似重复（转载、换ID重发）的笔记合并为一条，并跨会话记录指纹
         try:
-            unique_results.sort(key=lambda x: (
-                -int(x.get('comments', 0)),  # 评论数降序（负号表示降序）
-                -int(x.get('collects', 0))   # 收藏数降序（负号表示降序）
-            ))
-            logger.info(f"笔记已按互动数据排序: 评论数降序 + 收藏数降序")
+            unique_results = near_duplicate_index.group_results(unique_results)
         except Exception as e:
-            logger.warning(f"排序失败，使用原始顺序: {str(e)}")
+            logger.warning(f"近似去重失败，仅按ID去重: {str(e)}")
         
         return unique_results
 
@@ -3326,6 +3319,7 @@ ${{window.currentGeneratedNote.suggestions}}`;
         """关闭爬虫"""
         if self.driver:
             self.driver.quit()
+            self.driver = None
             logger.info("Selenium已关闭")
 
 # 示例代码
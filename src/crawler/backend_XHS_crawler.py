@@ -13,9 +13,10 @@ import time
 import logging
 import threading
 import random
+import multiprocessing
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -31,7 +32,17 @@ sys.path.insert(0, PROJECT_ROOT)
 
 # 导入必要的模块
 import requests
-from bs4 import BeautifulSoup
+from src.crawler.note_page_parser import parse_note_file, parse_note_page
+from src.crawler.cookie_priming import prime_cookies_from_file
+from src.crawler.crawl_progress import crawl_progress
+from src.crawler.note_archive import note_archive, KIND_DETAIL
+from src.crawler.note_search_index import note_search_index
+from src.crawler.near_duplicate import near_duplicate_index
+from src.server.keyword_model import keyword_model
+from src.server.metrics import (
+    DRIVER_LAUNCH_SECONDS, PAGE_NAVIGATION_SECONDS, BACKEND_NOTE_CRAWL_SECONDS,
+    IMAGE_DOWNLOAD_SECONDS, IMAGE_DOWNLOAD_BYTES
+)
 
 # 配置日志
 logging.basicConfig(
@@ -64,6 +75,8 @@ class BackendXHSCrawler:
         self.request_delay = 3  # 请求间隔（秒）
         self.timeout = 30  # 请求超时时间
         self.retry_count = 2  # 重试次数
+        self.parse_workers = max(1, min(4, (os.cpu_count() or 2) - 1))  # 解析进程数
+        self._parse_pool = None  # 批量任务期间的解析进程池
         
         # 反爬虫配置
         self.human_behavior_config = {
@@ -116,47 +129,67 @@ class BackendXHSCrawler:
         
         task_file = os.path.join(session_dir, 'task_info.json')
         with open(task_file, 'w', encoding='utf-8') as f:
-            json.dump(task_info, f, ensure_ascii=False, indent=2)
+            json.dump(task_info, f, ensure_ascii=False)
         
         logger.info(f"📁 任务信息已保存: {task_file}")
+        crawl_progress.start_session(session_id, len(notes_data))
         
-        # 使用线程池进行并发爬取
+        # 浏览器线程只负责抓取页面，解析交给进程池，图片下载和保存交给后处理线程
+        # 本进程已有浏览器、心跳和进度线程，fork 会复制被这些线程持有的锁，解析进程改用 spawn 启动
         results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            future_to_note = {
-                executor.submit(self._crawl_single_note, note_data, session_id, i+1): note_data 
-                for i, note_data in enumerate(notes_data)
-            }
-            
-            # 处理完成的任务
-            for future in as_completed(future_to_note):
-                note_data = future_to_note[future]
-                try:
-                    result = future.result()
-                    results.append(result)
+        with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as post_executor:
+            self._parse_pool = parse_pool
+            try:
+                finalize_futures = {}
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    # 提交所有任务
+                    future_to_note = {
+                        executor.submit(self._crawl_single_note, note_data, session_id, i+1): (note_data, i+1)
+                        for i, note_data in enumerate(notes_data)
+                    }
                     
-                    if result['success']:
-                        self.stats['success_count'] += 1
-                        note_id_display = note_data.get('note_id') or note_data.get('id', 'N/A')
-                        logger.info(f"✅ [{self.stats['success_count']}/{len(notes_data)}] 笔记爬取成功: {note_id_display}")
-                    else:
-                        self.stats['failed_count'] += 1
-                        note_id_display = note_data.get('note_id') or note_data.get('id', 'N/A')
-                        logger.error(f"❌ [{self.stats['failed_count']}/{len(notes_data)}] 笔记爬取失败: {note_id_display} - {result.get('error', 'Unknown error')}")
+                    # 处理完成的抓取任务
+                    for future in as_completed(future_to_note):
+                        note_data, index = future_to_note[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            note_id_display = note_data.get('note_id') or note_data.get('id', 'N/A')
+                            logger.error(f"❌ 笔记爬取异常: {note_id_display} - {str(e)}")
+                            result = {
+                                'note_id': note_data.get('note_id') or note_data.get('id'),
+                                'success': False,
+                                'error': str(e)
+                            }
                         
-                except Exception as e:
-                    self.stats['failed_count'] += 1
-                    note_id_display = note_data.get('note_id') or note_data.get('id', 'N/A')
-                    logger.error(f"❌ 笔记爬取异常: {note_id_display} - {str(e)}")
-                    results.append({
-                        'note_id': note_data.get('note_id') or note_data.get('id'),
-                        'success': False,
-                        'error': str(e)
-                    })
+                        parse_future = result.pop('parse_future', None)
+                        if parse_future is not None:
+                            finalize_future = post_executor.submit(
+                                self._finalize_note, parse_future, result, session_id, index
+                            )
+                            finalize_futures[finalize_future] = note_data
+                        else:
+                            self._record_result(result, note_data, results, session_id)
+                        
+                        # 添加延迟避免请求过快
+                        time.sleep(self.request_delay)
                 
-                # 添加延迟避免请求过快
-                time.sleep(self.request_delay)
+                # 等待解析和后处理完成
+                for future in as_completed(finalize_futures):
+                    note_data = finalize_futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {
+                            'note_id': note_data.get('note_id') or note_data.get('id'),
+                            'success': False,
+                            'error': str(e)
+                        }
+                    self._record_result(result, note_data, results, session_id)
+            finally:
+                self._parse_pool = None
         
         self.stats['end_time'] = datetime.now()
         duration = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
@@ -173,7 +206,7 @@ class BackendXHSCrawler:
         
         stats_file = os.path.join(session_dir, 'crawl_stats.json')
         with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(final_stats, f, ensure_ascii=False, indent=2)
+            json.dump(final_stats, f, ensure_ascii=False)
         
         # 输出最终统计
         logger.info("🎉 批量爬取任务完成!")
@@ -183,9 +216,103 @@ class BackendXHSCrawler:
         logger.info(f"📈 成功率: {final_stats['success_rate']:.1f}%")
         logger.info(f"⏱️ 总耗时: {duration:.1f} 秒")
         logger.info(f"📁 结果保存在: {session_dir}")
+        crawl_progress.finish_session(session_id)
         
         return final_stats
     
+    def _record_result(self, result: Dict[str, Any], note_data: Dict[str, Any], results: List[Dict[str, Any]], session_id: str):
+        """记录单篇笔记的最终结果，更新统计并发布进度事件"""
+        started_at = result.pop('started_at', None)
+        duration = time.time() - started_at if started_at else 0.0
+        result['duration_seconds'] = round(duration, 3)
+        BACKEND_NOTE_CRAWL_SECONDS.observe(duration, 'success' if result.get('success') else 'failure')
+        results.append(result)
+        total = self.stats['total_notes']
+        note_id_display = note_data.get('note_id') or note_data.get('id', 'N/A')
+        
+        if result.get('success'):
+            self.stats['success_count'] += 1
+            logger.info(f"✅ [{self.stats['success_count']}/{total}] 笔记爬取成功: {note_id_display}")
+        else:
+            self.stats['failed_count'] += 1
+            logger.error(f"❌ [{self.stats['failed_count']}/{total}] 笔记爬取失败: {note_id_display} - {result.get('error', 'Unknown error')}")
+        
+        crawl_progress.note_finished(
+            session_id,
+            result.get('note_id') or note_id_display,
+            bool(result.get('success')),
+            bytes_downloaded=result.get('bytes_downloaded', 0),
+            duration=duration,
+            error=result.get('error')
+        )
+    
+    def _submit_parse(self, page_source: str, source_file: str, note_id: str, session_id: str, index: int) -> Future:
+        """
+        提交页面解析任务
+        
+        批量任务中交给进程池（只传文件路径），单独调用时在当前线程同步解析
+        """
+        if self._parse_pool is not None:
+            if source_file:
+                return self._parse_pool.submit(parse_note_file, source_file, note_id, session_id, index)
+            return self._parse_pool.submit(parse_note_page, page_source, note_id, session_id, index)
+        
+        future = Future()
+        try:
+            future.set_result(parse_note_page(page_source, note_id, session_id, index))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _finalize_note(self, parse_future: Future, result: Dict[str, Any], session_id: str, index: int) -> Dict[str, Any]:
+        """等待解析结果，下载图片并保存笔记详情"""
+        note_id = result.get('note_id')
+        try:
+            note_detail = parse_future.result()
+            image_urls = note_detail.pop('image_urls', [])
+            
+            # 下载图片
+            images = self._download_note_images(image_urls, note_id, session_id, index)
+            note_detail['images'] = images
+            
+            source_file = result.get('source_file')
+            bytes_downloaded = sum(image.get('size', 0) for image in images)
+            if source_file and os.path.exists(source_file):
+                bytes_downloaded += os.path.getsize(source_file)
+            
+            # 记录近似重复分组
+            canonical = near_duplicate_index.add(note_id, note_detail)
+            if canonical != note_id:
+                note_detail['duplicate_of'] = canonical
+            
+            # 保存笔记详情并更新本地索引
+            detail_file = self._save_note_detail(note_detail, note_id, session_id, index)
+            try:
+                note_search_index.add_note(note_id, note_detail, source=KIND_DETAIL)
+                keyword_model.add_document(note_id, note_detail)
+            except Exception as e:
+                logger.warning(f"⚠️ [{index}] 更新本地索引失败: {str(e)}")
+            
+            logger.info(f"✅ [{index}] 笔记爬取完成: {note_id}")
+            logger.info(f"📄 [{index}] 标题: {note_detail.get('title', 'N/A')[:50]}...")
+            logger.info(f"📝 [{index}] 内容长度: {len(note_detail.get('content', ''))} 字符")
+            logger.info(f"🏷️ [{index}] 标签数量: {len(note_detail.get('tags', []))}")
+            logger.info(f"🖼️ [{index}] 图片数量: {len(images)}")
+            
+            return {
+                **result,
+                'detail_file': detail_file,
+                'bytes_downloaded': bytes_downloaded,
+                'images_count': len(images),
+                'title': note_detail.get('title', ''),
+                'content_length': len(note_detail.get('content', '')),
+                'tags_count': len(note_detail.get('tags', []))
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ [{index}] 笔记解析失败: {note_id} - {str(e)}")
+            return {**result, 'success': False, 'error': str(e)}
+    
     def _crawl_single_note(self, note_data: Dict[str, Any], session_id: str, index: int) -> Dict[str, Any]:
         """爬取单个笔记的详细内容"""
         # 支持多种ID字段名格式
@@ -197,6 +324,8 @@ class BackendXHSCrawler:
             return {'note_id': None, 'success': False, 'error': '缺少笔记ID'}
         
         logger.info(f"🔍 [{index}] 开始爬取笔记: {note_id}")
+        started_at = time.time()
+        crawl_progress.note_started(session_id, note_id)
         
         # 重试机制
         for attempt in range(self.retry_count):
@@ -206,13 +335,14 @@ class BackendXHSCrawler:
                     time.sleep(attempt * 2)  # 递增延迟
                 
                 # 创建浏览器实例
-                driver = self._create_browser_instance()
+                with DRIVER_LAUNCH_SECONDS.time('backend'):
+                    driver = self._create_browser_instance()
                 if not driver:
                     raise Exception("无法创建浏览器实例")
                 
                 try:
-                    # 加载cookies
-                    self._load_cookies()
+                    # 预置cookies（在第一次导航前装入）
+                    self._load_cookies(driver)
                     
                     # 构建笔记URL（添加必要的xsec参数）
                     xsec_token = note_data.get('xsec_token', '')
@@ -236,7 +366,8 @@ class BackendXHSCrawler:
                     logger.debug(f"🌐 [{index}] 访问URL: {target_url}")
                     
                     # 访问笔记页面
-                    driver.get(target_url)
+                    with PAGE_NAVIGATION_SECONDS.time('backend'):
+                        driver.get(target_url)
                     
                     # 等待页面加载
                     WebDriverWait(driver, 10).until(
@@ -252,31 +383,16 @@ class BackendXHSCrawler:
                     # 保存页面源码
                     source_file = self._save_page_source(note_id, page_source, session_id, index)
                     
-                    # 解析页面内容
-                    note_detail = self._parse_note_content(page_source, note_id, session_id, index)
-                    
-                    # 下载图片
-                    images = self._download_note_images_from_source(page_source, note_id, session_id, index)
-                    note_detail['images'] = images
-                    
-                    # 保存笔记详情
-                    detail_file = self._save_note_detail(note_detail, note_id, session_id, index)
-                    
-                    logger.info(f"✅ [{index}] 笔记爬取完成: {note_id}")
-                    logger.info(f"📄 [{index}] 标题: {note_detail.get('title', 'N/A')[:50]}...")
-                    logger.info(f"📝 [{index}] 内容长度: {len(note_detail.get('content', ''))} 字符")
-                    logger.info(f"🏷️ [{index}] 标签数量: {len(note_detail.get('tags', []))}")
-                    logger.info(f"🖼️ [{index}] 图片数量: {len(images)}")
+                    # 解析交给进程池，浏览器线程立即返回去抓取下一个页面
+                    parse_future = self._submit_parse(page_source, source_file, note_id, session_id, index)
+                    logger.info(f"📤 [{index}] 页面已抓取，等待解析: {note_id}")
                     
                     return {
                         'note_id': note_id,
                         'success': True,
                         'source_file': source_file,
-                        'detail_file': detail_file,
-                        'images_count': len(images),
-                        'title': note_detail.get('title', ''),
-                        'content_length': len(note_detail.get('content', '')),
-                        'tags_count': len(note_detail.get('tags', []))
+                        'parse_future': parse_future,
+                        'started_at': started_at
                     }
                     
                 finally:
@@ -289,10 +405,11 @@ class BackendXHSCrawler:
                         'note_id': note_id,
                         'success': False,
                         'error': str(e),
-                        'attempts': attempt + 1
+                        'attempts': attempt + 1,
+                        'started_at': started_at
                     }
         
-        return {'note_id': note_id, 'success': False, 'error': '所有重试均失败'}
+        return {'note_id': note_id, 'success': False, 'error': '所有重试均失败', 'started_at': started_at}
     
     def _create_browser_instance(self):
         """创建浏览器实例"""
@@ -351,27 +468,11 @@ class BackendXHSCrawler:
             logger.error(f"创建浏览器实例失败: {str(e)}")
             return None
     
-    def _load_cookies(self):
-        """加载cookies"""
+    def _load_cookies(self, driver=None):
+        """把cookies预置到浏览器（默认 self.driver），不再先打开主页等待"""
         try:
-            if os.path.exists(self.cookies_file):
-                with open(self.cookies_file, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
-                
-                # 先访问小红书主页
-                self.driver.get("https://www.xiaohongshu.com")
-                time.sleep(2)
-                
-                # 添加cookies
-                for cookie in cookies:
-                    try:
-                        self.driver.add_cookie(cookie)
-                    except Exception as e:
-                        logger.debug(f"添加cookie失败: {e}")
-                
+            if prime_cookies_from_file(driver or self.driver, self.cookies_file):
                 logger.debug("✅ cookies加载完成")
-            else:
-                logger.warning("⚠️ cookies文件不存在")
         except Exception as e:
             logger.error(f"❌ 加载cookies失败: {str(e)}")
     
@@ -392,215 +493,9 @@ class BackendXHSCrawler:
             logger.error(f"保存页面源码失败: {str(e)}")
             return ""
     
-    def _parse_note_content(self, page_source: str, note_id: str, session_id: str, index: int) -> Dict[str, Any]:
-        """解析笔记内容"""
+    def _download_note_images(self, image_urls: List[str], note_id: str, session_id: str, index: int) -> List[Dict[str, str]]:
+        """下载解析阶段得到的笔记图片"""
         try:
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # 提取标题
-            title = self._extract_title(soup)
-            
-            # 提取内容
-            content = self._extract_content(soup)
-            
-            # 提取标签
-            tags = self._extract_tags(soup)
-            
-            # 提取作者信息
-            author = self._extract_author(soup)
-            
-            return {
-                'note_id': note_id,
-                'title': title,
-                'content': content,
-                'tags': tags,
-                'author': author,
-                'crawl_time': datetime.now().isoformat(),
-                'session_id': session_id,
-                'index': index
-            }
-            
-        except Exception as e:
-            logger.error(f"解析笔记内容失败: {str(e)}")
-            return {
-                'note_id': note_id,
-                'title': '解析失败',
-                'content': '解析失败',
-                'tags': [],
-                'author': '未知',
-                'error': str(e)
-            }
-    
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        """提取标题"""
-        try:
-            # 尝试多种选择器
-            title_selectors = [
-                'h1.title',
-                '.note-title',
-                '[data-testid="note-title"]',
-                'h1',
-                '.content-title',
-                'title'
-            ]
-            
-            for selector in title_selectors:
-                element = soup.select_one(selector)
-                if element and element.get_text(strip=True):
-                    title = element.get_text(strip=True)
-                    return title
-            
-            # 从页面title标签提取
-            title_tag = soup.find('title')
-            if title_tag:
-                title = title_tag.get_text(strip=True)
-                # 清理标题
-                title = title.replace(' - 小红书', '').replace(' | 小红书', '').strip()
-                if title:
-                    return title
-            
-            return "未找到标题"
-            
-        except Exception as e:
-            logger.error(f"提取标题失败: {str(e)}")
-            return "标题提取失败"
-    
-    def _extract_content(self, soup: BeautifulSoup) -> str:
-        """提取内容"""
-        try:
-            # 尝试多种选择器
-            content_selectors = [
-                '.note-content',
-                '.content-text',
-                '[data-testid="note-content"]',
-                '.desc',
-                '.note-desc',
-                '.content-desc'
-            ]
-            
-            for selector in content_selectors:
-                element = soup.select_one(selector)
-                if element and element.get_text(strip=True):
-                    content = element.get_text(strip=True)
-                    return content
-            
-            # 尝试从script标签中提取JSON数据
-            scripts = soup.find_all('script')
-            for script in scripts:
-                if script.string and 'window.__INITIAL_STATE__' in script.string:
-                    try:
-                        # 提取JSON数据
-                        json_start = script.string.find('{')
-                        json_end = script.string.rfind('}') + 1
-                        if json_start != -1 and json_end != -1:
-                            json_str = script.string[json_start:json_end]
-                            data = json.loads(json_str)
-                            
-                            # 在JSON中查找内容
-                            content = self._extract_content_from_json(data)
-                            if content:
-                                return content
-                    except:
-                        continue
-            
-            return "未找到内容"
-            
-        except Exception as e:
-            logger.error(f"提取内容失败: {str(e)}")
-            return "内容提取失败"
-    
-    def _extract_content_from_json(self, data: dict) -> str:
-        """从JSON数据中提取内容"""
-        try:
-            def search_content(obj, path=""):
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        if key in ['desc', 'content', 'text', 'title'] and isinstance(value, str) and len(value) > 10:
-                            return value
-                        result = search_content(value, f"{path}.{key}")
-                        if result:
-                            return result
-                elif isinstance(obj, list):
-                    for i, item in enumerate(obj):
-                        result = search_content(item, f"{path}[{i}]")
-                        if result:
-                            return result
-                return None
-            
-            return search_content(data) or ""
-            
-        except Exception as e:
-            logger.error(f"从JSON提取内容失败: {str(e)}")
-            return ""
-    
-    def _extract_tags(self, soup: BeautifulSoup) -> List[str]:
-        """提取标签"""
-        try:
-            tags = []
-            
-            # 尝试多种选择器
-            tag_selectors = [
-                '.tag',
-                '.hashtag',
-                '.topic',
-                '[data-testid="tag"]',
-                '.note-tag',
-                '.topic-tag'
-            ]
-            
-            for selector in tag_selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    tag_text = element.get_text(strip=True)
-                    if tag_text and tag_text not in tags:
-                        # 清理标签文本
-                        tag_text = tag_text.replace('#', '').strip()
-                        if tag_text:
-                            tags.append(tag_text)
-            
-            # 从文本中提取#标签
-            text_content = soup.get_text()
-            hashtag_pattern = r'#([^#\s]+)'
-            import re
-            hashtags = re.findall(hashtag_pattern, text_content)
-            for tag in hashtags:
-                if tag not in tags:
-                    tags.append(tag)
-            
-            return tags[:10]  # 最多返回10个标签
-            
-        except Exception as e:
-            logger.error(f"提取标签失败: {str(e)}")
-            return []
-    
-    def _extract_author(self, soup: BeautifulSoup) -> str:
-        """提取作者信息"""
-        try:
-            # 尝试多种选择器
-            author_selectors = [
-                '.author-name',
-                '.user-name',
-                '[data-testid="author"]',
-                '.note-author',
-                '.username'
-            ]
-            
-            for selector in author_selectors:
-                element = soup.select_one(selector)
-                if element and element.get_text(strip=True):
-                    author = element.get_text(strip=True)
-                    return author
-            
-            return "未知作者"
-            
-        except Exception as e:
-            logger.error(f"提取作者失败: {str(e)}")
-            return "作者提取失败"
-    
-    def _download_note_images_from_source(self, page_source: str, note_id: str, session_id: str, index: int) -> List[Dict[str, str]]:
-        """从页面源码下载笔记图片"""
-        try:
-            soup = BeautifulSoup(page_source, 'html.parser')
             images = []
             
             # 创建图片目录
@@ -608,24 +503,7 @@ class BackendXHSCrawler:
             images_dir = os.path.join(session_dir, f"{index:03d}_{note_id}_images")
             os.makedirs(images_dir, exist_ok=True)
             
-            # 查找图片元素
-            img_elements = soup.find_all('img')
-            
-            for i, img in enumerate(img_elements):
-                src = img.get('src') or img.get('data-src') or img.get('data-original')
-                if not src:
-                    continue
-                
-                # 过滤掉小图标和无关图片
-                if any(keyword in src.lower() for keyword in ['icon', 'avatar', 'logo', 'button']):
-                    continue
-                
-                # 确保是完整URL
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    src = 'https://www.xiaohongshu.com' + src
-                
+            for i, src in enumerate(image_urls):
                 # 下载图片
                 image_info = self._download_single_image(src, images_dir, f"{index:03d}_{note_id}_{i}")
                 if image_info:
@@ -640,6 +518,7 @@ class BackendXHSCrawler:
     
     def _download_single_image(self, url: str, save_dir: str, filename_prefix: str) -> Optional[Dict[str, str]]:
         """下载单张图片"""
+        started = time.perf_counter()
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -666,33 +545,33 @@ class BackendXHSCrawler:
             with open(file_path, 'wb') as f:
                 f.write(response.content)
             
-            # 生成Web访问路径
-            relative_path = os.path.relpath(file_path, self.temp_dir)
-            web_path = f"/temp/{relative_path.replace(os.sep, '/')}"
+            IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - started, 'backend', 'success')
+            IMAGE_DOWNLOAD_BYTES.inc('backend', amount=len(response.content))
+            
+            # 生成Web访问路径（与 /cache/notes/<path> 静态路由对应）
+            relative_path = os.path.relpath(file_path, self.notes_dir)
+            web_path = f"/cache/notes/{relative_path.replace(os.sep, '/')}"
             
             return {
                 'original_url': url,
                 'local_path': file_path,
                 'web_path': web_path,
-                'filename': filename
+                'filename': filename,
+                'size': len(response.content)
             }
             
         except Exception as e:
+            IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - started, 'backend', 'failure')
             logger.debug(f"下载图片失败 {url}: {str(e)}")
             return None
     
     def _save_note_detail(self, note_detail: Dict[str, Any], note_id: str, session_id: str, index: int) -> str:
-        """保存笔记详情"""
+        """保存笔记详情（追加到笔记归档，不再单独写文件）"""
         try:
-            filename = f"{index:03d}_{note_id}_detail.json"
-            session_dir = os.path.join(self.notes_dir, f"batch_{session_id}")
-            file_path = os.path.join(session_dir, filename)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(note_detail, f, ensure_ascii=False, indent=2)
+            location = note_archive.append(note_id, KIND_DETAIL, note_detail, session_id=session_id)
             
-            logger.debug(f"笔记详情已保存: {file_path}")
-            return file_path
+            logger.debug(f"笔记详情已归档: {location}")
+            return location
             
         except Exception as e:
             logger.error(f"保存笔记详情失败: {str(e)}")
@@ -826,7 +705,8 @@ class BackendXHSCrawler:
             if self.driver:
                 self.driver.quit()
             
-            self.driver = self.create_stealth_driver()
+            with DRIVER_LAUNCH_SECONDS.time('backend'):
+                self.driver = self.create_stealth_driver()
             
             # 加载cookies
             self._load_cookies()
@@ -837,7 +717,8 @@ class BackendXHSCrawler:
             logger.info(f"🌐 正在访问笔记页面: {note_url}")
             
             # 访问页面
-            self.driver.get(note_url)
+            with PAGE_NAVIGATION_SECONDS.time('backend'):
+                self.driver.get(note_url)
             
             # 模拟人类浏览行为
             self.simulate_human_behavior(self.driver)
@@ -869,7 +750,7 @@ class BackendXHSCrawler:
             content = self._extract_note_details()
             
             # 保存页面源码用于调试
-            self._save_page_source(note_url, session_id)
+            self._save_debug_page_source(note_url, session_id)
             
             logger.info(f"✅ 成功提取笔记内容")
             return content
@@ -896,13 +777,30 @@ class BackendXHSCrawler:
         total_notes = len(note_links)
         
         logger.info(f"📋 开始批量提取 {total_notes} 个笔记内容（人为行为模式）")
+        crawl_progress.start_session(session_id, total_notes)
         
         for i, note_url in enumerate(note_links, 1):
             try:
                 logger.info(f"📖 正在处理第 {i}/{total_notes} 个笔记")
+                note_started_at = time.time()
+                crawl_progress.note_started(session_id, note_url)
                 
                 # 提取笔记内容（带重试机制）
-                content = self.extract_note_content_with_retry(note_url, session_id)
+                try:
+                    content = self.extract_note_content_with_retry(note_url, session_id)
+                except BaseException as e:
+                    # 出错或被中断时也结束该笔记的进度，否则进度中一直显示为运行中
+                    crawl_progress.note_finished(
+                        session_id, note_url, False,
+                        duration=time.time() - note_started_at,
+                        error=str(e) or type(e).__name__
+                    )
+                    raise
+                crawl_progress.note_finished(
+                    session_id, note_url, bool(content),
+                    duration=time.time() - note_started_at,
+                    error=None if content else '提取失败'
+                )
                 
                 if content:
                     results.append({
@@ -910,6 +808,16 @@ class BackendXHSCrawler:
                         'content': content,
                         'extracted_at': datetime.now().isoformat()
                     })
+                    note_id = note_url.split('?')[0].rstrip('/').split('/')[-1]
+                    try:
+                        canonical = near_duplicate_index.add(note_id, content)
+                        if canonical != note_id:
+                            content['duplicate_of'] = canonical
+                        note_archive.append(note_id, KIND_DETAIL, {'url': note_url, **content}, session_id=session_id)
+                        note_search_index.add_note(note_id, content, source=KIND_DETAIL)
+                        keyword_model.add_document(note_id, content)
+                    except Exception as e:
+                        logger.warning(f"⚠️ 笔记归档失败: {note_id} - {str(e)}")
                     logger.info(f"✅ 第 {i} 个笔记提取成功")
                 else:
                     logger.warning(f"❌ 第 {i} 个笔记提取失败")
@@ -936,6 +844,7 @@ class BackendXHSCrawler:
         
         # 保存结果
         self._save_batch_results(results, session_id)
+        crawl_progress.finish_session(session_id)
         
         return results
 
@@ -985,7 +894,7 @@ class BackendXHSCrawler:
             logger.error(f"❌ 提取笔记详情失败: {str(e)}")
             return {}
     
-    def _save_page_source(self, note_url, session_id):
+    def _save_debug_page_source(self, note_url, session_id):
         """保存页面源码用于调试"""
         try:
             # 从URL中提取note_id
@@ -1011,7 +920,7 @@ class BackendXHSCrawler:
             filepath = os.path.join(self.notes_dir, filename)
             
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+                json.dump(results, f, ensure_ascii=False)
             
             logger.info(f"💾 批量提取结果已保存: {filepath}")
             
@@ -1037,11 +946,21 @@ def start_backend_crawl(notes_data: List[Dict[str, Any]], session_id: str = None
         
         # 提取笔记链接并添加必要的xsec参数
         note_links = []
+        batch_canonicals = set()
+        skipped_duplicates = 0
         for note in notes_data:
             note_url = None
             xsec_token = note.get('xsec_token', '')
             note_id = note.get('note_id') or note.get('id', '')
             
+            # 跳过近似重复的笔记：同组笔记已在本批次中，或已有归档详情
+            canonical = near_duplicate_index.find_duplicate(note_id, note) if note_id else None
+            if canonical and (canonical in batch_canonicals or note_archive.get_record(canonical, KIND_DETAIL)):
+                logger.info(f"🧬 跳过近似重复笔记: {note_id} -> {canonical}")
+                skipped_duplicates += 1
+                continue
+            batch_canonicals.add(canonical or note_id)
+            
             # 获取基础URL
             if 'link' in note and note['link']:
                 note_url = note['link']
@@ -1064,8 +983,22 @@ def start_backend_crawl(notes_data: List[Dict[str, Any]], session_id: str = None
                 
                 note_links.append(note_url)
         
+        if not note_links and skipped_duplicates:
+            logger.info(f"✅ 全部 {skipped_duplicates} 篇笔记均为近似重复，无需爬取")
+            crawl_progress.finish_session(session_id)
+            return {
+                'success': True,
+                'total_crawled': 0,
+                'success_count': 0,
+                'failed_count': 0,
+                'skipped_duplicates': skipped_duplicates,
+                'results': [],
+                'session_id': session_id
+            }
+        
         if not note_links:
             logger.warning("⚠️ 没有找到有效的笔记链接")
+            crawl_progress.finish_session(session_id, success=False, error='没有有效的笔记链接')
             return {
                 'success': False,
                 'error': '没有有效的笔记链接',
@@ -1085,12 +1018,14 @@ def start_backend_crawl(notes_data: List[Dict[str, Any]], session_id: str = None
             'total_crawled': len(note_links),
             'success_count': success_count,
             'failed_count': failed_count,
+            'skipped_duplicates': skipped_duplicates,
             'results': results,
             'session_id': session_id
         }
         
     except Exception as e:
         logger.error(f"❌ 后台爬虫任务失败: {str(e)}")
+        crawl_progress.finish_session(session_id, success=False, error=str(e))
         return {
             'success': False,
             'error': str(e),
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享浏览器池
+启动一个无头Chrome并加载Cookie需要数秒，按需抓取单篇笔记时不应每次都重新启动：
+1. 借出/归还 - acquire() 优先复用空闲的浏览器，没有空闲时才新建，同时使用的数量受上限约束
+2. 回收 - 空闲过久、使用次数过多或已失去响应的浏览器在借出前关闭并重建
+3. Cookie - 新建的浏览器只在创建时预置一次Cookie（见 cookie_priming）
+4. 预热/保活 - prewarm() 在请求到来前启动浏览器，keepalive() 定期检查空闲浏览器并补齐数量
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from src.server.metrics import DRIVER_LAUNCH_SECONDS, CACHE_REQUESTS, BROWSER_HEALTH_PINGS
+from src.crawler.cookie_priming import prime_cookies_from_file
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# 按顺序尝试的ChromeDriver路径，都不存在时使用系统PATH中的chromedriver
+DRIVER_PATHS = [
+    'drivers/chromedriver-mac-arm64/chromedriver',
+    'drivers/chromedriver',
+    '/usr/local/bin/chromedriver',
+    '/opt/homebrew/bin/chromedriver'
+]
+
+
+def create_headless_driver():
+    """创建无头Chrome浏览器实例（Selenium在首次启动浏览器时才导入，不计入服务启动时间）"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-web-security')
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument(f'--user-agent={DEFAULT_USER_AGENT}')
+
+    for driver_path in DRIVER_PATHS:
+        if os.path.exists(driver_path):
+            from selenium.webdriver.chrome.service import Service
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+
+    return webdriver.Chrome(options=chrome_options)
+
+
+def load_cookies_to_driver(driver, cookies_file: str) -> bool:
+    """把Cookie文件预置到新启动的浏览器（第一次导航前通过CDP装入，不需要先打开主页）"""
+    return prime_cookies_from_file(driver, cookies_file)
+
+
+class _PooledDriver:
+    """池中浏览器及其使用记录"""
+
+    __slots__ = ('driver', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.time()
+        # 最近一次使用或保活检查通过的时间
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class BrowserPool:
+    """可复用的无头浏览器池"""
+
+    def __init__(self, max_size: int = 2, idle_timeout: float = 300, max_uses: int = 50,
+                 cookies_file: str = os.path.join('cache', 'cookies', 'xiaohongshu_cookies.json'),
+                 driver_factory: Callable[[], Any] = create_headless_driver, component: str = 'pool'):
+        """
+        初始化浏览器池（浏览器在首次借出时才启动）
+
+        Args:
+            max_size: 同时存在的浏览器数量上限
+            idle_timeout: 空闲超过该秒数的浏览器在下次借出前关闭重建
+            max_uses: 单个浏览器最多使用次数，超过后重建（避免内存持续增长）
+            cookies_file: 新建浏览器时加载的Cookie文件
+            driver_factory: 浏览器创建函数
+            component: 启动耗时指标中的组件名
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.cookies_file = cookies_file
+        self.driver_factory = driver_factory
+        self.component = component
+
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # 预热后保持的空闲浏览器数量（keepalive 关闭失效浏览器后补齐到该数量）
+        self._warm_size = 0
+        self._stats = {'launched': 0, 'reused': 0, 'retired': 0, 'in_use': 0, 'pings': 0, 'ping_failures': 0}
+
+    def _launch(self) -> _PooledDriver:
+        """启动新浏览器并加载Cookie"""
+        with DRIVER_LAUNCH_SECONDS.time(self.component):
+            driver = self.driver_factory()
+        try:
+            load_cookies_to_driver(driver, self.cookies_file)
+        except Exception as e:
+            logger.error(f"加载cookies失败: {str(e)}")
+        with self._lock:
+            self._stats['launched'] += 1
+        CACHE_REQUESTS.inc('browser_pool', 'miss')
+        logger.info("🚀 浏览器池启动了新的浏览器实例")
+        return _PooledDriver(driver)
+
+    @staticmethod
+    def _is_alive(pooled: _PooledDriver) -> bool:
+        """浏览器进程是否仍在运行"""
+        try:
+            # 浏览器进程退出后访问任意属性都会抛出异常
+            pooled.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _is_usable(self, pooled: _PooledDriver) -> bool:
+        """检查空闲浏览器是否仍可复用"""
+        if time.time() - pooled.last_used > self.idle_timeout or pooled.uses >= self.max_uses:
+            return False
+        return self._is_alive(pooled)
+
+    def _retire(self, pooled: _PooledDriver):
+        """关闭浏览器"""
+        with self._lock:
+            self._stats['retired'] += 1
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.debug(f"关闭浏览器失败: {str(e)}")
+
+    def _checkout(self) -> _PooledDriver:
+        """取出一个可用的浏览器（调用方已获得名额）"""
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                return self._launch()
+            if self._is_usable(pooled):
+                with self._lock:
+                    self._stats['reused'] += 1
+                CACHE_REQUESTS.inc('browser_pool', 'hit')
+                return pooled
+            self._retire(pooled)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = 60):
+        """
+        借出一个浏览器，with 块结束时自动归还；块内抛出异常时浏览器被关闭而不是归还
+
+        Args:
+            timeout: 等待空闲名额的最长秒数
+
+        Yields:
+            WebDriver实例
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"等待浏览器超时（{timeout}秒）")
+
+        pooled = None
+        healthy = False
+        try:
+            pooled = self._checkout()
+            with self._lock:
+                self._stats['in_use'] += 1
+            yield pooled.driver
+            healthy = True
+        finally:
+            if pooled is not None:
+                with self._lock:
+                    self._stats['in_use'] -= 1
+                pooled.uses += 1
+                pooled.last_used = time.time()
+                if healthy and pooled.uses < self.max_uses:
+                    with self._lock:
+                        self._idle.append(pooled)
+                else:
+                    self._retire(pooled)
+            self._slots.release()
+
+    # ==================== 预热与保活 ====================
+
+    def prewarm(self, count: int = None) -> int:
+        """
+        提前启动浏览器并加载Cookie放入空闲队列，之后 keepalive 会维持这个数量
+
+        Args:
+            count: 预热的浏览器数量（默认 max_size）
+
+        Returns:
+            本次启动的浏览器数量
+        """
+        count = self.max_size if count is None else min(count, self.max_size)
+        with self._lock:
+            self._warm_size = max(self._warm_size, count)
+        return self._replenish()
+
+    def _replenish(self) -> int:
+        """把空闲浏览器补齐到预热数量（名额都被借出时不补）"""
+        launched = 0
+        while True:
+            with self._lock:
+                if len(self._idle) + self._stats['in_use'] >= self._warm_size:
+                    return launched
+            if not self._slots.acquire(blocking=False):
+                return launched
+            try:
+                pooled = self._launch()
+                with self._lock:
+                    self._idle.append(pooled)
+                launched += 1
+            finally:
+                self._slots.release()
+
+    def keepalive(self) -> Dict[str, int]:
+        """
+        检查空闲浏览器：仍在运行的刷新空闲计时，已退出或达到使用次数上限的关闭，再补齐到预热数量
+
+        Returns:
+            本次检查的 alive / retired / launched 数量
+        """
+        with self._lock:
+            idle = list(self._idle)
+
+        result = {'alive': 0, 'retired': 0, 'launched': 0}
+        for pooled in idle:
+            alive = pooled.uses < self.max_uses and self._is_alive(pooled)
+            BROWSER_HEALTH_PINGS.inc(self.component, 'ok' if alive else 'failed')
+            with self._lock:
+                self._stats['pings'] += 1
+                if not alive:
+                    self._stats['ping_failures'] += 1
+                # 检查期间已被借出的浏览器由借用方负责
+                if pooled not in self._idle:
+                    continue
+                if alive:
+                    pooled.last_used = time.time()
+                else:
+                    self._idle.remove(pooled)
+            if alive:
+                result['alive'] += 1
+            else:
+                self._retire(pooled)
+                result['retired'] += 1
+
+        result['launched'] = self._replenish()
+        return result
+
+    def shutdown(self):
+        """关闭所有空闲浏览器（借出中的浏览器归还后会正常进入空闲队列）"""
+        with self._lock:
+            self._warm_size = 0
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            self._retire(pooled)
+        if idle:
+            logger.info(f"🛑 浏览器池已关闭 {len(idle)} 个浏览器")
+
+    def stats(self) -> Dict[str, int]:
+        """浏览器池统计信息"""
+        with self._lock:
+            return {**self._stats, 'idle': len(self._idle), 'max_size': self.max_size, 'warm_size': self._warm_size}
+
+
+# 全局浏览器池实例
+browser_pool = BrowserPool()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浏览器预热与保活
+首个搜索要等待启动Chrome、加载Cookie（打开主页、刷新、等待）十几秒，部署或崩溃重启后尤其明显：
+1. 预热 - 服务启动后在后台启动搜索爬虫的浏览器，并按配置预热浏览器池
+2. 保活 - 定期检查浏览器是否仍在运行，已退出的浏览器立即重建，而不是等到下一个请求才发现
+3. 健康状态 - 最近一次检查的结果通过 stats() 提供给健康检查接口
+
+Web进程（CRAWL_TIER=inline）在后台线程中运行；爬虫工作进程在启动时预热、空闲时保活，
+与任务处理在同一线程，不会和正在执行的搜索同时操作浏览器
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.crawler.browser_pool import browser_pool
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认保活检查间隔（秒）
+DEFAULT_KEEPALIVE_INTERVAL = 60
+
+# 默认预热的浏览器池数量
+DEFAULT_PREWARM_POOL = 1
+
+
+class BrowserWarmup:
+    """搜索爬虫浏览器和浏览器池的预热与保活"""
+
+    def __init__(self, crawler_factory: Callable[[], Any] = None, current_crawler: Callable[[], Any] = None,
+                 pool=browser_pool, prewarm: bool = True, pool_size: int = DEFAULT_PREWARM_POOL,
+                 interval: float = DEFAULT_KEEPALIVE_INTERVAL):
+        """
+        Args:
+            crawler_factory: 返回搜索爬虫（不存在时创建）的函数，预热时调用
+            current_crawler: 返回已创建的搜索爬虫（未创建时返回None）的函数，保活时调用
+            pool: 浏览器池
+            prewarm: 是否在启动时预热
+            pool_size: 预热的浏览器池数量（0表示不预热浏览器池）
+            interval: 保活检查间隔（秒，0表示不做保活）
+        """
+        self.crawler_factory = crawler_factory
+        self.current_crawler = current_crawler
+        self.pool = pool
+        self.prewarm_enabled = prewarm
+        self.pool_size = pool_size
+        self.interval = interval
+
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'prewarmed': False,
+            'prewarm_seconds': None,
+            'last_keepalive': None,
+            'search_browser': 'not_started',
+            'keepalive_runs': 0,
+            'restarts': 0,
+        }
+
+    # ==================== 预热 ====================
+
+    def prewarm(self) -> bool:
+        """
+        启动搜索爬虫的浏览器并预热浏览器池
+
+        Returns:
+            搜索爬虫的浏览器是否已启动
+        """
+        started = time.perf_counter()
+        search_ready = False
+        try:
+            crawler = self.crawler_factory() if self.crawler_factory else None
+            if crawler is not None:
+                search_ready = bool(crawler.warm_up())
+        except Exception as e:
+            logger.warning(f"搜索爬虫预热失败: {str(e)}")
+
+        try:
+            if self.pool_size > 0:
+                self.pool.prewarm(self.pool_size)
+        except Exception as e:
+            logger.warning(f"浏览器池预热失败: {str(e)}")
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['prewarmed'] = True
+            self._stats['prewarm_seconds'] = round(elapsed, 2)
+            # 预热即视为一次检查，下次保活在一个间隔之后
+            self._stats['last_keepalive'] = time.time()
+            if search_ready:
+                self._stats['search_browser'] = 'alive'
+        logger.info(f"🔥 浏览器预热完成，耗时 {elapsed:.2f} 秒（搜索浏览器: {'已启动' if search_ready else '未启动'}）")
+        return search_ready
+
+    # ==================== 保活 ====================
+
+    def keepalive(self) -> Dict[str, Any]:
+        """检查搜索爬虫浏览器和浏览器池，已退出的浏览器重建"""
+        crawler = self.current_crawler() if self.current_crawler else None
+        search_state = 'not_started'
+        restarted = False
+        if crawler is not None:
+            if crawler.ping():
+                search_state = 'alive'
+            elif self.prewarm_enabled:
+                # 浏览器已退出（或还没启动成功），立即重建，下一个搜索不用等待
+                restarted = bool(crawler.warm_up())
+                search_state = 'alive' if restarted else 'dead'
+            else:
+                search_state = 'dead'
+
+        try:
+            pool_result = self.pool.keepalive()
+        except Exception as e:
+            logger.warning(f"浏览器池保活失败: {str(e)}")
+            pool_result = {}
+
+        with self._lock:
+            self._stats['last_keepalive'] = time.time()
+            self._stats['search_browser'] = search_state
+            self._stats['keepalive_runs'] += 1
+            self._stats['restarts'] += int(restarted) + pool_result.get('launched', 0)
+        if restarted or pool_result.get('retired'):
+            logger.info(f"♻️ 浏览器保活: 搜索浏览器 {search_state}, 浏览器池 {pool_result}")
+        return {'search_browser': search_state, 'pool': pool_result}
+
+    def keepalive_if_due(self) -> bool:
+        """距上次保活检查超过间隔时执行一次（爬虫工作进程空闲时调用）"""
+        if self.interval <= 0:
+            return False
+        with self._lock:
+            last = self._stats['last_keepalive'] or 0
+        if time.time() - last < self.interval:
+            return False
+        self.keepalive()
+        return True
+
+    # ==================== 后台运行 ====================
+
+    def _run(self):
+        """后台线程：先预热，再定期保活"""
+        if self.prewarm_enabled:
+            self.prewarm()
+        while self.interval > 0 and not self._stopped.wait(self.interval):
+            try:
+                self.keepalive()
+            except Exception as e:
+                logger.warning(f"浏览器保活失败: {str(e)}")
+
+    def start(self) -> bool:
+        """在后台线程运行预热和保活（重复调用只会启动一次）"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run, name='browser-warmup', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """预热与保活状态"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['prewarm'] = self.prewarm_enabled
+        stats['keepalive_interval'] = self.interval
+        stats['pool'] = self.pool.stats()
+        return stats
+
+
+def browser_warmup_from_env(crawler_factory: Callable[[], Any] = None,
+                            current_crawler: Callable[[], Any] = None) -> Optional[BrowserWarmup]:
+    """
+    根据环境变量创建预热与保活（都关闭时返回None）
+
+    环境变量:
+        BROWSER_PREWARM: true 时在启动时预热浏览器（默认关闭）
+        BROWSER_PREWARM_POOL: 预热的浏览器池数量（默认1）
+        BROWSER_KEEPALIVE_INTERVAL: 保活检查间隔（秒，默认60，0表示关闭）
+    """
+    prewarm = os.environ.get('BROWSER_PREWARM', 'false').lower() == 'true'
+    interval = float(os.environ.get('BROWSER_KEEPALIVE_INTERVAL', DEFAULT_KEEPALIVE_INTERVAL))
+    if not prewarm and interval <= 0:
+        return None
+    return BrowserWarmup(
+        crawler_factory=crawler_factory,
+        current_crawler=current_crawler,
+        prewarm=prewarm,
+        pool_size=int(os.environ.get('BROWSER_PREWARM_POOL', DEFAULT_PREWARM_POOL)),
+        interval=interval,
+    )
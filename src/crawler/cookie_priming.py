@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浏览器Cookie预置
+Selenium 的 add_cookie 只能给当前页面所在域名添加Cookie，原来每启动一个浏览器都要先打开一次主页
+（搜索爬虫还要再刷新一次并固定等待5秒）才能装入Cookie：
+1. CDP预置 - 通过 DevTools 的 Network.setCookies 在第一次导航前一次装入全部Cookie，不需要打开任何页面
+2. 文件缓存 - Cookie文件按修改时间缓存解析结果，多个浏览器启动时不重复读取
+3. 兼容退回 - 驱动不支持CDP（非Chromium浏览器、远程驱动）时退回打开主页后 add_cookie，但不再刷新和固定等待
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+XHS_BASE_URL = 'https://www.xiaohongshu.com'
+
+# Selenium 保存的Cookie字段 -> CDP Network.CookieParam 字段
+_CDP_FIELDS = {
+    'name': 'name',
+    'value': 'value',
+    'domain': 'domain',
+    'path': 'path',
+    'secure': 'secure',
+    'httpOnly': 'httpOnly',
+    'expiry': 'expires',
+    'expires': 'expires',
+}
+
+_SAME_SITE_VALUES = {'strict': 'Strict', 'lax': 'Lax', 'none': 'None'}
+
+# Cookie文件路径 -> (修改时间, Cookie列表)
+_cookie_file_cache = {}
+_cookie_file_lock = threading.Lock()
+
+
+def load_cookie_file(cookies_file: str) -> List[Dict[str, Any]]:
+    """
+    读取Cookie文件（按修改时间缓存，文件更新后重新读取）
+
+    Returns:
+        Cookie列表，文件不存在或格式错误时返回空列表
+    """
+    try:
+        mtime = os.path.getmtime(cookies_file)
+    except OSError:
+        return []
+
+    with _cookie_file_lock:
+        cached = _cookie_file_cache.get(cookies_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    try:
+        with open(cookies_file, 'r', encoding='utf-8') as f:
+            cookies = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"读取Cookie文件失败: {str(e)}")
+        return []
+    if not isinstance(cookies, list):
+        return []
+
+    with _cookie_file_lock:
+        _cookie_file_cache[cookies_file] = (mtime, cookies)
+    return cookies
+
+
+def to_cdp_cookie(cookie: Dict[str, Any], base_url: str = XHS_BASE_URL) -> Optional[Dict[str, Any]]:
+    """把 Selenium get_cookies() 格式的Cookie转换为 Network.setCookies 的参数（缺少名称时返回None）"""
+    if not cookie.get('name'):
+        return None
+    param = {_CDP_FIELDS[key]: value for key, value in cookie.items() if key in _CDP_FIELDS and value is not None}
+    param['value'] = str(param.get('value', ''))
+    if 'expires' in param:
+        param['expires'] = float(param['expires'])
+    same_site = _SAME_SITE_VALUES.get(str(cookie.get('sameSite', '')).lower())
+    if same_site:
+        param['sameSite'] = same_site
+    # 没有域名的Cookie按站点地址设置
+    if not param.get('domain'):
+        param.pop('domain', None)
+        param['url'] = base_url
+    return param
+
+
+def _add_cookies_via_page(driver, cookies: List[Dict[str, Any]], base_url: str) -> int:
+    """退回方式：打开站点页面后逐个 add_cookie"""
+    driver.get(base_url)
+    added = 0
+    for cookie in cookies:
+        try:
+            driver.add_cookie({key: value for key, value in cookie.items()
+                               if key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry')})
+            added += 1
+        except Exception as e:
+            logger.debug(f"添加cookie失败: {cookie.get('name', '未知')} - {str(e)}")
+    return added
+
+
+def prime_cookies(driver, cookies: List[Dict[str, Any]], base_url: str = XHS_BASE_URL) -> bool:
+    """
+    在浏览器第一次导航前装入Cookie
+
+    Args:
+        driver: WebDriver实例
+        cookies: Selenium get_cookies() 格式的Cookie列表
+        base_url: 没有域名的Cookie所属站点（退回方式下打开的页面）
+
+    Returns:
+        是否装入了Cookie
+    """
+    if not cookies:
+        return False
+
+    params = [param for param in (to_cdp_cookie(cookie, base_url) for cookie in cookies) if param]
+    try:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': params})
+        logger.info(f"🍪 已通过CDP预置 {len(params)} 个cookie")
+        return True
+    except Exception as e:
+        logger.debug(f"CDP预置cookie不可用，改为打开主页添加: {str(e)}")
+
+    added = _add_cookies_via_page(driver, cookies, base_url)
+    logger.info(f"🍪 已在主页添加 {added} 个cookie")
+    return added > 0
+
+
+def prime_cookies_from_file(driver, cookies_file: str, base_url: str = XHS_BASE_URL) -> bool:
+    """读取Cookie文件并预置到浏览器（文件不存在时返回False）"""
+    cookies = load_cookie_file(cookies_file)
+    if not cookies:
+        logger.warning(f"Cookie文件不存在或为空: {cookies_file}")
+        return False
+    return prime_cookies(driver, cookies, base_url)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台爬虫进度注册表
+爬虫在运行过程中发布结构化进度事件，服务器直接从内存中读取状态，无需扫描磁盘
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+# 状态常量
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED)
+
+
+class CrawlProgressRegistry:
+    """线程安全的后台爬虫进度注册表"""
+
+    def __init__(self, max_sessions: int = 200, max_events: int = 50):
+        """
+        初始化注册表
+
+        Args:
+            max_sessions: 最多保留的会话数量（超出后淘汰最早的会话）
+            max_events: 每个会话保留的最近事件数量
+        """
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._max_sessions = max_sessions
+        self._max_events = max_events
+
+    def _touch(self, state: Dict[str, Any], event: Dict[str, Any]):
+        """记录事件并唤醒等待中的订阅者（调用方需持有锁）"""
+        now = time.time()
+        event['timestamp'] = now
+        state['events'].append(event)
+        state['updated_at'] = now
+        state['version'] += 1
+        self._condition.notify_all()
+
+    def _get_or_create(self, session_id: str) -> Dict[str, Any]:
+        """获取会话状态，不存在时创建（调用方需持有锁）"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            now = time.time()
+            state = {
+                'session_id': session_id,
+                'status': STATUS_QUEUED,
+                'total_notes': 0,
+                'running_count': 0,
+                'success_count': 0,
+                'failed_count': 0,
+                'bytes_downloaded': 0,
+                'total_note_seconds': 0.0,
+                'queued_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'updated_at': now,
+                'error': None,
+                'version': 0,
+                'events': deque(maxlen=self._max_events),
+            }
+            self._sessions[session_id] = state
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+        return state
+
+    def queue_session(self, session_id: str, total_notes: int):
+        """登记排队中的爬取任务"""
+        with self._lock:
+            state = self._get_or_create(session_id)
+            state['total_notes'] = total_notes
+            self._touch(state, {'type': STATUS_QUEUED, 'total_notes': total_notes})
+
+    def start_session(self, session_id: str, total_notes: int):
+        """标记任务开始运行"""
+        with self._lock:
+            state = self._get_or_create(session_id)
+            state['status'] = STATUS_RUNNING
+            state['total_notes'] = total_notes
+            state['started_at'] = time.time()
+            self._touch(state, {'type': STATUS_RUNNING, 'total_notes': total_notes})
+
+    def note_started(self, session_id: str, note_id: str):
+        """标记单篇笔记开始爬取"""
+        with self._lock:
+            state = self._get_or_create(session_id)
+            state['running_count'] += 1
+            self._touch(state, {'type': 'note_started', 'note_id': note_id})
+
+    def note_finished(self, session_id: str, note_id: str, success: bool,
+                      bytes_downloaded: int = 0, duration: float = 0.0, error: str = None):
+        """
+        记录单篇笔记的爬取结果
+
+        Args:
+            session_id: 会话ID
+            note_id: 笔记ID
+            success: 是否成功
+            bytes_downloaded: 下载的字节数（页面源码+图片）
+            duration: 耗时（秒）
+            error: 失败原因
+        """
+        with self._lock:
+            state = self._get_or_create(session_id)
+            state['running_count'] = max(0, state['running_count'] - 1)
+            if success:
+                state['success_count'] += 1
+            else:
+                state['failed_count'] += 1
+            state['bytes_downloaded'] += bytes_downloaded
+            state['total_note_seconds'] += duration
+            event = {
+                'type': 'note_success' if success else 'note_failure',
+                'note_id': note_id,
+                'bytes': bytes_downloaded,
+                'duration_seconds': round(duration, 3),
+            }
+            if error:
+                event['error'] = error
+            self._touch(state, event)
+
+    def finish_session(self, session_id: str, success: bool = True, error: str = None):
+        """标记任务结束"""
+        with self._lock:
+            state = self._get_or_create(session_id)
+            state['status'] = STATUS_COMPLETED if success else STATUS_FAILED
+            state['running_count'] = 0
+            state['finished_at'] = time.time()
+            state['error'] = error
+            self._touch(state, {'type': state['status'], 'error': error} if error else {'type': state['status']})
+
+    def _snapshot(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """生成状态快照（调用方需持有锁）"""
+        snapshot = {key: value for key, value in state.items() if key != 'events'}
+        finished = state['success_count'] + state['failed_count']
+        snapshot['finished_count'] = finished
+        snapshot['progress_percent'] = finished / state['total_notes'] * 100 if state['total_notes'] else 0
+        snapshot['avg_note_seconds'] = state['total_note_seconds'] / finished if finished else 0
+        snapshot['recent_events'] = list(state['events'])
+        return snapshot
+
+    def get_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取会话状态快照
+
+        Returns:
+            状态快照，会话不存在时返回None
+        """
+        with self._lock:
+            state = self._sessions.get(session_id)
+            return self._snapshot(state) if state else None
+
+    def wait_for_update(self, session_id: str, since_version: int, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        阻塞等待会话状态更新（用于SSE推送）
+
+        Args:
+            session_id: 会话ID
+            since_version: 调用方已知的版本号
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            新的状态快照；超时或会话不存在时返回当前快照或None
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: session_id in self._sessions and self._sessions[session_id]['version'] > since_version,
+                timeout=timeout
+            )
+            state = self._sessions.get(session_id)
+            return self._snapshot(state) if state else None
+
+
+# 全局进度注册表实例
+crawl_progress = CrawlProgressRegistry()
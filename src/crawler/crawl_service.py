@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+独立爬虫层（爬虫工作进程）
+生产模式下Web进程不启动浏览器：搜索、笔记页面获取和后台详情提取都作为任务提交到任务队列（见 job_broker），
+由若干个爬虫工作进程领取执行，Web进程只等待结果存储中的结果，浏览器慢或卡住时不会占用Web工作进程
+1. 工作进程 - 每个进程持有自己的搜索爬虫和浏览器池，一次执行一个任务；
+   增加进程数即可扩展爬虫能力，与Web层相互独立
+2. 客户端 - CrawlServiceClient 提交任务并等待结果；没有存活的工作进程时立即报错，Web层回退到本地索引
+3. 结果回传 - 搜索结果、调试信息和HTML结果页随任务结果返回；后台提取的进度快照定期发布到结果存储
+4. 本地存储 - 笔记归档、本地检索索引、近似重复索引和关键词模型写入本机 cache 目录，
+   各进程在文件锁内追加（见 file_lock），读取时发现文件变大再读入其他进程新写入的记录；
+   文件锁只在同一台机器上有效，工作进程需要与Web进程运行在同一台机器上（不要把 cache 放在网络文件系统上）
+用法:
+    CRAWL_TIER=remote python app.py --role web       # Web进程把爬虫调用提交到任务队列
+    python app.py --role crawler [--crawl-workers 2] # 启动爬虫工作进程
+"""
+
+import os
+import time
+import socket
+import signal
+import logging
+import threading
+import multiprocessing
+from typing import Any, Dict, Optional
+
+from src.server.metrics import PAGE_NAVIGATION_SECONDS, metrics_snapshots
+from src.crawler.browser_pool import browser_pool
+from src.crawler.browser_warmup import browser_warmup_from_env
+from src.crawler.crawl_progress import crawl_progress, CrawlProgressRegistry
+from src.crawler.job_broker import (
+    job_broker_from_env, JobBrokerError, JOB_DONE,
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND, HEARTBEAT_INTERVAL
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 爬虫层模式：inline 在Web进程内启动浏览器（开发模式），remote 提交给爬虫工作进程
+CRAWL_TIER_INLINE = 'inline'
+CRAWL_TIER_REMOTE = 'remote'
+
+# 客户端等待结果的默认超时（秒），搜索需要滚动页面，耗时较长
+DEFAULT_CALL_TIMEOUT = 300.0
+
+# 默认的爬虫工作进程数
+DEFAULT_WORKERS = 2
+
+# 后台提取任务运行时发布进度快照的间隔（秒）
+PROGRESS_PUBLISH_INTERVAL = 1.0
+
+# 登录更新Cookie后递增，工作进程发现变化时重建搜索爬虫
+COOKIES_VERSION_KEY = 'cookies_version'
+
+COOKIES_FILE = os.path.join('cache', 'cookies', 'xiaohongshu_cookies.json')
+
+NOTE_URL_TEMPLATE = "https://www.xiaohongshu.com/explore/{note_id}"
+
+
+class CrawlServiceError(Exception):
+    """爬虫层不可用或任务执行失败"""
+
+
+def fetch_note_page(note_id: str, settle_seconds: float = 3.0) -> str:
+    """
+    通过共享浏览器池打开笔记页面，返回页面源码
+
+    Args:
+        note_id: 笔记ID
+        settle_seconds: 页面主体出现后等待内容渲染的时间（秒）
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    note_url = NOTE_URL_TEMPLATE.format(note_id=note_id)
+
+    # 从浏览器池借出浏览器（已加载cookies），用完归还
+    with browser_pool.acquire() as driver:
+        logger.info(f"访问笔记页面: {note_url}")
+        with PAGE_NAVIGATION_SECONDS.time('generator'):
+            driver.get(note_url)
+
+        # 等待页面加载
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+
+        # 等待内容加载
+        time.sleep(settle_seconds)
+        return driver.page_source
+
+
+def _progress_key(session_id: str) -> str:
+    return f"progress:{session_id}"
+
+
+class CrawlWorker:
+    """爬虫工作进程：领取任务、用本进程的浏览器执行、把结果写回任务队列"""
+
+    def __init__(self, broker, worker_id: str = None, cookies_file: str = COOKIES_FILE):
+        """
+        初始化工作进程（搜索爬虫在首次搜索时创建）
+
+        Args:
+            broker: 任务队列
+            worker_id: 工作进程标识（默认 主机名-进程号）
+            cookies_file: 搜索爬虫使用的Cookie文件
+        """
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.cookies_file = cookies_file
+        self._crawler = None
+        self._cookies_version = None
+        self._stopped = threading.Event()
+        # 浏览器预热与保活（BROWSER_PREWARM 等环境变量），在领取任务的线程中执行
+        self.warmup = browser_warmup_from_env(self._get_crawler, lambda: self._crawler)
+        self._handlers = {
+            'search': self._search,
+            'get_note_detail': self._get_note_detail,
+            'fetch_note_page': fetch_note_page,
+            'backend_extract': self._backend_extract,
+        }
+
+    # ==================== 任务处理 ====================
+
+    def _get_crawler(self):
+        """返回搜索爬虫，首次调用或Cookie更新后重新创建"""
+        cookies_version = self.broker.fetch(COOKIES_VERSION_KEY)
+        if self._crawler is not None and cookies_version != self._cookies_version:
+            logger.info("🍪 Cookie已更新，重建搜索爬虫")
+            self._close_crawler()
+        self._cookies_version = cookies_version
+
+        if self._crawler is None:
+            from src.crawler.XHS_crawler import XiaoHongShuCrawler
+            logger.info("正在初始化小红书爬虫...")
+            try:
+                self._crawler = XiaoHongShuCrawler(use_selenium=True, headless=True, cookies_file=self.cookies_file)
+            except Exception as e:
+                raise CrawlServiceError(f"爬虫初始化失败: {str(e)}")
+            logger.info("小红书爬虫初始化成功")
+        return self._crawler
+
+    def _close_crawler(self):
+        if self._crawler is not None:
+            self._crawler.close()
+            self._crawler = None
+
+    def _search(self, keyword: str, max_results: int = 21, use_cache: bool = True) -> Dict[str, Any]:
+        """执行搜索，连同搜索过程中的调试信息和生成的HTML结果页一起返回"""
+        messages = []
+        html = {}
+        crawler = self._get_crawler()
+        crawler.set_debug_callback(lambda message, level="INFO": messages.append((message, level)))
+        crawler.set_html_callback(html.__setitem__)
+        try:
+            notes = crawler.search(keyword, max_results=max_results, use_cache=use_cache)
+        finally:
+            crawler.set_debug_callback(None)
+            crawler.set_html_callback(None)
+        return {'notes': notes or [], 'debug': messages, 'html': html}
+
+    def _get_note_detail(self, note_id: str):
+        return self._get_crawler().get_note_detail(note_id)
+
+    def _backend_extract(self, notes, session_id: str) -> Dict[str, Any]:
+        """执行后台详情提取，运行期间定期发布进度快照"""
+        from src.crawler.backend_XHS_crawler import start_backend_crawl
+
+        finished = threading.Event()
+
+        def publish_progress():
+            while True:
+                progress = crawl_progress.get_status(session_id)
+                if progress:
+                    self.broker.publish(_progress_key(session_id), progress)
+                if finished.wait(PROGRESS_PUBLISH_INTERVAL):
+                    return
+
+        crawl_progress.queue_session(session_id, len(notes))
+        publisher = threading.Thread(target=publish_progress, name=f'progress-{session_id}', daemon=True)
+        publisher.start()
+        try:
+            result = start_backend_crawl(notes, session_id)
+        finally:
+            finished.set()
+            publisher.join()
+            # 最终状态
+            progress = crawl_progress.get_status(session_id)
+            if progress:
+                self.broker.publish(_progress_key(session_id), progress)
+
+        logger.info(f"🎉 后台笔记内容提取任务完成: {session_id}, 成功 {result.get('success_count', 0)} 篇")
+        # 逐篇结果已写入笔记归档，任务结果只保留统计
+        return {key: value for key, value in result.items() if key != 'results'}
+
+    def handle(self, job: Dict[str, Any]):
+        """执行一个任务并写回结果"""
+        handler = self._handlers.get(job['kind'])
+        if handler is None:
+            self.broker.fail(job['id'], f"未知的爬虫任务类型: {job['kind']}")
+            return
+        try:
+            result = handler(**job['params'])
+        except Exception as e:
+            logger.error(f"爬虫任务 {job['kind']} 执行失败: {str(e)}")
+            self.broker.fail(job['id'], str(e))
+            return
+        self.broker.complete(job['id'], result)
+
+    # ==================== 运行 ====================
+
+    def _heartbeat_loop(self):
+        """定期写心跳，回收已退出工作进程名下的任务，并写入指标快照供Web进程的 /metrics 合并"""
+        while not self._stopped.is_set():
+            try:
+                self.broker.heartbeat(self.worker_id, {'pid': os.getpid(), 'host': socket.gethostname()})
+                self.broker.recover()
+            except Exception as e:
+                logger.warning(f"工作进程心跳失败: {str(e)}")
+            try:
+                metrics_snapshots.publish()
+            except Exception as e:
+                logger.warning(f"写入指标快照失败: {str(e)}")
+            self._stopped.wait(HEARTBEAT_INTERVAL)
+
+    def run(self):
+        """领取并执行任务，直到 stop() 被调用"""
+        threading.Thread(target=self._heartbeat_loop, name='crawl-worker-heartbeat', daemon=True).start()
+        logger.info(f"🕷️ 爬虫工作进程已启动: {self.worker_id}")
+        try:
+            # 预热期间任务留在队列中，由其他工作进程领取或预热完成后执行
+            if self.warmup is not None and self.warmup.prewarm_enabled:
+                self.warmup.prewarm()
+            while not self._stopped.is_set():
+                try:
+                    job = self.broker.claim(self.worker_id, timeout=1.0)
+                except Exception as e:
+                    logger.error(f"领取爬虫任务失败: {str(e)}")
+                    self._stopped.wait(1.0)
+                    continue
+                if job is not None:
+                    self.handle(job)
+                elif self.warmup is not None:
+                    self.warmup.keepalive_if_due()
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        """注销并关闭浏览器"""
+        self._stopped.set()
+        try:
+            self.broker.unregister(self.worker_id)
+        except Exception as e:
+            logger.warning(f"注销工作进程失败: {str(e)}")
+        self._close_crawler()
+        browser_pool.shutdown()
+        metrics_snapshots.remove()
+        logger.info(f"爬虫工作进程已停止: {self.worker_id}")
+
+
+class CrawlServiceClient:
+    """爬虫层客户端（Web进程使用）：提交任务并等待结果"""
+
+    def __init__(self, broker, timeout: float = DEFAULT_CALL_TIMEOUT):
+        """
+        Args:
+            broker: 任务队列
+            timeout: 等待结果的默认超时（秒）
+        """
+        self.broker = broker
+        self.timeout = timeout
+
+    def _ensure_workers(self):
+        try:
+            if not self.broker.workers():
+                raise CrawlServiceError("没有可用的爬虫工作进程")
+        except JobBrokerError as e:
+            raise CrawlServiceError(str(e))
+
+    def call(self, kind: str, timeout: float = None, **params) -> Any:
+        """
+        提交交互式任务并等待结果
+
+        Raises:
+            CrawlServiceError: 没有工作进程、超时或任务执行失败
+        """
+        self._ensure_workers()
+        job_id = self.broker.submit(kind, params, priority=PRIORITY_INTERACTIVE)
+        job = self.broker.wait(job_id, timeout or self.timeout)
+        if job is None:
+            self.broker.cancel(job_id)
+            raise CrawlServiceError(f"爬虫任务超时: {kind}")
+        if job['status'] != JOB_DONE:
+            raise CrawlServiceError(job.get('error') or f"爬虫任务执行失败: {kind}")
+        return job['result']
+
+    def submit_backend_extraction(self, notes, session_id: str) -> str:
+        """提交后台详情提取任务（不等待），并发布排队状态"""
+        job_id = self.broker.submit('backend_extract', {'notes': list(notes), 'session_id': session_id},
+                                    priority=PRIORITY_BACKGROUND)
+        # 工作进程领取前先发布排队状态（与进度注册表的快照格式一致）
+        registry = CrawlProgressRegistry()
+        registry.queue_session(session_id, len(notes))
+        self.broker.publish(_progress_key(session_id), registry.get_status(session_id))
+        return job_id
+
+    def backend_progress(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """后台提取任务最近发布的进度快照"""
+        return self.broker.fetch(_progress_key(session_id))
+
+    def reset_crawler(self):
+        """通知所有工作进程在下次搜索前重建搜索爬虫（登录更新Cookie后调用）"""
+        self.broker.publish(COOKIES_VERSION_KEY, time.time(), ttl=365 * 24 * 3600)
+
+    def ping(self) -> bool:
+        """是否有存活的工作进程"""
+        try:
+            self._ensure_workers()
+            return True
+        except CrawlServiceError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return self.broker.stats()
+
+
+def crawl_service_client_from_env() -> Optional[CrawlServiceClient]:
+    """
+    根据环境变量创建爬虫层客户端
+
+    环境变量:
+        CRAWL_TIER: remote 时启用独立爬虫层（默认 inline，在本进程内启动浏览器）
+        JOB_BROKER_URL: 任务队列地址（见 job_broker_from_env）
+        CRAWL_SERVICE_TIMEOUT: 等待结果的超时（秒）
+
+    Returns:
+        客户端实例，未启用独立爬虫层时返回None
+    """
+    if os.environ.get('CRAWL_TIER', CRAWL_TIER_INLINE).lower() != CRAWL_TIER_REMOTE:
+        return None
+    return CrawlServiceClient(
+        job_broker_from_env(),
+        timeout=float(os.environ.get('CRAWL_SERVICE_TIMEOUT', DEFAULT_CALL_TIMEOUT)),
+    )
+
+
+def _worker_main():
+    """单个工作进程的入口（SIGTERM 时处理完当前任务后退出）"""
+    worker = CrawlWorker(job_broker_from_env())
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+def run_crawl_workers(count: int = None):
+    """
+    启动爬虫工作进程并等待它们退出（SIGTERM/SIGINT 时通知所有工作进程停止）
+    工作进程以 spawn 方式启动，不继承父进程的线程和连接
+
+    Args:
+        count: 工作进程数（默认取 CRAWL_WORKERS 环境变量）
+    """
+    count = count or int(os.environ.get('CRAWL_WORKERS', DEFAULT_WORKERS))
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_worker_main, name=f'crawl-worker-{i}') for i in range(count)]
+    for process in processes:
+        process.start()
+    logger.info(f"🕷️ 已启动 {count} 个爬虫工作进程")
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C 同时发给了整个进程组，等待工作进程自行退出
+        for process in processes:
+            process.join()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+跨进程文件锁
+笔记归档、本地索引、近似重复索引和关键词模型的文件会被多个进程同时追加（爬虫工作进程、Web进程），
+写入前需要先读到其他进程追加的内容再分配偏移或编号：
+1. 进程间互斥 - fcntl.flock 独占锁，进程退出时由系统释放
+2. 线程间互斥 - 同一进程内的线程共用一个锁文件描述符（flock 对同一描述符不互斥），另加可重入线程锁
+3. fork安全 - 子进程继承的描述符与父进程共享同一把flock，检测到进程号变化时重新打开锁文件，
+   fork时其他线程持有的锁在子进程中重置
+锁只在同一台机器上有效（不要用于网络文件系统上的目录）；没有fcntl的平台只保留线程锁
+"""
+
+import os
+import weakref
+import threading
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+# 本进程创建的全部文件锁（fork后在子进程中重置）
+_instances = weakref.WeakSet()
+
+
+class FileLock:
+    """可重入的跨进程独占文件锁"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 锁文件路径（不存在时自动创建）
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._pid = None
+        _instances.add(self)
+
+    def _reset_after_fork(self):
+        """fork时其他线程可能正持有锁，子进程中该线程不存在，重置为未加锁状态"""
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def _ensure_open(self):
+        """打开锁文件（fork后的子进程重新打开）"""
+        if self._fd is not None and self._pid == os.getpid():
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # 继承自父进程的描述符不关闭，只是不再使用，避免影响父进程持有的锁
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._pid = os.getpid()
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and FCNTL_AVAILABLE:
+            try:
+                self._ensure_open()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def _reset_locks_after_fork():
+    for lock in list(_instances):
+        lock._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def file_size(path: str) -> int:
+    """文件大小（不存在时为0）"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def read_new_lines(path: str, position: int):
+    """
+    从指定字节位置读取其他进程追加的完整行（末尾写了一半的行留到下次读取）
+
+    Returns:
+        (行列表（bytes，含换行符）, 新的读取位置)
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(position)
+            data = f.read()
+    except OSError:
+        return [], position
+    end = data.rfind(b'\n')
+    if end == -1:
+        return [], position
+    return data[:end + 1].splitlines(keepends=True), position + end + 1
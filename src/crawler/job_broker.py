@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+爬虫任务队列（Web层与爬虫工作进程之间的任务代理）
+Web进程提交搜索、笔记详情等任务，爬虫工作进程领取执行，结果写回结果存储，Web进程按任务ID取结果：
+1. SQLiteJobBroker - 单机部署，多个进程共享一个SQLite文件（WAL模式），领取任务在写事务中完成，
+   保证同一任务只被一个工作进程领取
+2. RedisJobBroker - 多机部署，使用Redis（或兼容协议的服务）的列表做队列、哈希存任务状态，
+   任务队列本身不限制工作进程所在的节点（笔记归档等本地存储仍要求同一台机器，见 crawl_service）；
+   LocalRedis 是进程内的替身，实现了用到的命令子集，便于离线联调
+3. 故障恢复 - 工作进程定期写心跳，心跳过期的工作进程名下正在执行的任务重新排队（超过重试次数则标记失败）
+任务按优先级领取：交互式的搜索先于后台批量提取
+
+环境变量 JOB_BROKER_URL 选择实现（见 job_broker_from_env）
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_JOB_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# 优先级（数值小的先领取）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# 工作进程写心跳的间隔（秒），超过3个间隔没有心跳视为已退出
+HEARTBEAT_INTERVAL = 5.0
+WORKER_TIMEOUT = HEARTBEAT_INTERVAL * 3
+
+# 同一任务最多领取的次数（工作进程中途退出后重新排队）
+MAX_ATTEMPTS = 2
+
+# 已结束任务和发布值的保留时间（秒）
+RESULT_TTL = 3600
+
+DEFAULT_SQLITE_PATH = os.path.join('cache', 'jobs', 'jobs.db')
+
+
+class JobBrokerError(Exception):
+    """任务队列不可用"""
+
+
+def _new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class SQLiteJobBroker:
+    """基于SQLite文件的任务队列（同一台机器上的多个进程共享）"""
+
+    def __init__(self, db_path: str = DEFAULT_SQLITE_PATH, poll_interval: float = 0.05):
+        """
+        Args:
+            db_path: 数据库文件路径
+            poll_interval: 等待任务/结果时的轮询间隔（秒），空闲时逐步放宽到10倍
+        """
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """当前线程的连接（fork 后的子进程重新建立连接）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        priority INTEGER NOT NULL,
+                        params TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        worker TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        created_at REAL NOT NULL,
+                        claimed_at REAL,
+                        finished_at REAL,
+                        result TEXT,
+                        error TEXT
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, created_at);
+                    CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL);
+                    CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, info TEXT NOT NULL, seen_at REAL NOT NULL);
+                ''')
+                self._schema_ready = True
+        return conn
+
+    def _poll(self, fetch, timeout: float):
+        """重复调用 fetch 直到返回非None或超时"""
+        deadline = time.monotonic() + max(timeout, 0)
+        interval = self.poll_interval
+        while True:
+            value = fetch()
+            if value is not None:
+                return value
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, self.poll_interval * 10)
+
+    # ==================== 提交和领取 ====================
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> str:
+        """提交任务，返回任务ID"""
+        job_id = _new_job_id()
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, priority, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, priority, json.dumps(params, ensure_ascii=False), JOB_QUEUED, time.time())
+        )
+        return job_id
+
+    def _claim_once(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, kind, params, attempts FROM jobs WHERE status = ? ORDER BY priority, created_at LIMIT 1',
+                (JOB_QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                    (JOB_RUNNING, worker_id, time.time(), row[0])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return {'id': row[0], 'kind': row[1], 'params': json.loads(row[2]), 'attempts': row[3] + 1}
+
+    def claim(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """
+        领取优先级最高的排队任务
+
+        Returns:
+            {'id', 'kind', 'params', 'attempts'}，超时没有任务时返回None
+        """
+        return self._poll(lambda: self._claim_once(worker_id), timeout)
+
+    def complete(self, job_id: str, result: Any):
+        """记录任务结果"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, result = ? WHERE id = ?',
+            (JOB_DONE, time.time(), json.dumps(result, ensure_ascii=False), job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        """记录任务失败"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?',
+            (JOB_FAILED, time.time(), error, job_id)
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        """取消尚未被领取的任务"""
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?',
+            (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED)
+        )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务当前状态 {'id', 'kind', 'status', 'result', 'error', 'attempts'}"""
+        row = self._connect().execute(
+            'SELECT id, kind, status, result, error, attempts FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0], 'kind': row[1], 'status': row[2],
+            'result': json.loads(row[3]) if row[3] is not None else None,
+            'error': row[4], 'attempts': row[5],
+        }
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待任务结束，返回任务状态；超时返回None"""
+        def finished():
+            job = self.get(job_id)
+            return job if job and job['status'] in FINISHED_JOB_STATUSES else None
+        return self._poll(finished, timeout)
+
+    # ==================== 发布值（进度快照等） ====================
+
+    def publish(self, key: str, value: Any, ttl: float = RESULT_TTL):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+        )
+
+    def fetch(self, key: str) -> Any:
+        row = self._connect().execute(
+            'SELECT value FROM kv WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # ==================== 工作进程 ====================
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any] = None):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO workers (id, info, seen_at) VALUES (?, ?, ?)',
+            (worker_id, json.dumps(info or {}, ensure_ascii=False), time.time())
+        )
+
+    def unregister(self, worker_id: str):
+        self._connect().execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+
+    def workers(self, max_age: float = WORKER_TIMEOUT) -> List[Dict[str, Any]]:
+        """心跳未过期的工作进程"""
+        rows = self._connect().execute(
+            'SELECT id, info, seen_at FROM workers WHERE seen_at > ?', (time.time() - max_age,)
+        ).fetchall()
+        return [{'id': row[0], 'seen_at': row[2], **json.loads(row[1])} for row in rows]
+
+    def recover(self, max_age: float = WORKER_TIMEOUT, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """
+        处理心跳过期的工作进程名下正在执行的任务：未超过重试次数的重新排队，否则标记失败；
+        同时清理过期的已结束任务、发布值和工作进程记录
+
+        Returns:
+            重新排队的任务数
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM workers WHERE seen_at <= ?', (now - max_age,))
+            alive = 'SELECT id FROM workers'
+            requeued = conn.execute(
+                f'UPDATE jobs SET status = ?, worker = NULL, claimed_at = NULL '
+                f'WHERE status = ? AND attempts < ? AND worker NOT IN ({alive})',
+                (JOB_QUEUED, JOB_RUNNING, max_attempts)
+            ).rowcount
+            conn.execute(
+                f'UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE status = ? AND worker NOT IN ({alive})',
+                (JOB_FAILED, now, '爬虫工作进程已退出', JOB_RUNNING)
+            )
+            conn.execute('DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?',
+                         (*FINISHED_JOB_STATUSES, now - RESULT_TTL))
+            conn.execute('DELETE FROM kv WHERE expires_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if requeued:
+            logger.warning(f"♻️ {requeued} 个任务的工作进程已退出，重新排队")
+        return requeued
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {'backend': 'sqlite', 'path': self.db_path, 'jobs': dict(rows), 'workers': len(self.workers())}
+
+
+class LocalRedis:
+    """
+    进程内的Redis替身：实现 RedisJobBroker 用到的命令（decode_responses=True 的语义），
+    数据只在当前进程内有效，用于离线联调和单进程测试
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._condition = threading.Condition()
+
+    def _live(self, name):
+        expires_at = self._expires.get(name)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    def ping(self):
+        return True
+
+    def set(self, name, value, ex=None):
+        with self._condition:
+            self._data[name] = str(value)
+            if ex:
+                self._expires[name] = time.time() + ex
+            else:
+                self._expires.pop(name, None)
+        return True
+
+    def get(self, name):
+        with self._condition:
+            return self._live(name)
+
+    def delete(self, *names):
+        with self._condition:
+            removed = 0
+            for name in names:
+                removed += self._data.pop(name, None) is not None
+                self._expires.pop(name, None)
+            return removed
+
+    def expire(self, name, seconds):
+        with self._condition:
+            if self._live(name) is None:
+                return False
+            self._expires[name] = time.time() + seconds
+            return True
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        with self._condition:
+            data = self._live(name)
+            if data is None:
+                data = self._data[name] = {}
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            data.update({k: str(v) for k, v in items.items()})
+            return len(items)
+
+    def hget(self, name, key):
+        with self._condition:
+            return (self._live(name) or {}).get(key)
+
+    def hgetall(self, name):
+        with self._condition:
+            return dict(self._live(name) or {})
+
+    def _push(self, name, values, left):
+        with self._condition:
+            data = self._live(name)
+            if data is None:
+                data = self._data[name] = deque()
+            for value in values:
+                if left:
+                    data.appendleft(str(value))
+                else:
+                    data.append(str(value))
+            self._condition.notify_all()
+            return len(data)
+
+    def lpush(self, name, *values):
+        return self._push(name, values, left=True)
+
+    def rpush(self, name, *values):
+        return self._push(name, values, left=False)
+
+    def llen(self, name):
+        with self._condition:
+            return len(self._live(name) or ())
+
+    def _blocking_pop(self, keys, timeout, left):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        deadline = None if not timeout else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                for key in keys:
+                    data = self._live(key)
+                    if data:
+                        value = data.popleft() if left else data.pop()
+                        return key, value
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def blpop(self, keys, timeout=0):
+        return self._blocking_pop(keys, timeout, left=True)
+
+    def brpop(self, keys, timeout=0):
+        return self._blocking_pop(keys, timeout, left=False)
+
+    def zadd(self, name, mapping):
+        with self._condition:
+            data = self._live(name)
+            if data is None:
+                data = self._data[name] = {}
+            data.update({member: float(score) for member, score in mapping.items()})
+            return len(mapping)
+
+    def zrem(self, name, *members):
+        with self._condition:
+            data = self._live(name) or {}
+            return sum(data.pop(member, None) is not None for member in members)
+
+    def zrangebyscore(self, name, min, max):
+        low = float('-inf') if min == '-inf' else float(min)
+        high = float('inf') if max == '+inf' else float(max)
+        with self._condition:
+            data = self._live(name) or {}
+            return [member for member, score in sorted(data.items(), key=lambda item: item[1])
+                    if low <= score <= high]
+
+    def zremrangebyscore(self, name, min, max):
+        members = self.zrangebyscore(name, min, max)
+        return self.zrem(name, *members) if members else 0
+
+    def zcard(self, name):
+        with self._condition:
+            return len(self._live(name) or {})
+
+
+class RedisJobBroker:
+    """基于Redis的任务队列（多台机器上的工作进程共享）"""
+
+    def __init__(self, client, prefix: str = 'xhs'):
+        """
+        Args:
+            client: redis.Redis(decode_responses=True) 或兼容对象（如 LocalRedis）
+            prefix: 键名前缀
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + tuple(str(part) for part in parts))
+
+    def _queues(self) -> List[str]:
+        return [self._key('queue', priority) for priority in (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)]
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> str:
+        job_id = _new_job_id()
+        self.client.hset(self._key('job', job_id), mapping={
+            'kind': kind, 'priority': priority, 'params': json.dumps(params, ensure_ascii=False),
+            'status': JOB_QUEUED, 'attempts': 0, 'created_at': time.time(),
+        })
+        self.client.lpush(self._key('queue', priority), job_id)
+        return job_id
+
+    def claim(self, worker_id: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """
+        领取任务（BRPOP 按优先级依次检查队列）
+        出队到登记为执行中之间工作进程退出时该任务会丢失，由提交方等待超时处理
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            popped = self.client.brpop(self._queues(), timeout=max(1, int(round(remaining))))
+            if not popped:
+                return None
+            job_id = popped[1]
+            job_key = self._key('job', job_id)
+            job = self.client.hgetall(job_key)
+            if not job or job.get('status') != JOB_QUEUED:
+                # 已取消或已过期的任务
+                continue
+            attempts = int(job.get('attempts', 0)) + 1
+            self.client.hset(job_key, mapping={
+                'status': JOB_RUNNING, 'worker': worker_id, 'claimed_at': time.time(), 'attempts': attempts,
+            })
+            self.client.zadd(self._key('running'), {job_id: time.time()})
+            return {'id': job_id, 'kind': job['kind'], 'params': json.loads(job['params']), 'attempts': attempts}
+
+    def _finish(self, job_id: str, fields: Dict[str, Any]):
+        job_key = self._key('job', job_id)
+        self.client.hset(job_key, mapping={**fields, 'finished_at': time.time()})
+        self.client.expire(job_key, RESULT_TTL)
+        self.client.zrem(self._key('running'), job_id)
+        # 通知等待结果的一方
+        done_key = self._key('done', job_id)
+        self.client.lpush(done_key, fields['status'])
+        self.client.expire(done_key, RESULT_TTL)
+
+    def complete(self, job_id: str, result: Any):
+        self._finish(job_id, {'status': JOB_DONE, 'result': json.dumps(result, ensure_ascii=False)})
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, {'status': JOB_FAILED, 'error': error})
+
+    def cancel(self, job_id: str) -> bool:
+        job_key = self._key('job', job_id)
+        if self.client.hget(job_key, 'status') != JOB_QUEUED:
+            return False
+        # 队列中的任务ID在领取时按状态跳过
+        self.client.hset(job_key, mapping={'status': JOB_CANCELLED, 'finished_at': time.time()})
+        self.client.expire(job_key, RESULT_TTL)
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.client.hgetall(self._key('job', job_id))
+        if not job:
+            return None
+        return {
+            'id': job_id, 'kind': job.get('kind'), 'status': job.get('status'),
+            'result': json.loads(job['result']) if job.get('result') is not None else None,
+            'error': job.get('error'), 'attempts': int(job.get('attempts', 0)),
+        }
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job and job['status'] in FINISHED_JOB_STATUSES:
+            return job
+        if not self.client.blpop(self._key('done', job_id), timeout=max(1, int(round(timeout)))):
+            return None
+        return self.get(job_id)
+
+    def publish(self, key: str, value: Any, ttl: float = RESULT_TTL):
+        self.client.set(self._key('kv', key), json.dumps(value, ensure_ascii=False), ex=int(ttl))
+
+    def fetch(self, key: str) -> Any:
+        value = self.client.get(self._key('kv', key))
+        return json.loads(value) if value is not None else None
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any] = None):
+        self.client.set(self._key('worker', worker_id), json.dumps(info or {}, ensure_ascii=False),
+                        ex=int(WORKER_TIMEOUT))
+        self.client.zadd(self._key('workers'), {worker_id: time.time()})
+
+    def unregister(self, worker_id: str):
+        self.client.delete(self._key('worker', worker_id))
+        self.client.zrem(self._key('workers'), worker_id)
+
+    def workers(self, max_age: float = WORKER_TIMEOUT) -> List[Dict[str, Any]]:
+        result = []
+        for worker_id in self.client.zrangebyscore(self._key('workers'), time.time() - max_age, '+inf'):
+            info = self.client.get(self._key('worker', worker_id))
+            if info is not None:
+                result.append({'id': worker_id, **json.loads(info)})
+        return result
+
+    def recover(self, max_age: float = WORKER_TIMEOUT, max_attempts: int = MAX_ATTEMPTS) -> int:
+        self.client.zremrangebyscore(self._key('workers'), '-inf', time.time() - max_age)
+        alive = {worker['id'] for worker in self.workers(max_age)}
+        requeued = 0
+        for job_id in self.client.zrangebyscore(self._key('running'), '-inf', '+inf'):
+            job_key = self._key('job', job_id)
+            job = self.client.hgetall(job_key)
+            if job.get('status') != JOB_RUNNING:
+                self.client.zrem(self._key('running'), job_id)
+                continue
+            if job.get('worker') in alive:
+                continue
+            self.client.zrem(self._key('running'), job_id)
+            if int(job.get('attempts', 0)) < max_attempts:
+                self.client.hset(job_key, mapping={'status': JOB_QUEUED, 'worker': ''})
+                # 放到队首，下一个领取
+                self.client.rpush(self._key('queue', job.get('priority', PRIORITY_INTERACTIVE)), job_id)
+                requeued += 1
+            else:
+                self._finish(job_id, {'status': JOB_FAILED, 'error': '爬虫工作进程已退出'})
+        if requeued:
+            logger.warning(f"♻️ {requeued} 个任务的工作进程已退出，重新排队")
+        return requeued
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'redis',
+            'queued': sum(self.client.llen(queue) for queue in self._queues()),
+            'running': self.client.zcard(self._key('running')),
+            'workers': len(self.workers()),
+        }
+
+
+def job_broker_from_env():
+    """
+    根据环境变量 JOB_BROKER_URL 创建任务队列
+
+    - sqlite:///path/to/jobs.db  单机多进程（默认 cache/jobs/jobs.db）
+    - redis://host:6379/0         多机部署（需要安装 redis 包）
+    - memory://                   进程内的Redis替身（仅单进程联调）
+    """
+    url = os.environ.get('JOB_BROKER_URL', '')
+    if not url or url.startswith('sqlite://'):
+        return SQLiteJobBroker(url[len('sqlite:///'):] if url.startswith('sqlite:///') else DEFAULT_SQLITE_PATH)
+    if url.startswith('memory://'):
+        return RedisJobBroker(LocalRedis(), prefix=os.environ.get('JOB_BROKER_PREFIX', 'xhs'))
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if not REDIS_AVAILABLE:
+            raise JobBrokerError("使用Redis任务队列需要安装 redis 包: pip install redis")
+        client = redis.Redis.from_url(url, decode_responses=True)
+        return RedisJobBroker(client, prefix=os.environ.get('JOB_BROKER_PREFIX', 'xhs'))
+    raise JobBrokerError(f"不支持的任务队列地址: {url}")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复笔记检测
+同一篇笔记被转载、或在不同关键词/会话中以不同ID出现时，按标题+正文的SimHash指纹归为一组：
+1. 指纹 - 对规范化文本取字符3-gram，计算64位SimHash
+2. 索引 - 64位指纹切为4段16位做LSH分桶，汉明距离不超过3的指纹至少有一段完全相同，
+   查询只需比较4个桶内的候选，无需遍历全部指纹
+3. 分组 - 每组以最先出现的笔记为代表（canonical），指纹和分组追加写入磁盘，跨会话生效；
+   多个进程写入时在文件锁内先读入其他进程追加的指纹再分组，查询时文件变大就读入新增的指纹
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from src.crawler.file_lock import FileLock, file_size, read_new_lines
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = FINGERPRINT_BITS // BAND_COUNT
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# 汉明距离阈值（必须小于分段数，才能保证LSH不漏检）
+MAX_HAMMING_DISTANCE = 3
+
+# 文本过短时指纹不可靠，不参与去重
+MIN_TEXT_LENGTH = 12
+
+# 参与计算指纹的最大文本长度
+MAX_TEXT_LENGTH = 2000
+
+SHINGLE_SIZE = 3
+
+_NON_WORD = re.compile(r'[^\w\u4e00-\u9fff]+')
+
+# 计数通道宽度（比特），需容纳单个文本的全部3-gram数量
+_LANE_BITS = 16
+
+# 字节 -> 各比特分散到计数通道后的整数
+_SPREAD_BYTE = [
+    sum(1 << (bit * _LANE_BITS) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+
+def note_text(note: Dict[str, Any]) -> str:
+    """取笔记的标题+正文（兼容搜索结果和笔记详情的字段名）"""
+    title = note.get('title') or ''
+    body = note.get('content') or note.get('desc') or note.get('description') or ''
+    return f"{title} {body}" if isinstance(body, str) else title
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    计算64位SimHash指纹
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        指纹，文本过短时返回None
+    """
+    normalized = _NON_WORD.sub('', text.lower())[:MAX_TEXT_LENGTH]
+    if len(normalized) < MIN_TEXT_LENGTH:
+        return None
+
+    shingles = Counter(normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1))
+
+    # 每个比特占一个计数通道，一次大整数加法同时累加64个比特位的计数
+    accumulator = 0
+    total = 0
+    for shingle, count in shingles.items():
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=FINGERPRINT_BITS // 8).digest()
+        spread = 0
+        for position, byte in enumerate(digest):
+            spread |= _SPREAD_BYTE[byte] << (position * 8 * _LANE_BITS)
+        accumulator += spread * count
+        total += count
+
+    # 某一位上为1的计数超过一半，则指纹该位为1
+    fingerprint = 0
+    lane_mask = (1 << _LANE_BITS) - 1
+    for bit in range(FINGERPRINT_BITS):
+        if (accumulator >> (bit * _LANE_BITS) & lane_mask) * 2 > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """SimHash近似重复索引"""
+
+    def __init__(self, index_file: str = os.path.join('cache', 'near_duplicates.jsonl')):
+        """
+        初始化索引（文件在首次使用时加载）
+
+        Args:
+            index_file: 指纹记录文件（JSONL，每行 [note_id, 指纹, 代表笔记ID]）
+        """
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(index_file + '.lock')
+        self._loaded = False
+        # 已读入的指纹记录字节数
+        self._position = 0
+        # note_id -> 指纹
+        self._fingerprints = {}
+        # note_id -> 代表笔记ID
+        self._canonical = {}
+        # (段序号, 段值) -> {note_id}
+        self._buckets = {}
+        self._log = None
+
+    def _ensure_loaded(self):
+        """加载指纹记录（调用方需持有锁）"""
+        if self._loaded:
+            return
+
+        os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+        with self._file_lock:
+            self._read_tail()
+            if file_size(self.index_file) > self._position:
+                # 崩溃时只写了一半的最后一行
+                os.truncate(self.index_file, self._position)
+            self._log = open(self.index_file, 'ab')
+        self._loaded = True
+
+    def _read_tail(self):
+        """读入尚未读取的指纹记录（包括其他进程追加的，调用方需持有锁）"""
+        lines, self._position = read_new_lines(self.index_file, self._position)
+        for line in lines:
+            try:
+                note_id, fingerprint, canonical = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            self._register(note_id, fingerprint, canonical)
+
+    def _refresh(self):
+        """加载指纹记录，文件变大时读入其他进程追加的记录（调用方需持有锁）"""
+        if not self._loaded:
+            self._ensure_loaded()
+        elif file_size(self.index_file) != self._position:
+            self._read_tail()
+
+    def _register(self, note_id: str, fingerprint: int, canonical: str):
+        """写入内存索引（调用方需持有锁）"""
+        previous = self._fingerprints.get(note_id)
+        if previous is not None:
+            for band, value in self._bands(previous):
+                self._buckets.get((band, value), set()).discard(note_id)
+        self._fingerprints[note_id] = fingerprint
+        self._canonical[note_id] = canonical
+        for key in self._bands(fingerprint):
+            self._buckets.setdefault(key, set()).add(note_id)
+
+    @staticmethod
+    def _bands(fingerprint: int):
+        """把指纹切分为LSH分段"""
+        return [(band, fingerprint >> (band * BAND_BITS) & BAND_MASK) for band in range(BAND_COUNT)]
+
+    def _nearest(self, note_id: str, fingerprint: int) -> Optional[str]:
+        """在LSH候选中查找距离最近的其他笔记（调用方需持有锁）"""
+        best, best_distance = None, MAX_HAMMING_DISTANCE + 1
+        for key in self._bands(fingerprint):
+            for candidate in self._buckets.get(key, ()):
+                if candidate == note_id:
+                    continue
+                distance = hamming_distance(fingerprint, self._fingerprints[candidate])
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def find_duplicate(self, note_id: str, note: Dict[str, Any]) -> Optional[str]:
+        """
+        查询笔记是否与其他已知笔记近似重复（不写入索引）
+
+        Returns:
+            重复组的代表笔记ID，不重复时返回None
+        """
+        with self._lock:
+            self._refresh()
+            known = self._canonical.get(note_id)
+            if known and known != note_id:
+                return known
+
+            fingerprint = simhash(note_text(note))
+            if fingerprint is None:
+                return None
+            nearest = self._nearest(note_id, fingerprint)
+            return self._canonical[nearest] if nearest else None
+
+    def add(self, note_id: str, note: Dict[str, Any]) -> str:
+        """
+        写入笔记指纹并返回其所属重复组的代表笔记ID（不重复时为自身）
+
+        Args:
+            note_id: 笔记ID
+            note: 搜索结果或笔记详情
+        """
+        fingerprint = simhash(note_text(note))
+
+        with self._lock:
+            if fingerprint is None or not note_id:
+                self._refresh()
+                return self._canonical.get(note_id, note_id)
+
+            with self._file_lock:
+                self._refresh()
+                if self._fingerprints.get(note_id) == fingerprint:
+                    return self._canonical[note_id]
+
+                nearest = self._nearest(note_id, fingerprint)
+                # 已有的分组关系保持不变，避免代表笔记漂移
+                canonical = self._canonical.get(note_id) or (self._canonical[nearest] if nearest else note_id)
+                self._register(note_id, fingerprint, canonical)
+                data = (json.dumps([note_id, fingerprint, canonical]) + '\n').encode('utf-8')
+                self._log.write(data)
+                self._log.flush()
+                self._position += len(data)
+                return canonical
+
+    def canonical_of(self, note_id: str) -> str:
+        """返回笔记所属重复组的代表笔记ID（未知笔记返回自身）"""
+        with self._lock:
+            self._refresh()
+            return self._canonical.get(note_id, note_id)
+
+    def group_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        对一组搜索结果做近似去重：同一重复组只保留第一条，
+        被合并的笔记ID记录在保留结果的 duplicate_ids 中；
+        与以往会话中的笔记重复的结果标记 duplicate_of
+
+        Args:
+            results: 搜索结果列表（需包含id字段）
+
+        Returns:
+            去重后的结果列表
+        """
+        kept = []
+        kept_by_canonical = {}
+
+        for result in results:
+            note_id = result.get('id') or result.get('note_id')
+            canonical = self.add(note_id, result) if note_id else None
+
+            if canonical and canonical in kept_by_canonical:
+                kept_by_canonical[canonical].setdefault('duplicate_ids', []).append(note_id)
+                continue
+
+            if canonical and canonical != note_id:
+                result['duplicate_of'] = canonical
+            if canonical:
+                kept_by_canonical[canonical] = result
+            kept.append(result)
+
+        if len(kept) < len(results):
+            logger.info(f"🧬 近似去重: {len(results)} -> {len(kept)} 条")
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        """索引统计信息"""
+        with self._lock:
+            self._refresh()
+            return {
+                'notes': len(self._fingerprints),
+                'groups': len(set(self._canonical.values())),
+                'buckets': len(self._buckets),
+            }
+
+
+# 全局近似重复索引实例
+near_duplicate_index = NearDuplicateIndex()
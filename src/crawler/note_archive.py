@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记归档模块
+所有笔记记录（后台爬取的详情、提取器的提取结果）追加写入分段JSONL文件，
+替代成千上万个带缩进的小JSON文件：
+1. 分段文件 notes-000001.jsonl ... 每行一条记录，超过大小上限后滚动到新分段
+2. 偏移索引 index.jsonl - (note_id, 类型) -> (分段, 偏移, 长度)，随机读取只需一次seek
+3. 可选的Parquet压缩 - 每篇笔记只保留最新版本，便于离线分析（需要pyarrow）
+
+同一台机器上的多个进程可以同时写入：追加在文件锁内进行，先读入其他进程追加的索引行，
+再在分段文件末尾写入；读取时索引文件变大就先读入新增的行，Web进程能看到爬虫工作进程新归档的笔记。
+归档目录不能跨机器共享
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.crawler.file_lock import FileLock, file_size, read_new_lines
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 记录类型
+KIND_DETAIL = 'detail'
+KIND_EXTRACTED = 'extracted'
+
+SEGMENT_PREFIX = 'notes-'
+SEGMENT_SUFFIX = '.jsonl'
+INDEX_FILENAME = 'index.jsonl'
+LOCK_FILENAME = '.lock'
+
+
+class NoteArchive:
+    """追加写入的分段笔记归档"""
+
+    def __init__(self, archive_dir: str = os.path.join('cache', 'archive'),
+                 segment_max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化归档（索引在首次使用时加载）
+
+        Args:
+            archive_dir: 归档目录
+            segment_max_bytes: 单个分段文件的大小上限
+        """
+        self.archive_dir = archive_dir
+        self.segment_max_bytes = segment_max_bytes
+        # (note_id, 类型) -> (分段文件名, 偏移, 长度, 会话ID)
+        self._index = {}
+        # 分段文件名 -> 索引中已记录的末尾位置
+        self._indexed_end = {}
+        # 已读入的索引文件字节数
+        self._index_position = 0
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(archive_dir, LOCK_FILENAME))
+        self._loaded = False
+        self._segment_name = None
+        self._segment_file = None
+        self._index_file = None
+
+    # ==================== 索引维护 ====================
+
+    def _segment_names(self) -> List[str]:
+        """按顺序列出所有分段文件名"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.archive_dir)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _index_path(self) -> str:
+        return os.path.join(self.archive_dir, INDEX_FILENAME)
+
+    def _ensure_loaded(self):
+        """加载偏移索引，并补齐崩溃前已写入分段但未写入索引的记录（调用方需持有锁）"""
+        if self._loaded:
+            return
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        # 其他进程的追加都在文件锁内完成，持有锁时分段末尾不完整的行只可能来自崩溃
+        with self._file_lock:
+            segments = self._segment_names()
+            self._segment_name = segments[-1] if segments else self._new_segment_name(1)
+            self._read_index_tail()
+            if file_size(self._index_path()) > self._index_position:
+                # 索引最后一行在崩溃时只写了一半
+                os.truncate(self._index_path(), self._index_position)
+
+            if segments:
+                self._truncate_partial_line(os.path.join(self.archive_dir, segments[-1]))
+
+            recovered = []
+            for segment in segments:
+                segment_path = os.path.join(self.archive_dir, segment)
+                start = self._indexed_end.get(segment, 0)
+                if os.path.getsize(segment_path) <= start:
+                    continue
+                for offset, length, record in self._read_segment(segment_path, start):
+                    entry = (segment, offset, length, record.get('session_id'))
+                    recovered.append((record['note_id'], record['kind']) + entry)
+
+            self._index_file = open(self._index_path(), 'ab')
+            for entry in recovered:
+                self._write_index_entry(entry)
+
+        if recovered:
+            logger.info(f"🔧 归档索引已补齐 {len(recovered)} 条记录")
+        self._loaded = True
+
+    def _apply_index_entry(self, note_id: str, kind: str, segment: str, offset: int, length: int, session_id: str):
+        """写入内存索引（调用方需持有锁）"""
+        self._index[(note_id, kind)] = (segment, offset, length, session_id)
+        self._indexed_end[segment] = max(self._indexed_end.get(segment, 0), offset + length)
+        # 分段文件名按编号排序，索引中出现的最新分段即当前写入的分段
+        if segment > self._segment_name:
+            self._segment_name = segment
+
+    def _read_index_tail(self) -> int:
+        """读入索引文件中尚未读取的完整行（包括其他进程追加的），返回读入的条数（调用方需持有锁）"""
+        lines, self._index_position = read_new_lines(self._index_path(), self._index_position)
+        for line in lines:
+            try:
+                self._apply_index_entry(*json.loads(line))
+            except (ValueError, TypeError):
+                # 崩溃时只写了一半的行
+                continue
+        return len(lines)
+
+    def _write_index_entry(self, entry: Tuple):
+        """追加一行索引并写入内存索引（调用方需持有文件锁，且已读入全部索引行）"""
+        data = (json.dumps(list(entry), ensure_ascii=False) + '\n').encode('utf-8')
+        self._index_file.write(data)
+        self._index_file.flush()
+        self._index_position += len(data)
+        self._apply_index_entry(*entry)
+
+    def _refresh(self):
+        """加载索引，索引文件变大时读入其他进程追加的记录（调用方需持有锁）"""
+        if not self._loaded:
+            self._ensure_loaded()
+        elif file_size(self._index_path()) != self._index_position:
+            self._read_index_tail()
+
+    @staticmethod
+    def _truncate_partial_line(segment_path: str):
+        """截掉崩溃时写了一半的最后一行，保证后续追加从完整的行边界开始"""
+        with open(segment_path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+
+            # 向前查找最后一个换行符
+            position = size
+            while position > 0:
+                chunk_start = max(0, position - 65536)
+                f.seek(chunk_start)
+                chunk = f.read(position - chunk_start)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    f.truncate(chunk_start + newline + 1)
+                    break
+                position = chunk_start
+            else:
+                f.truncate(0)
+            logger.warning(f"⚠️ 已截掉归档分段末尾不完整的记录: {segment_path}")
+
+    @staticmethod
+    def _new_segment_name(number: int) -> str:
+        """生成分段文件名"""
+        return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    @staticmethod
+    def _read_segment(segment_path: str, start: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """顺序读取分段文件，返回(偏移, 长度, 记录)，跳过不完整的行"""
+        with open(segment_path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                length = len(line)
+                if line.endswith(b'\n'):
+                    try:
+                        yield offset, length, json.loads(line)
+                    except ValueError:
+                        logger.warning(f"⚠️ 跳过损坏的归档记录: {segment_path}@{offset}")
+                offset += length
+
+    # ==================== 写入 ====================
+
+    def append(self, note_id: str, kind: str, data: Dict[str, Any], session_id: str = None) -> str:
+        """
+        追加一条笔记记录，同一笔记同一类型的新记录会覆盖索引中的旧记录
+
+        Args:
+            note_id: 笔记ID
+            kind: 记录类型（detail/extracted）
+            data: 记录内容
+            session_id: 会话ID（可选）
+
+        Returns:
+            记录位置，格式为 <分段文件路径>#<偏移>
+        """
+        record = {
+            'note_id': note_id,
+            'kind': kind,
+            'session_id': session_id,
+            'archived_at': datetime.now().isoformat(),
+            'data': data,
+        }
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._lock:
+            with self._file_lock:
+                # 先读入其他进程追加的索引，当前分段可能已被其他进程滚动
+                self._refresh()
+                self._open_segment(self._segment_name)
+
+                # 其他进程也在追加同一分段，偏移以文件实际末尾为准
+                offset = self._segment_file.seek(0, os.SEEK_END)
+                if offset and offset + len(line) > self.segment_max_bytes:
+                    # 滚动到新分段
+                    number = int(self._segment_name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                    self._open_segment(self._new_segment_name(number + 1))
+                    offset = self._segment_file.seek(0, os.SEEK_END)
+
+                self._segment_file.write(line)
+                self._segment_file.flush()
+                self._write_index_entry((note_id, kind, self._segment_name, offset, len(line), session_id))
+                segment_path = os.path.join(self.archive_dir, self._segment_name)
+
+        return f"{segment_path}#{offset}"
+
+    def _open_segment(self, segment_name: str):
+        """打开用于追加的分段文件（调用方需持有锁）"""
+        if self._segment_file is not None and os.path.basename(self._segment_file.name) == segment_name:
+            return
+        if self._segment_file is not None:
+            self._segment_file.close()
+        self._segment_name = segment_name
+        self._segment_file = open(os.path.join(self.archive_dir, segment_name), 'ab')
+
+    # ==================== 读取 ====================
+
+    def get_record(self, note_id: str, kind: str = KIND_DETAIL) -> Optional[Dict[str, Any]]:
+        """按笔记ID读取最新的完整记录（含元数据），不存在返回None"""
+        with self._lock:
+            self._refresh()
+            entry = self._index.get((note_id, kind))
+        if entry is None:
+            return None
+
+        segment, offset, length, _ = entry
+        with open(os.path.join(self.archive_dir, segment), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def get(self, note_id: str, kind: str = KIND_DETAIL) -> Optional[Dict[str, Any]]:
+        """按笔记ID读取最新的记录内容，不存在返回None"""
+        record = self.get_record(note_id, kind)
+        return record['data'] if record else None
+
+    def scan(self, kind: str = None, latest_only: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        顺序扫描归档记录
+
+        Args:
+            kind: 只返回指定类型的记录（None表示全部）
+            latest_only: 是否跳过已被新记录覆盖的旧版本
+        """
+        with self._lock:
+            self._refresh()
+            segments = self._segment_names()
+            latest = {(entry[0], entry[1]) for entry in self._index.values()} if latest_only else None
+
+        for segment in segments:
+            for offset, _, record in self._read_segment(os.path.join(self.archive_dir, segment)):
+                if kind and record.get('kind') != kind:
+                    continue
+                if latest is not None and (segment, offset) not in latest:
+                    continue
+                yield record
+
+    def note_ids(self, kind: str = None, session_id: str = None) -> List[str]:
+        """列出归档中的笔记ID（只查索引，不读分段文件）"""
+        with self._lock:
+            self._refresh()
+            return [
+                note_id for (note_id, entry_kind), entry in self._index.items()
+                if (kind is None or entry_kind == kind) and (session_id is None or entry[3] == session_id)
+            ]
+
+    def count(self, kind: str = None, session_id: str = None) -> int:
+        """统计归档中的笔记数量"""
+        return len(self.note_ids(kind, session_id))
+
+    # ==================== 压缩 ====================
+
+    def compact_to_parquet(self, output_path: str = None, kind: str = None) -> str:
+        """
+        把每篇笔记的最新记录导出为Parquet列式文件（需要安装pyarrow）
+
+        Args:
+            output_path: 输出文件路径（默认为归档目录下的 notes.parquet）
+            kind: 只导出指定类型的记录
+
+        Returns:
+            输出文件路径
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet压缩需要安装pyarrow: pip install pyarrow")
+
+        columns = {name: [] for name in ('note_id', 'kind', 'session_id', 'archived_at', 'title', 'author', 'content', 'data')}
+        for record in self.scan(kind=kind):
+            data = record.get('data') or {}
+            columns['note_id'].append(record['note_id'])
+            columns['kind'].append(record['kind'])
+            columns['session_id'].append(record.get('session_id'))
+            columns['archived_at'].append(record.get('archived_at'))
+            columns['title'].append(data.get('title'))
+            columns['author'].append(data.get('author') or data.get('author_name'))
+            columns['content'].append(data.get('content'))
+            columns['data'].append(json.dumps(data, ensure_ascii=False))
+
+        output_path = output_path or os.path.join(self.archive_dir, 'notes.parquet')
+        pq.write_table(pa.table(columns), output_path, compression='zstd')
+        logger.info(f"💾 归档已压缩为Parquet: {output_path} ({len(columns['note_id'])} 条)")
+        return output_path
+
+    def close(self):
+        """关闭打开的文件句柄"""
+        with self._lock:
+            for handle in (self._segment_file, self._index_file):
+                if handle:
+                    handle.close()
+            self._segment_file = None
+            self._index_file = None
+            self._loaded = False
+            self._index = {}
+            self._indexed_end = {}
+            self._index_position = 0
+
+
+# 全局笔记归档实例
+note_archive = NoteArchive()
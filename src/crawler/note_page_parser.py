@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+小红书笔记页面解析模块
+每个笔记页面只构建一次DOM树，标题、内容、标签、作者和图片提取器共享同一个解析结果
+"""
+
+import json
+import re
+import logging
+from datetime import datetime
+from typing import List, Dict, Any
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 优先使用lxml解析器（C实现，比html.parser快数倍），不可用时回退到内置解析器
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+def _compile_selectors(selectors: List[str]) -> List[Any]:
+    """预编译CSS选择器，避免每个页面重复解析选择器字符串"""
+    return [soupsieve.compile(selector) for selector in selectors]
+
+
+# ==================== 预编译选择器 ====================
+
+TITLE_SELECTORS = _compile_selectors([
+    'h1.title',
+    '.note-title',
+    '[data-testid="note-title"]',
+    'h1',
+    '.content-title',
+    'title'
+])
+
+CONTENT_SELECTORS = _compile_selectors([
+    '.note-content',
+    '.content-text',
+    '[data-testid="note-content"]',
+    '.desc',
+    '.note-desc',
+    '.content-desc'
+])
+
+TAG_SELECTORS = _compile_selectors([
+    '.tag',
+    '.hashtag',
+    '.topic',
+    '[data-testid="tag"]',
+    '.note-tag',
+    '.topic-tag'
+])
+
+AUTHOR_SELECTORS = _compile_selectors([
+    '.author-name',
+    '.user-name',
+    '[data-testid="author"]',
+    '.note-author',
+    '.username'
+])
+
+HASHTAG_PATTERN = re.compile(r'#([^#\s]+)')
+
+# 过滤掉小图标和无关图片的关键词
+IMAGE_SKIP_KEYWORDS = ('icon', 'avatar', 'logo', 'button')
+
+# JSON中可能存放正文内容的字段
+JSON_CONTENT_KEYS = ('desc', 'content', 'text', 'title')
+
+
+class ParsedNotePage:
+    """解析后的笔记页面 - 整个页面生命周期内只解析一次"""
+
+    def __init__(self, page_source: str):
+        """
+        解析页面源码
+
+        Args:
+            page_source: 页面HTML源码
+        """
+        self.page_source = page_source
+        self.soup = BeautifulSoup(page_source, HTML_PARSER)
+        self._text = None
+
+    def select_first_text(self, selectors: List[Any]) -> str:
+        """按优先级依次尝试预编译选择器，返回第一个非空文本"""
+        for selector in selectors:
+            element = selector.select_one(self.soup)
+            if element:
+                text = element.get_text(strip=True)
+                if text:
+                    return text
+        return ""
+
+    def get_text(self) -> str:
+        """获取页面纯文本（缓存结果，供多个提取器复用）"""
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    def extract_title(self) -> str:
+        """提取标题"""
+        try:
+            title = self.select_first_text(TITLE_SELECTORS)
+            if title:
+                return title
+
+            # 从页面title标签提取
+            title_tag = self.soup.find('title')
+            if title_tag:
+                title = title_tag.get_text(strip=True)
+                # 清理标题
+                title = title.replace(' - 小红书', '').replace(' | 小红书', '').strip()
+                if title:
+                    return title
+
+            return "未找到标题"
+
+        except Exception as e:
+            logger.error(f"提取标题失败: {str(e)}")
+            return "标题提取失败"
+
+    def extract_content(self) -> str:
+        """提取内容"""
+        try:
+            content = self.select_first_text(CONTENT_SELECTORS)
+            if content:
+                return content
+
+            # 尝试从script标签中提取JSON数据
+            for script in self.soup.find_all('script'):
+                if script.string and 'window.__INITIAL_STATE__' in script.string:
+                    try:
+                        # 提取JSON数据
+                        json_start = script.string.find('{')
+                        json_end = script.string.rfind('}') + 1
+                        if json_start != -1 and json_end != -1:
+                            data = json.loads(script.string[json_start:json_end])
+
+                            # 在JSON中查找内容
+                            content = extract_content_from_json(data)
+                            if content:
+                                return content
+                    except Exception:
+                        continue
+
+            return "未找到内容"
+
+        except Exception as e:
+            logger.error(f"提取内容失败: {str(e)}")
+            return "内容提取失败"
+
+    def extract_tags(self) -> List[str]:
+        """提取标签"""
+        try:
+            tags = []
+
+            for selector in TAG_SELECTORS:
+                for element in selector.select(self.soup):
+                    tag_text = element.get_text(strip=True)
+                    if tag_text and tag_text not in tags:
+                        # 清理标签文本
+                        tag_text = tag_text.replace('#', '').strip()
+                        if tag_text:
+                            tags.append(tag_text)
+
+            # 从文本中提取#标签
+            for tag in HASHTAG_PATTERN.findall(self.get_text()):
+                if tag not in tags:
+                    tags.append(tag)
+
+            return tags[:10]  # 最多返回10个标签
+
+        except Exception as e:
+            logger.error(f"提取标签失败: {str(e)}")
+            return []
+
+    def extract_author(self) -> str:
+        """提取作者信息"""
+        try:
+            return self.select_first_text(AUTHOR_SELECTORS) or "未知作者"
+        except Exception as e:
+            logger.error(f"提取作者失败: {str(e)}")
+            return "作者提取失败"
+
+    def extract_image_urls(self) -> List[str]:
+        """提取笔记图片URL（已过滤图标并补全为完整URL）"""
+        image_urls = []
+
+        for img in self.soup.find_all('img'):
+            src = img.get('src') or img.get('data-src') or img.get('data-original')
+            if not src:
+                continue
+
+            # 过滤掉小图标和无关图片
+            src_lower = src.lower()
+            if any(keyword in src_lower for keyword in IMAGE_SKIP_KEYWORDS):
+                continue
+
+            # 确保是完整URL
+            if src.startswith('//'):
+                src = 'https:' + src
+            elif src.startswith('/'):
+                src = 'https://www.xiaohongshu.com' + src
+
+            image_urls.append(src)
+
+        return image_urls
+
+
+def extract_content_from_json(data: Any) -> str:
+    """从JSON数据中提取内容"""
+    try:
+        def search_content(obj):
+            if isinstance(obj, dict):
+                for key, value in obj.items():
+                    if key in JSON_CONTENT_KEYS and isinstance(value, str) and len(value) > 10:
+                        return value
+                    result = search_content(value)
+                    if result:
+                        return result
+            elif isinstance(obj, list):
+                for item in obj:
+                    result = search_content(item)
+                    if result:
+                        return result
+            return None
+
+        return search_content(data) or ""
+
+    except Exception as e:
+        logger.error(f"从JSON提取内容失败: {str(e)}")
+        return ""
+
+
+def parse_note_page(page_source: str, note_id: str, session_id: str, index: int) -> Dict[str, Any]:
+    """
+    解析笔记页面，返回结构化的笔记详情
+
+    Args:
+        page_source: 页面HTML源码
+        note_id: 笔记ID
+        session_id: 会话ID
+        index: 笔记序号
+
+    Returns:
+        Dict: 笔记详情，image_urls字段为待下载的图片URL列表
+    """
+    try:
+        page = ParsedNotePage(page_source)
+        return {
+            'note_id': note_id,
+            'title': page.extract_title(),
+            'content': page.extract_content(),
+            'tags': page.extract_tags(),
+            'author': page.extract_author(),
+            'image_urls': page.extract_image_urls(),
+            'crawl_time': datetime.now().isoformat(),
+            'session_id': session_id,
+            'index': index
+        }
+
+    except Exception as e:
+        logger.error(f"解析笔记内容失败: {str(e)}")
+        return {
+            'note_id': note_id,
+            'title': '解析失败',
+            'content': '解析失败',
+            'tags': [],
+            'author': '未知',
+            'image_urls': [],
+            'error': str(e)
+        }
+
+
+def parse_note_file(source_file: str, note_id: str, session_id: str, index: int) -> Dict[str, Any]:
+    """
+    进程池任务入口：按文件路径读取并解析页面
+    只在进程间传递文件路径，避免序列化整个页面源码
+
+    Args:
+        source_file: 已保存的页面源码文件路径
+        note_id: 笔记ID
+        session_id: 会话ID
+        index: 笔记序号
+
+    Returns:
+        Dict: 笔记详情
+    """
+    with open(source_file, 'r', encoding='utf-8') as f:
+        page_source = f.read()
+    return parse_note_page(page_source, note_id, session_id, index)
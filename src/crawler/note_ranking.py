@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果排序与相关性判定
+把一批 NoteRecord 装入列数组（评论、点赞、收藏、浏览、关键词命中等特征），一次向量化计算：
+1. 加权得分 - 各互动数据取 log1p 后按权重相加，再加上关键词命中加分，权重可配置
+2. 相关性掩码 - 与原有的 low/medium/high 三档验证规则一致
+3. 稳定的Top-K - 得分相同时保持原有顺序
+安装了NumPy时使用向量化实现，否则退回纯Python实现，结果一致
+"""
+
+import re
+import math
+import logging
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.server.lazy_import import lazy_import
+
+try:
+    # 首次计算时才导入NumPy
+    np = lazy_import('numpy')
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from src.crawler.note_record import NoteRecord, records_from_dicts
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认权重：评论 > 收藏 > 点赞 > 浏览，标题命中关键词额外加分
+DEFAULT_WEIGHTS = {
+    'comments': 1.0,
+    'collects': 0.6,
+    'likes': 0.4,
+    'views': 0.1,
+    'title_hit': 1.5,
+    'text_hit': 0.5,
+}
+
+STAT_FEATURES = ('comments', 'collects', 'likes', 'views')
+HIT_FEATURES = ('title_hit', 'text_hit')
+
+VALIDATION_LEVELS = ('low', 'medium', 'high')
+
+# 小批量时数组构造的开销大于收益，直接使用纯Python实现
+NUMPY_MIN_BATCH = 64
+
+
+# 参与关键词匹配的文本列：标题单独计分，其余合并为正文命中
+TEXT_COLUMNS = ('title', 'desc', 'author', 'tags')
+
+_SEPARATOR = '\x00'
+
+
+def _text_columns(records: Sequence[NoteRecord]) -> Dict[str, List[str]]:
+    """取出各文本列并转为小写"""
+    return {
+        'title': list(map(str.lower, map(attrgetter('title'), records))),
+        'desc': list(map(str.lower, map(attrgetter('desc'), records))),
+        'author': list(map(str.lower, map(attrgetter('author'), records))),
+        'tags': list(map(str.lower, map(' '.join, map(attrgetter('tags'), records)))),
+    }
+
+
+def _keyword_features(records: Sequence[NoteRecord], keyword: str) -> Dict[str, list]:
+    """逐条计算文本特征（纯Python实现）"""
+    keyword_lower = (keyword or '').lower().strip()
+    keyword_words = keyword_lower.split()
+    columns = _text_columns(records)
+    features = {name: [] for name in ('title_hit', 'text_hit', 'word_hits', 'has_text', 'has_cover')}
+
+    for i, record in enumerate(records):
+        texts = [columns[name][i] for name in TEXT_COLUMNS]
+        title_hit = bool(keyword_lower) and keyword_lower in texts[0]
+        features['title_hit'].append(title_hit)
+        features['text_hit'].append(
+            bool(keyword_lower) and not title_hit and any(keyword_lower in text for text in texts[1:])
+        )
+        features['word_hits'].append(sum(1 for word in keyword_words if any(word in text for text in texts)))
+        features['has_text'].append(len(record.title.strip()) > 3 and len(record.desc.strip()) > 10)
+        features['has_cover'].append(bool(record.cover))
+
+    return features
+
+
+def _hit_vector(texts: List[str], needle: str):
+    """
+    向量化子串匹配：把一列文本拼成一个字符串，一次正则扫描找出所有命中位置，
+    再用 searchsorted 映射回所在行
+    """
+    hits = np.zeros(len(texts), dtype=bool)
+    if not needle or not texts:
+        return hits
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths + len(_SEPARATOR))[:-1]))
+    blob = _SEPARATOR.join(texts)
+    # 命中后直接跳到行尾，每行最多产生一个匹配
+    pattern = re.compile(re.escape(needle) + f'[^{_SEPARATOR}]*')
+    positions = np.fromiter((m.start() for m in pattern.finditer(blob)), dtype=np.int64)
+    if positions.size:
+        hits[np.searchsorted(starts, positions, side='right') - 1] = True
+    return hits
+
+
+def _keyword_features_numpy(records: Sequence[NoteRecord], keyword: str) -> Dict[str, Any]:
+    """按列计算文本特征（NumPy实现，规则与 _keyword_features 一致）"""
+    count = len(records)
+    keyword_lower = (keyword or '').lower().strip()
+    columns = _text_columns(records)
+
+    def any_column_hit(needle):
+        hit = _hit_vector(columns['title'], needle)
+        for name in TEXT_COLUMNS[1:]:
+            hit |= _hit_vector(columns[name], needle)
+        return hit
+
+    title_hit = _hit_vector(columns['title'], keyword_lower)
+    text_hit = np.zeros(count, dtype=bool)
+    for name in TEXT_COLUMNS[1:]:
+        text_hit |= _hit_vector(columns[name], keyword_lower)
+
+    word_hits = np.zeros(count, dtype=np.int64)
+    for word in keyword_lower.split():
+        word_hits += any_column_hit(word)
+
+    title_lengths = np.fromiter(map(len, map(str.strip, columns['title'])), dtype=np.int64, count=count)
+    desc_lengths = np.fromiter(map(len, map(str.strip, columns['desc'])), dtype=np.int64, count=count)
+    return {
+        'title_hit': title_hit,
+        'text_hit': text_hit & ~title_hit,
+        'word_hits': word_hits,
+        'has_text': (title_lengths > 3) & (desc_lengths > 10),
+        'has_cover': np.fromiter(map(bool, map(attrgetter('cover'), records)), dtype=bool, count=count),
+    }
+
+
+class NoteRanker:
+    """搜索结果排序器"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, use_numpy: bool = True):
+        """
+        初始化排序器
+
+        Args:
+            weights: 覆盖默认权重的字典（只需给出要修改的项）
+            use_numpy: 是否使用NumPy向量化实现（未安装NumPy时自动退回纯Python）
+        """
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update({key: float(value) for key, value in weights.items() if key in DEFAULT_WEIGHTS})
+        self.use_numpy = use_numpy and NUMPY_AVAILABLE
+
+    def rank(self, results: Sequence[Any], keyword: str = '', top_k: Optional[int] = None,
+             validation_level: Optional[str] = 'medium') -> List[NoteRecord]:
+        """
+        计算得分和相关性，返回按得分降序的前K条相关结果
+
+        Args:
+            results: NoteRecord 或结果字典列表
+            keyword: 搜索关键词（为空时不做相关性过滤，也没有命中加分）
+            top_k: 返回数量（None表示全部）
+            validation_level: 相关性验证严格度 low/medium/high
+
+        Returns:
+            排序后的 NoteRecord 列表
+        """
+        records = records_from_dicts(results)
+        if not records:
+            return []
+
+        if self.use_numpy and len(records) >= NUMPY_MIN_BATCH:
+            order = self._rank_numpy(records, keyword, top_k, validation_level)
+        else:
+            order = self._rank_python(records, keyword, top_k, validation_level)
+        return [records[i] for i in order]
+
+    def relevance_mask(self, results: Sequence[Any], keyword: str,
+                       validation_level: Optional[str] = 'medium') -> List[bool]:
+        """只计算相关性掩码（保持原有顺序）"""
+        records = records_from_dicts(results)
+        if not records:
+            return []
+        if self.use_numpy and len(records) >= NUMPY_MIN_BATCH:
+            stats = self._stat_matrix(records)
+            features = _keyword_features_numpy(records, keyword)
+            return self._mask_numpy(stats, features, keyword, validation_level).tolist()
+
+        features = _keyword_features(records, keyword)
+        return [
+            self._is_relevant(records[i], features, i, keyword, validation_level)
+            for i in range(len(records))
+        ]
+
+    # ==================== NumPy实现 ====================
+
+    @staticmethod
+    def _stat_matrix(records: List[NoteRecord]):
+        """互动数据装入 (N, 4) 数组，列顺序同 STAT_FEATURES"""
+        count = len(records)
+        stats = np.empty((count, len(STAT_FEATURES)), dtype=np.float64)
+        for column, name in enumerate(STAT_FEATURES):
+            stats[:, column] = np.fromiter(map(attrgetter(name), records), dtype=np.float64, count=count)
+        np.maximum(stats, 0, out=stats)
+        return stats
+
+    def _rank_numpy(self, records: List[NoteRecord], keyword: str, top_k: Optional[int],
+                    validation_level: Optional[str]) -> List[int]:
+        """向量化计算得分、掩码和Top-K"""
+        stats = self._stat_matrix(records)
+        features = _keyword_features_numpy(records, keyword)
+        hits = np.column_stack([features['title_hit'], features['text_hit']]).astype(np.float64)
+
+        stat_weights = np.array([self.weights[name] for name in STAT_FEATURES])
+        hit_weights = np.array([self.weights[name] for name in HIT_FEATURES])
+        scores = np.log1p(stats) @ stat_weights + hits @ hit_weights
+
+        mask = self._mask_numpy(stats, features, keyword, validation_level)
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+
+        candidate_scores = scores[candidates]
+        if top_k is not None and top_k < candidates.size:
+            # 先用 partition 找到第K大的得分，只对不低于它的候选做稳定排序
+            kth = np.partition(candidate_scores, candidates.size - top_k)[candidates.size - top_k]
+            keep = candidate_scores >= kth
+            candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+
+        order = candidates[np.argsort(-candidate_scores, kind='stable')]
+        return order[:top_k].tolist() if top_k is not None else order.tolist()
+
+    @staticmethod
+    def _mask_numpy(stats, features: Dict[str, list], keyword: str, validation_level: Optional[str]):
+        """向量化计算相关性掩码"""
+        count = stats.shape[0]
+        keyword_words = (keyword or '').lower().split()
+        if not keyword_words or validation_level not in ('medium', 'high'):
+            return np.ones(count, dtype=bool)
+
+        full_hit = features['title_hit'] | features['text_hit']
+        if validation_level == 'high':
+            return full_hit
+
+        # stats 列顺序：comments, collects, likes, views
+        return (
+            full_hit
+            | (features['word_hits'] >= max(1, len(keyword_words) // 2))
+            | features['has_text']
+            | features['has_cover']
+            | (stats[:, 0] > 0) | (stats[:, 2] > 0)
+        )
+
+    # ==================== 纯Python实现 ====================
+
+    def score(self, record: NoteRecord, title_hit: bool = False, text_hit: bool = False) -> float:
+        """单条记录的加权得分"""
+        value = sum(self.weights[name] * math.log1p(max(getattr(record, name), 0)) for name in STAT_FEATURES)
+        return value + self.weights['title_hit'] * title_hit + self.weights['text_hit'] * text_hit
+
+    @staticmethod
+    def _is_relevant(record: NoteRecord, features: Dict[str, list], index: int,
+                     keyword: str, validation_level: Optional[str]) -> bool:
+        """单条记录的相关性判定（规则与 _mask_numpy 一致）"""
+        keyword_words = (keyword or '').lower().split()
+        if not keyword_words or validation_level not in ('medium', 'high'):
+            return True
+
+        full_hit = features['title_hit'][index] or features['text_hit'][index]
+        if validation_level == 'high':
+            return full_hit
+        return (
+            full_hit
+            or features['word_hits'][index] >= max(1, len(keyword_words) // 2)
+            or features['has_text'][index]
+            or features['has_cover'][index]
+            or record.likes > 0 or record.comments > 0
+        )
+
+    def _rank_python(self, records: List[NoteRecord], keyword: str, top_k: Optional[int],
+                     validation_level: Optional[str]) -> List[int]:
+        """纯Python实现（sorted 本身是稳定排序）"""
+        features = _keyword_features(records, keyword)
+        candidates = [
+            i for i in range(len(records))
+            if self._is_relevant(records[i], features, i, keyword, validation_level)
+        ]
+        scores = {
+            i: self.score(records[i], features['title_hit'][i], features['text_hit'][i])
+            for i in candidates
+        }
+        order = sorted(candidates, key=lambda i: -scores[i])
+        return order[:top_k] if top_k is not None else order
+
+
+# 全局默认排序器实例
+note_ranker = NoteRanker()
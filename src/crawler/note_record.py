@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记记录类型
+搜索结果在各个提取策略、缓存和API之间统一使用 NoteRecord：
+1. 字段名统一 - like_count/comment_count/cover_image/description 等别名在构造时归一
+2. 紧凑存储 - __slots__ 去掉每条记录的实例字典，互动数据为整数，作者和标签字符串驻留复用
+3. 唯一的序列化路径 - from_dict / to_dict，缓存文件和API响应都经过这里
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+# 别名 -> 标准字段名
+FIELD_ALIASES = {
+    'note_id': 'id',
+    'link': 'url',
+    'note_url': 'url',
+    'description': 'desc',
+    'content': 'desc',
+    'author_name': 'author',
+    'nickname': 'author',
+    'cover_image': 'cover',
+    'cover_url': 'cover',
+    'like_count': 'likes',
+    'liked_count': 'likes',
+    'comment_count': 'comments',
+    'collect_count': 'collects',
+    'collected_count': 'collects',
+    'view_count': 'views',
+}
+
+STAT_FIELDS = ('likes', 'comments', 'collects', 'views')
+
+# 序列化时的字段顺序（与原有缓存/API的键保持一致）
+RECORD_FIELDS = ('id', 'url', 'xsec_token', 'title', 'desc', 'author', 'cover') + STAT_FIELDS + ('tags',)
+
+_UNITS = (('万', 10000), ('w', 10000), ('k', 1000), ('m', 1000000))
+
+
+def parse_count(value: Any) -> int:
+    """把互动数据（整数、'1.2万'、'3k'、'10+'等）解析为整数，无法解析时返回0"""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+
+    text = str(value).strip().lower().replace(',', '').rstrip('+')
+    if not text:
+        return 0
+    try:
+        for unit, multiplier in _UNITS:
+            if text.endswith(unit):
+                return int(float(text[:-len(unit)]) * multiplier)
+        return int(float(text))
+    except ValueError:
+        return 0
+
+
+def _intern_text(value: Any) -> str:
+    """作者名等高重复字符串驻留，相同字符串只保留一份"""
+    if isinstance(value, dict):
+        value = value.get('nickname') or value.get('name') or ''
+    if not value:
+        return ''
+    return sys.intern(str(value))
+
+
+def _intern_tags(value: Any) -> tuple:
+    """标签统一为驻留字符串元组"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = [value]
+    tags = []
+    for tag in value:
+        if isinstance(tag, dict):
+            tag = tag.get('name') or ''
+        if tag:
+            tags.append(sys.intern(str(tag)))
+    return tuple(tags)
+
+
+class NoteRecord:
+    """单条笔记搜索结果"""
+
+    __slots__ = RECORD_FIELDS + ('extra',)
+
+    def __init__(self, id: str = '', url: str = '', xsec_token: Optional[str] = None,
+                 title: str = '', desc: str = '', author: Any = '', cover: str = '',
+                 likes: Any = 0, comments: Any = 0, collects: Any = 0, views: Any = 0,
+                 tags: Any = (), extra: Optional[Dict[str, Any]] = None):
+        self.id = id or ''
+        self.url = url or ''
+        self.xsec_token = xsec_token or None
+        self.title = title or ''
+        self.desc = desc or ''
+        self.author = _intern_text(author)
+        self.cover = cover or ''
+        self.likes = parse_count(likes)
+        self.comments = parse_count(comments)
+        self.collects = parse_count(collects)
+        self.views = parse_count(views)
+        self.tags = _intern_tags(tags)
+        # 非标准字段（如 duplicate_of、duplicate_ids），只在需要时才创建字典
+        self.extra = extra or None
+
+    # ==================== 序列化 ====================
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NoteRecord':
+        """从任意来源的字典构造记录，别名字段归一到标准字段（标准字段优先）"""
+        fields = {}
+        extra = {}
+        for key, value in data.items():
+            name = FIELD_ALIASES.get(key, key)
+            if name in RECORD_FIELDS:
+                if key == name or fields.get(name) in (None, '', 0, [], ()):
+                    fields[name] = value
+            elif name != 'extra':
+                extra[key] = value
+        return cls(extra=extra, **fields)
+
+    @classmethod
+    def coerce(cls, item: Any) -> 'NoteRecord':
+        """已是 NoteRecord 则原样返回，否则从字典构造"""
+        return item if isinstance(item, cls) else cls.from_dict(item)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为缓存文件和API使用的字典"""
+        data = {name: getattr(self, name) for name in RECORD_FIELDS}
+        data['tags'] = list(self.tags)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    # ==================== 字典式访问 ====================
+    # 去重、索引等模块按字典读取结果，这里提供同样的接口
+
+    def get(self, key: str, default: Any = None) -> Any:
+        name = FIELD_ALIASES.get(key, key)
+        if name in RECORD_FIELDS:
+            value = getattr(self, name)
+            return list(value) if name == 'tags' else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str) -> Any:
+        name = FIELD_ALIASES.get(key, key)
+        if name in RECORD_FIELDS or (self.extra and key in self.extra):
+            return self.get(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        name = FIELD_ALIASES.get(key, key)
+        if name in STAT_FIELDS:
+            value = parse_count(value)
+        elif name == 'author':
+            value = _intern_text(value)
+        elif name == 'tags':
+            value = _intern_tags(value)
+        elif name not in RECORD_FIELDS:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        setattr(self, name, value)
+
+    def __contains__(self, key: str) -> bool:
+        return FIELD_ALIASES.get(key, key) in RECORD_FIELDS or bool(self.extra and key in self.extra)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """只用于扩展字段（如 duplicate_ids），返回可变的原对象"""
+        if FIELD_ALIASES.get(key, key) in RECORD_FIELDS:
+            return self.get(key)
+        if self.extra is None:
+            self.extra = {}
+        return self.extra.setdefault(key, default)
+
+    @property
+    def engagement_key(self) -> tuple:
+        """互动数据排序键：评论数、收藏数、点赞数"""
+        return self.comments, self.collects, self.likes
+
+    def __repr__(self) -> str:
+        return f"NoteRecord(id={self.id!r}, title={self.title[:20]!r}, likes={self.likes}, comments={self.comments})"
+
+
+def records_from_dicts(items: Iterable[Any]) -> List[NoteRecord]:
+    """批量构造记录，跳过空值和无法解析的条目"""
+    records = []
+    for item in items or ():
+        if isinstance(item, (NoteRecord, dict)) and item:
+            records.append(NoteRecord.coerce(item))
+    return records
+
+
+def records_to_dicts(records: Iterable[Any]) -> List[Dict[str, Any]]:
+    """批量序列化记录（字典会先归一化，保证输出字段一致）"""
+    return [NoteRecord.coerce(record).to_dict() for record in records or ()]
@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地笔记全文索引
+对已爬取的笔记（搜索结果缓存 + 笔记归档）建立磁盘倒排索引，不启动浏览器即可在毫秒级完成检索：
+1. 分词 - 有jieba时使用搜索引擎模式分词，否则对中文做单字+双字切分
+2. 排序 - BM25，标题词频加倍
+3. 存储 - 每一代索引由不可变的倒排表（内存映射的uint32数组）和追加写入的增量日志组成，
+   增量文档数超过阈值后合并为新一代，旧文档版本在合并时清理
+4. 多进程 - 写入和合并在文件锁内进行，先读入其他进程追加的文档再分配文档编号；
+   检索时文档日志变大就读入新增的文档，其他进程合并出新一代后重新加载
+"""
+
+import os
+import re
+import json
+import math
+import mmap
+import heapq
+import hashlib
+import logging
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from src.server.lazy_import import lazy_import
+from src.crawler.file_lock import FileLock, file_size, read_new_lines
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 标题在文档中的权重（标题词重复计入词频的次数）
+TITLE_WEIGHT = 2
+
+# 描述字段保留的最大长度
+MAX_DESC_LENGTH = 300
+
+STOPWORDS = frozenset(['的', '了', '是', '在', '和', '与', '有', '着', '过', '也', '就', '都', '而', '及', '我', '你', '他', '她', '它'])
+
+_CJK_RUN = re.compile(r'[\u4e00-\u9fff]+')
+_WORD = re.compile(r'[a-z0-9]+')
+_TOKEN_CHAR = re.compile(r'[\w\u4e00-\u9fff]')
+
+try:
+    # 首次分词时才导入jieba（导入约需0.1秒）
+    jieba = lazy_import('jieba', on_load=lambda module: module.setLogLevel(logging.WARNING))
+    JIEBA_AVAILABLE = True
+except ImportError:
+    JIEBA_AVAILABLE = False
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词（建索引和查询使用同一套规则）
+
+    Args:
+        text: 待分词文本
+
+    Returns:
+        词列表（保留重复，用于统计词频）
+    """
+    if not text:
+        return []
+    text = text.lower()
+
+    if JIEBA_AVAILABLE:
+        tokens = jieba.lcut_for_search(text)
+    else:
+        tokens = _WORD.findall(text)
+        for run in _CJK_RUN.findall(text):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+
+    return [
+        token for token in (token.strip() for token in tokens)
+        if token and token not in STOPWORDS and _TOKEN_CHAR.search(token)
+    ]
+
+
+def _text_of(value: Any) -> str:
+    """把标签、作者等可能是字典或列表的字段转为文本"""
+    if not value:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return str(value.get('name') or value.get('nickname') or value.get('title') or '')
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text_of(item) for item in value)
+    return str(value)
+
+
+def _as_list(value: Any) -> List[Any]:
+    """把单个值或列表统一为列表"""
+    if not value:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _build_payload(note: Dict[str, Any]) -> Dict[str, Any]:
+    """从搜索结果或笔记详情中提取展示字段，兼容不同来源的字段名"""
+    payload = {
+        'title': note.get('title'),
+        'desc': note.get('desc') or note.get('content') or note.get('description'),
+        'author': _text_of(note.get('author') or note.get('author_name')),
+        'cover': note.get('cover') or note.get('cover_image'),
+        'url': note.get('url'),
+        'xsec_token': note.get('xsec_token'),
+        'likes': note.get('likes') if note.get('likes') is not None else note.get('like_count'),
+        'comments': note.get('comments') if note.get('comments') is not None else note.get('comment_count'),
+        'collects': note.get('collects') if note.get('collects') is not None else note.get('collect_count'),
+        'views': note.get('views'),
+        'tags': [_text_of(tag) for tag in _as_list(note.get('tags')) if _text_of(tag)],
+    }
+    if isinstance(payload['desc'], str) and len(payload['desc']) > MAX_DESC_LENGTH:
+        payload['desc'] = payload['desc'][:MAX_DESC_LENGTH]
+    return {key: value for key, value in payload.items() if value not in (None, '', [])}
+
+
+def _document_terms(payload: Dict[str, Any]) -> Counter:
+    """统计文档词频"""
+    terms = Counter(tokenize(payload.get('title', '')))
+    for term in terms:
+        terms[term] *= TITLE_WEIGHT
+    terms.update(tokenize(' '.join([
+        payload.get('desc', ''),
+        ' '.join(payload.get('tags', [])),
+        payload.get('author', ''),
+    ])))
+    return terms
+
+
+class NoteSearchIndex:
+    """BM25本地笔记索引"""
+
+    def __init__(self, index_dir: str = os.path.join('cache', 'search_index'), compact_threshold: int = 2000):
+        """
+        初始化索引（文件在首次使用时加载）
+
+        Args:
+            index_dir: 索引目录
+            compact_threshold: 增量文档数超过该值时合并为新一代索引
+        """
+        self.index_dir = index_dir
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(index_dir, '.lock'))
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        """清空内存状态"""
+        self.generation = 0
+        # 文档编号 -> {note_id, length, hash, payload}
+        self._docs = {}
+        # note_id -> 最新文档编号（旧编号视为已删除）
+        self._latest_doc = {}
+        self._next_doc = 0
+        self._total_length = 0
+        # 基础倒排表：词 -> (起始位置, 文档数)，位置以(文档, 词频)对为单位
+        self._base_terms = {}
+        self._base_postings = None
+        self._base_mmap = None
+        self._base_file = None
+        # 增量倒排表：词 -> {文档编号: 词频}
+        self._delta = {}
+        self._delta_docs = 0
+        self._docs_log = None
+        self._delta_log = None
+        # 已读入的增量日志字节数，以及加载时 CURRENT 文件的状态（其他进程合并后会变化）
+        self._docs_position = 0
+        self._delta_position = 0
+        self._current_state = None
+
+    # ==================== 文件布局 ====================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _generation_files(self, generation: int) -> Dict[str, str]:
+        return {
+            'docs': self._path(f'docs-{generation}.jsonl'),
+            'delta': self._path(f'delta-{generation}.jsonl'),
+            'terms': self._path(f'terms-{generation}.json'),
+            'postings': self._path(f'postings-{generation}.bin'),
+        }
+
+    # ==================== 加载 ====================
+
+    def _current_file_state(self):
+        """CURRENT 文件的状态（合并时原子替换，inode和修改时间都会变化）"""
+        try:
+            stat = os.stat(self._path('CURRENT'))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _ensure_loaded(self):
+        """加载当前一代索引（调用方需持有锁）"""
+        if self._loaded:
+            return
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        # 持有文件锁加载，避免读到其他进程合并到一半的文件
+        with self._file_lock:
+            self._current_state = self._current_file_state()
+            if self._current_state is not None:
+                with open(self._path('CURRENT'), 'r', encoding='utf-8') as f:
+                    self.generation = json.load(f)['generation']
+
+            files = self._generation_files(self.generation)
+            if os.path.exists(files['terms']):
+                with open(files['terms'], 'r', encoding='utf-8') as f:
+                    self._base_terms = {term: tuple(value) for term, value in json.load(f).items()}
+                self._open_postings(files['postings'])
+
+            self._read_log_tails(exclusive=True)
+            self._docs_log = open(files['docs'], 'ab')
+            self._delta_log = open(files['delta'], 'ab')
+        self._loaded = True
+        logger.info(f"📚 本地索引已加载: 第{self.generation}代, {len(self._latest_doc)} 篇笔记")
+
+    def _read_log_tails(self, exclusive: bool = False):
+        """
+        读入文档日志和增量日志中尚未读取的行（包括其他进程追加的，调用方需持有锁）
+
+        写入顺序是先增量后文档，增量行只在其文档已读入后才使用，文档行还没写完的增量留到下次读取
+
+        Args:
+            exclusive: 调用方是否持有文件锁（此时不会有写到一半的行，残留的是崩溃前未写完的记录，直接截掉）
+        """
+        files = self._generation_files(self.generation)
+
+        lines, self._docs_position = read_new_lines(files['docs'], self._docs_position)
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._register_doc(entry)
+
+        lines, _ = read_new_lines(files['delta'], self._delta_position)
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            if entry is not None:
+                if entry['doc'] >= self._next_doc:
+                    break
+                # 已被新版本替换的文档不再使用
+                if entry['doc'] in self._docs:
+                    self._add_delta_postings(entry['doc'], entry['tf'])
+            self._delta_position += len(line)
+
+        if exclusive:
+            for path, position in ((files['docs'], self._docs_position), (files['delta'], self._delta_position)):
+                if file_size(path) > position:
+                    os.truncate(path, position)
+
+    def _refresh(self, exclusive: bool = False):
+        """加载索引，读入其他进程新写入的文档；其他进程已合并为新一代时重新加载（调用方需持有锁）"""
+        if not self._loaded:
+            self._ensure_loaded()
+        elif self._current_file_state() != self._current_state:
+            self._close_files()
+            self._reset()
+            self._loaded = False
+            self._ensure_loaded()
+        elif exclusive or file_size(self._generation_files(self.generation)['docs']) != self._docs_position:
+            self._read_log_tails(exclusive)
+
+    def _open_postings(self, postings_path: str):
+        """内存映射基础倒排表"""
+        if not os.path.exists(postings_path) or os.path.getsize(postings_path) == 0:
+            self._base_postings = array('I')
+            return
+        self._base_file = open(postings_path, 'rb')
+        self._base_mmap = mmap.mmap(self._base_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._base_postings = memoryview(self._base_mmap).cast('I')
+
+    def _register_doc(self, entry: Dict[str, Any]):
+        """登记文档，同一笔记的旧版本失效"""
+        doc = entry['doc']
+        previous = self._latest_doc.get(entry['note_id'])
+        if previous is not None:
+            self._total_length -= self._docs[previous]['length']
+            del self._docs[previous]
+        self._docs[doc] = entry
+        self._latest_doc[entry['note_id']] = doc
+        self._total_length += entry['length']
+        self._next_doc = max(self._next_doc, doc + 1)
+
+    def _add_delta_postings(self, doc: int, term_freqs: Dict[str, int]):
+        """写入增量倒排表"""
+        for term, freq in term_freqs.items():
+            self._delta.setdefault(term, {})[doc] = freq
+        self._delta_docs += 1
+
+    # ==================== 写入 ====================
+
+    def add_note(self, note_id: str, note: Dict[str, Any], source: str = None) -> bool:
+        """
+        添加或更新一篇笔记（与已索引的字段合并，内容未变化时跳过）
+
+        Args:
+            note_id: 笔记ID
+            note: 搜索结果或笔记详情
+            source: 数据来源（search/detail/extracted）
+
+        Returns:
+            是否写入了新版本
+        """
+        if not note_id:
+            return False
+
+        with self._lock, self._file_lock:
+            self._refresh(exclusive=True)
+
+            payload = _build_payload(note)
+            previous = self._latest_doc.get(note_id)
+            if previous is not None:
+                payload = {**self._docs[previous]['payload'], **payload}
+            if source:
+                payload['source'] = source
+
+            content_hash = hashlib.md5(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+            if previous is not None and self._docs[previous]['hash'] == content_hash:
+                return False
+
+            term_freqs = _document_terms(payload)
+            if not term_freqs:
+                return False
+
+            doc = self._next_doc
+            entry = {
+                'doc': doc,
+                'note_id': note_id,
+                'length': sum(term_freqs.values()),
+                'hash': content_hash,
+                'payload': payload,
+            }
+            self._delta_position += self._append_line(self._delta_log, {'doc': doc, 'tf': term_freqs})
+            self._docs_position += self._append_line(self._docs_log, entry)
+
+            self._register_doc(entry)
+            self._add_delta_postings(doc, term_freqs)
+
+            if self._delta_docs >= self.compact_threshold:
+                self.compact()
+            return True
+
+    @staticmethod
+    def _append_line(log, entry: Dict[str, Any]) -> int:
+        """追加一行JSON并刷写，返回写入的字节数"""
+        data = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        log.write(data)
+        log.flush()
+        return len(data)
+
+    def add_notes(self, notes: Iterable[Dict[str, Any]], source: str = None) -> int:
+        """批量添加笔记（笔记ID取 id 或 note_id 字段），返回写入的数量"""
+        added = 0
+        for note in notes:
+            if isinstance(note, dict) and self.add_note(note.get('id') or note.get('note_id'), note, source):
+                added += 1
+        return added
+
+    # ==================== 合并 ====================
+
+    def compact(self):
+        """把基础倒排表和增量合并为新一代索引，清理已失效的旧文档版本"""
+        with self._lock, self._file_lock:
+            self._refresh(exclusive=True)
+
+            # 存活文档重新连续编号
+            live_docs = sorted(self._latest_doc.values())
+            renumber = {doc: new_doc for new_doc, doc in enumerate(live_docs)}
+
+            merged = {}
+            for term, (start, count) in self._base_terms.items():
+                postings = self._base_postings[start * 2:(start + count) * 2]
+                for i in range(0, len(postings), 2):
+                    new_doc = renumber.get(postings[i])
+                    if new_doc is not None:
+                        merged.setdefault(term, []).append((new_doc, postings[i + 1]))
+            for term, doc_freqs in self._delta.items():
+                for doc, freq in doc_freqs.items():
+                    new_doc = renumber.get(doc)
+                    if new_doc is not None:
+                        merged.setdefault(term, []).append((new_doc, freq))
+
+            generation = self.generation + 1
+            files = self._generation_files(generation)
+
+            postings = array('I')
+            terms = {}
+            for term, entries in merged.items():
+                entries.sort()
+                terms[term] = (len(postings) // 2, len(entries))
+                for doc, freq in entries:
+                    postings.append(doc)
+                    postings.append(freq)
+            with open(files['postings'], 'wb') as f:
+                postings.tofile(f)
+            with open(files['terms'], 'w', encoding='utf-8') as f:
+                json.dump(terms, f, ensure_ascii=False, separators=(',', ':'))
+            with open(files['docs'], 'w', encoding='utf-8') as f:
+                for doc in live_docs:
+                    entry = {**self._docs[doc], 'doc': renumber[doc]}
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            open(files['delta'], 'w').close()
+
+            # 切换到新一代（原子替换CURRENT）
+            tmp_path = self._path('CURRENT.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'generation': generation}, f)
+            os.replace(tmp_path, self._path('CURRENT'))
+
+            old_files = self._generation_files(self.generation)
+            self._close_files()
+            self._reset()
+            for path in old_files.values():
+                if os.path.exists(path):
+                    os.remove(path)
+
+            self._loaded = False
+            self._ensure_loaded()
+            logger.info(f"🗜️ 本地索引已合并为第{generation}代: {len(live_docs)} 篇笔记, {len(terms)} 个词")
+
+    # ==================== 检索 ====================
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        BM25检索
+
+        Args:
+            query: 查询文本
+            limit: 返回结果数量
+
+        Returns:
+            按得分降序排列的笔记列表（展示字段 + id + score）
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            self._refresh()
+
+            doc_count = len(self._latest_doc)
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count
+            docs = self._docs
+            scores = {}
+
+            for term in terms:
+                base = self._base_terms.get(term)
+                delta = self._delta.get(term, {})
+                df = (base[1] if base else 0) + len(delta)
+                if df == 0:
+                    continue
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+                def accumulate(doc, freq):
+                    entry = docs.get(doc)
+                    if entry is None:
+                        return
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * entry['length'] / avg_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+                if base:
+                    start, count = base
+                    postings = self._base_postings[start * 2:(start + count) * 2]
+                    for i in range(0, len(postings), 2):
+                        accumulate(postings[i], postings[i + 1])
+                for doc, freq in delta.items():
+                    accumulate(doc, freq)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {**docs[doc]['payload'], 'id': docs[doc]['note_id'], 'score': round(score, 4)}
+                for doc, score in top
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """索引统计信息"""
+        with self._lock:
+            self._refresh()
+            return {
+                'generation': self.generation,
+                'notes': len(self._latest_doc),
+                'base_terms': len(self._base_terms),
+                'delta_terms': len(self._delta),
+                'delta_docs': self._delta_docs,
+                'jieba': JIEBA_AVAILABLE,
+            }
+
+    # ==================== 重建 ====================
+
+    def rebuild_from_cache(self, search_cache_dir: str = os.path.join('cache', 'temp')) -> int:
+        """
+        从搜索结果缓存和笔记归档导入全部笔记，并合并为新一代索引
+
+        Args:
+            search_cache_dir: 搜索结果缓存目录（search_*.json）
+
+        Returns:
+            写入的笔记数量
+        """
+        from src.crawler.note_archive import note_archive
+
+        added = 0
+        if os.path.isdir(search_cache_dir):
+            for filename in sorted(os.listdir(search_cache_dir)):
+                if not (filename.startswith('search_') and filename.endswith('.json')):
+                    continue
+                try:
+                    with open(os.path.join(search_cache_dir, filename), 'r', encoding='utf-8') as f:
+                        added += self.add_notes(json.load(f).get('data', []), source='search')
+                except Exception as e:
+                    logger.warning(f"⚠️ 读取搜索缓存失败 {filename}: {e}")
+
+        for record in note_archive.scan():
+            if self.add_note(record['note_id'], record.get('data') or {}, source=record.get('kind')):
+                added += 1
+
+        self.compact()
+        logger.info(f"✅ 本地索引重建完成，新增/更新 {added} 篇笔记")
+        return added
+
+    def _close_files(self):
+        """关闭文件句柄（调用方需持有锁）"""
+        if self._base_postings is not None and isinstance(self._base_postings, memoryview):
+            self._base_postings.release()
+        for handle in (self._base_mmap, self._base_file, self._docs_log, self._delta_log):
+            if handle:
+                handle.close()
+
+    def close(self):
+        """关闭索引"""
+        with self._lock:
+            if self._loaded:
+                self._close_files()
+            self._reset()
+            self._loaded = False
+
+
+# 全局本地索引实例
+note_search_index = NoteSearchIndex()
+
+
+def main():
+    """命令行入口：重建索引或查询"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='本地笔记全文索引')
+    parser.add_argument('--rebuild', action='store_true', help='从缓存和归档重建索引')
+    parser.add_argument('query', nargs='?', help='查询关键词')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        note_search_index.rebuild_from_cache()
+    if args.query:
+        for note in note_search_index.search(args.query, args.limit):
+            print(f"{note['score']:8.3f}  {note['id']}  {note.get('title', '')}")
+    print(json.dumps(note_search_index.stats(), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
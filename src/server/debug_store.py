@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记生成调试信息存储
+每次生成的会话信息、笔记详情、分析结果、生成结果不再各写一个带缩进的JSON文件，改为：
+1. 追加写入 - 所有记录追加到按天滚动的JSONL分段（debug-YYYYMMDD-<进程号>-NNNNNN.jsonl），
+   分段名带进程号，多个Web工作进程各写各的分段，每个文件只有一个写入者
+2. 会话索引 - 每个分段配一个 .idx 文件记录 (会话ID, 步骤, 偏移, 长度)，查询一个会话只需按偏移读取；
+   查不到的会话可能由其他进程写入，重新读入各 .idx 文件新增的行后再查
+3. 后台写入 - 请求线程只做序列化并放入队列，文件写入由后台线程批量完成
+4. 保留策略 - 过期数据按整个分段删除（分段名带日期），无需逐个文件检查修改时间
+
+调试信息允许少量丢失：进程崩溃时队列中尚未写入的记录会丢失
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.crawler.file_lock import file_size, read_new_lines
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'debug-'
+SEGMENT_SUFFIX = '.jsonl'
+INDEX_SUFFIX = '.idx'
+
+# 后台线程每次最多合并写入的记录数
+WRITE_BATCH_SIZE = 256
+
+
+class DebugStore:
+    """追加写入的调试信息存储"""
+
+    def __init__(self, store_dir: str, retention_days: int = 7, segment_max_bytes: int = 32 * 1024 * 1024):
+        """
+        初始化存储（索引在首次使用时加载，写入线程在首次写入时启动）
+
+        Args:
+            store_dir: 存储目录
+            retention_days: 分段保留天数
+            segment_max_bytes: 单个分段文件的大小上限
+        """
+        self.store_dir = store_dir
+        self.retention_days = retention_days
+        self.segment_max_bytes = segment_max_bytes
+
+        # 会话ID -> {步骤: (分段文件名, 偏移, 长度)}
+        self._index = {}
+        # 索引文件名 -> 已读入的字节数
+        self._index_positions = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self._queue = queue.Queue()
+        self._writer = None
+        self._segment_name = None
+        self._segment_file = None
+        self._index_file = None
+
+    # ==================== 分段管理 ====================
+
+    def _segment_names(self) -> List[str]:
+        """按顺序列出所有分段文件名"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.store_dir)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    @staticmethod
+    def _segment_date(segment: str) -> str:
+        """分段名中的日期（YYYYMMDD）"""
+        return segment[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 8]
+
+    @staticmethod
+    def _index_name(segment: str) -> str:
+        """分段对应的索引文件名"""
+        return segment[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+    @staticmethod
+    def _segment_number(segment: str) -> int:
+        """分段名末尾的序号"""
+        return int(segment[-len(SEGMENT_SUFFIX) - 6:-len(SEGMENT_SUFFIX)])
+
+    def _ensure_loaded(self):
+        """读取各分段的索引文件（调用方需持有锁）"""
+        if self._loaded:
+            return
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._read_index_files()
+        self._loaded = True
+
+    def _read_index_files(self) -> int:
+        """读入各索引文件中尚未读取的完整行（包括其他进程写入的），返回读入的条数（调用方需持有锁）"""
+        added = 0
+        for segment in self._segment_names():
+            index_name = self._index_name(segment)
+            index_path = os.path.join(self.store_dir, index_name)
+            position = self._index_positions.get(index_name, 0)
+            if file_size(index_path) == position:
+                continue
+            lines, self._index_positions[index_name] = read_new_lines(index_path, position)
+            for line in lines:
+                try:
+                    session_id, step, offset, length = json.loads(line)
+                except (ValueError, TypeError):
+                    continue
+                self._index.setdefault(session_id, {})[step] = (segment, offset, length)
+            added += len(lines)
+        return added
+
+    def _open_segment(self, line_length: int):
+        """打开当前应写入的分段：日期变化或超过大小上限时滚动（仅写入线程调用）"""
+        # 只写本进程的分段：其他工作进程同时在写它们自己的分段
+        prefix = f"{SEGMENT_PREFIX}{datetime.now().strftime('%Y%m%d')}-{os.getpid()}-"
+        if self._segment_file is not None:
+            if self._segment_name.startswith(prefix) and \
+                    self._segment_file.tell() + line_length <= self.segment_max_bytes:
+                return
+            self._segment_file.close()
+            self._index_file.close()
+            self._segment_file = None
+
+        existing = [name for name in self._segment_names() if name.startswith(prefix)]
+        name = None
+        if existing and self._segment_name is None:
+            # 进程重启后（进程号相同）继续写当天最后一个分段
+            last = existing[-1]
+            if os.path.getsize(os.path.join(self.store_dir, last)) + line_length <= self.segment_max_bytes:
+                name = last
+
+        if name is None:
+            number = self._segment_number(existing[-1]) + 1 if existing else 1
+            name = f"{prefix}{number:06d}{SEGMENT_SUFFIX}"
+            # 每天第一个分段创建时顺带执行保留策略
+            if not existing:
+                self.apply_retention()
+
+        self._segment_name = name
+        self._segment_file = open(os.path.join(self.store_dir, name), 'ab')
+        self._index_file = open(os.path.join(self.store_dir, self._index_name(name)), 'a', encoding='utf-8')
+
+    # ==================== 写入 ====================
+
+    def append(self, session_id: str, step: str, record: Dict[str, Any]):
+        """
+        追加一条调试记录（立即序列化，文件写入交给后台线程）
+
+        Args:
+            session_id: 会话ID
+            step: 步骤名（session/note_detail/analysis/generated_note）
+            record: 记录内容
+        """
+        line = (json.dumps(record, ensure_ascii=False, default=str, separators=(',', ':')) + '\n').encode('utf-8')
+        self._ensure_writer()
+        self._queue.put((session_id, step, line))
+
+    def _ensure_writer(self):
+        """启动后台写入线程"""
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='debug-store-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.flush, 5.0)
+
+    def _write_loop(self):
+        """后台写入：每次取出队列中已有的全部记录，合并写入后统一flush"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch([item for item in batch if item is not None])
+            except Exception as e:
+                logger.error(f"写入调试信息失败: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if any(item is None for item in batch):
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, str, bytes]]):
+        """写入一批记录并更新索引"""
+        if not batch:
+            return
+        with self._lock:
+            self._ensure_loaded()
+
+        entries = []
+        for session_id, step, line in batch:
+            self._open_segment(len(line))
+            offset = self._segment_file.tell()
+            self._segment_file.write(line)
+            self._index_file.write(json.dumps([session_id, step, offset, len(line)], ensure_ascii=False) + '\n')
+            entries.append((session_id, step, (self._segment_name, offset, len(line))))
+
+        self._segment_file.flush()
+        self._index_file.flush()
+
+        with self._lock:
+            for session_id, step, location in entries:
+                self._index.setdefault(session_id, {})[step] = location
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的记录全部写入
+
+        Returns:
+            是否在超时前写完
+        """
+        if self._writer is None:
+            return True
+        done = threading.Event()
+
+        def wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+    # ==================== 读取 ====================
+
+    def get_session(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        读取会话的全部调试记录
+
+        Returns:
+            步骤名 -> 记录内容（同一步骤只保留最新一条）
+        """
+        self.flush(timeout=2.0)
+        with self._lock:
+            self._ensure_loaded()
+            if session_id not in self._index:
+                # 会话可能由其他工作进程写入
+                self._read_index_files()
+            locations = dict(self._index.get(session_id, {}))
+
+        records = {}
+        for step, (segment, offset, length) in locations.items():
+            try:
+                with open(os.path.join(self.store_dir, segment), 'rb') as f:
+                    f.seek(offset)
+                    records[step] = json.loads(f.read(length))
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取调试记录失败 {segment}@{offset}: {e}")
+        return records
+
+    def sessions(self) -> List[str]:
+        """列出所有会话ID"""
+        with self._lock:
+            self._ensure_loaded()
+            self._read_index_files()
+            return list(self._index.keys())
+
+    # ==================== 保留策略 ====================
+
+    def apply_retention(self, days: int = None) -> int:
+        """
+        删除早于保留天数的整个分段
+
+        Args:
+            days: 保留天数（默认使用初始化时的配置）
+
+        Returns:
+            删除的分段数量
+        """
+        days = self.retention_days if days is None else days
+        cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        expired = [
+            segment for segment in self._segment_names()
+            if self._segment_date(segment) < cutoff and segment != self._segment_name
+        ]
+        if not expired:
+            return 0
+
+        expired_set = set(expired)
+        with self._lock:
+            for session_id in list(self._index):
+                steps = self._index[session_id]
+                for step in [step for step, location in steps.items() if location[0] in expired_set]:
+                    del steps[step]
+                if not steps:
+                    del self._index[session_id]
+            for segment in expired:
+                self._index_positions.pop(self._index_name(segment), None)
+
+        for segment in expired:
+            for name in (segment, self._index_name(segment)):
+                try:
+                    os.remove(os.path.join(self.store_dir, name))
+                except FileNotFoundError:
+                    pass
+        logger.info(f"🗑️ 已删除 {len(expired)} 个过期调试分段")
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """存储统计信息"""
+        with self._lock:
+            self._ensure_loaded()
+            sessions = len(self._index)
+        return {
+            'sessions': sessions,
+            'segments': len(self._segment_names()),
+            'pending_writes': self._queue.qsize(),
+        }
+
+    def close(self):
+        """写完队列中的记录并关闭文件"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+            self._writer = None
+        for handle in (self._segment_file, self._index_file):
+            if handle:
+                handle.close()
+        self._segment_file = None
+        self._index_file = None
+        self._segment_name = None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记提取结果缓存
+以 提取器版本 + 文件路径 + 修改时间 + 文件大小 作为缓存键，两级缓存：
+1. 内存LRU - 直接保存序列化后的JSON字节，命中时无需任何解析
+2. 磁盘缓存 - 服务重启后仍可复用，每个源文件只保留一个缓存文件
+源文件变化或提取器版本递增后缓存键随之改变，旧结果自动失效
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.server.metrics import CACHE_REQUESTS
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 提取器版本：note_content_extractor 的提取逻辑或输出字段变化时递增，已缓存的旧结果随之失效
+EXTRACTOR_VERSION = 3
+
+
+class ExtractionCache:
+    """笔记提取结果两级缓存"""
+
+    def __init__(self, cache_dir: str = os.path.join('cache', 'extraction_cache'), max_entries: int = 256):
+        """
+        初始化缓存（磁盘缓存目录在首次写入时创建）
+
+        Args:
+            cache_dir: 磁盘缓存目录
+            max_entries: 内存LRU最多保留的条目数
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        # 源文件路径 -> (缓存键, JSON字节)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_path: str) -> str:
+        """根据提取器版本、文件路径、修改时间和大小生成缓存键（同时用作ETag）"""
+        stat = os.stat(file_path)
+        raw = f"{EXTRACTOR_VERSION}|{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, file_path: str) -> str:
+        """磁盘缓存文件路径（按源文件路径命名，源文件更新时直接覆盖）"""
+        path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{path_hash}.json")
+
+    def _remember(self, file_path: str, key: str, body: bytes):
+        """写入内存LRU"""
+        with self._lock:
+            self._memory[file_path] = (key, body)
+            self._memory.move_to_end(file_path)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, file_path: str, key: str = None) -> Optional[bytes]:
+        """
+        查询缓存
+
+        Args:
+            file_path: 源HTML文件路径
+            key: 已计算好的缓存键（可选）
+
+        Returns:
+            提取结果的JSON字节，未命中返回None
+        """
+        key = key or self.make_key(file_path)
+
+        with self._lock:
+            entry = self._memory.get(file_path)
+            if entry and entry[0] == key:
+                self._memory.move_to_end(file_path)
+                CACHE_REQUESTS.inc('note_extraction', 'memory_hit')
+                return entry[1]
+
+        disk_path = self._disk_path(file_path)
+        if os.path.exists(disk_path):
+            try:
+                with open(disk_path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+                if record.get('key') == key:
+                    body = json.dumps(record['data'], ensure_ascii=False).encode('utf-8')
+                    self._remember(file_path, key, body)
+                    CACHE_REQUESTS.inc('note_extraction', 'disk_hit')
+                    return body
+            except Exception as e:
+                logger.warning(f"读取提取缓存失败 {disk_path}: {e}")
+
+        CACHE_REQUESTS.inc('note_extraction', 'miss')
+        return None
+
+    def put(self, file_path: str, key: str, data: Dict[str, Any]) -> bytes:
+        """
+        写入缓存
+
+        Returns:
+            提取结果的JSON字节
+        """
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self._remember(file_path, key, body)
+
+        disk_path = self._disk_path(file_path)
+        tmp_path = disk_path + '.tmp'
+        try:
+            # 首次写入时才创建缓存目录，导入模块不产生文件
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'source_file': file_path, 'data': data}, f, ensure_ascii=False)
+            os.replace(tmp_path, disk_path)
+        except Exception as e:
+            logger.warning(f"写入提取缓存失败 {disk_path}: {e}")
+
+        return body
+
+    def get_or_extract(self, file_path: str,
+                       extract_func: Callable[[str], Optional[Dict[str, Any]]]) -> Tuple[Optional[str], Optional[bytes], bool]:
+        """
+        查询缓存，未命中时调用提取函数并写入缓存
+
+        Args:
+            file_path: 源HTML文件路径
+            extract_func: 提取函数，参数为文件路径，失败返回None
+
+        Returns:
+            (缓存键/ETag, JSON字节, 是否为新提取)；提取失败时JSON字节为None
+        """
+        key = self.make_key(file_path)
+        body = self.get(file_path, key)
+        if body is not None:
+            return key, body, False
+
+        data = extract_func(file_path)
+        if not data:
+            return key, None, True
+        return key, self.put(file_path, key, data), True
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._memory.clear()
+
+
+# 全局提取结果缓存实例
+extraction_cache = ExtractionCache()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+gunicorn配置（生产模式，由 app.py --server production 使用）
+- gthread 工作进程：每个进程多个线程，SSE推送和等待爬虫工作进程的请求不会占满进程
+- preload_app：主进程导入应用并预热后再 fork，工作进程共享只读数据
+- 内存中的会话状态（搜索会话、调试管理器、会话笔记列表、HTML缓存）按工作进程各自保存，
+  轮询这些状态的请求必须落到同一个进程，因此默认只启动1个工作进程、用线程数扩展并发；
+  WEB_WORKERS 大于1时需要在负载均衡上按会话保持粘滞
+
+环境变量:
+    HOST / PORT: 监听地址（默认 0.0.0.0:8080）
+    WEB_WORKERS: 工作进程数（默认1）
+    WEB_THREADS: 每个工作进程的线程数（默认16）
+    WEB_TIMEOUT: 工作进程无响应的超时（秒，默认180）
+    WEB_LOG_LEVEL: 日志级别（默认info）
+    BROWSER_PREWARM 等: 浏览器预热与保活（见 browser_warmup_from_env，只在 CRAWL_TIER=inline 时作用于Web进程）
+    METRICS_DIR: 指标快照目录（默认 cache/metrics，Web工作进程和爬虫工作进程在此交换指标快照）
+"""
+
+import os
+
+chdir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_WORKERS', 1))
+threads = int(os.environ.get('WEB_THREADS', 16))
+worker_class = 'gthread'
+preload_app = True
+
+# 告知 main_server 正在预加载：浏览器不能在主进程启动后随 fork 共享，改由 post_fork 在工作进程中启动
+os.environ['XHS_PRELOAD_APP'] = 'true'
+
+# 搜索可能需要等待爬虫工作进程较长时间
+timeout = int(os.environ.get('WEB_TIMEOUT', 180))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """工作进程启动后开始浏览器预热与保活，并定期写入指标快照（任一工作进程的 /metrics 合并全部进程）"""
+    from src.server.main_server import start_browser_warmup
+    from src.server.metrics import metrics_snapshots
+    start_browser_warmup()
+    metrics_snapshots.start()
+
+
+def worker_exit(server, worker):
+    """工作进程退出时刷写调试记录、关闭浏览器池和大模型客户端"""
+    from src.server.main_server import cleanup
+    from src.server.metrics import metrics_snapshots
+    cleanup()
+    metrics_snapshots.remove()
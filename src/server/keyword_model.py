@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语料级TF-IDF关键词模型
+单篇笔记内按词频取关键词时，“真的”“分享”这类在所有笔记里都常见的词总是排在前面。
+这里在全部已爬取笔记上维护文档频率（DF），提取关键词时按 TF × IDF 打分：
+1. 紧凑存储 - 词表逐行追加到 vocab.txt（行号即词ID），DF 是按词ID排列的 uint32 数组，
+   以内存映射方式读写（df.u32），已计入的笔记ID追加到 docs.txt，保证同一篇只计一次
+2. 增量更新 - 后台爬虫每完成一篇笔记调用 add_document()，启动时从笔记归档补齐未计入的笔记
+3. 向量化打分 - 一篇笔记的候选词映射为ID数组，bincount 得到词频，按ID取 DF 后一次算出全部得分
+4. 多进程写入 - 爬虫工作进程和Web进程都会计入笔记，add_document() 在文件锁内先读入其他进程追加的词表和笔记ID，
+   再分配新词ID、累加DF（内存映射为共享映射，其他进程的累加直接可见）；打分时笔记ID文件变大就读入新增的词
+未安装NumPy时退回纯Python实现（DF数组整体读入内存），结果一致
+"""
+
+import os
+import math
+import array
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from src.server.lazy_import import lazy_import
+
+try:
+    # 首次计算时才导入NumPy
+    np = lazy_import('numpy')
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from src.server.text_analysis import lcut
+from src.crawler.file_lock import FileLock, file_size, read_new_lines
+from src.crawler.note_archive import note_archive, KIND_DETAIL
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+VOCAB_FILENAME = 'vocab.txt'
+DF_FILENAME = 'df.u32'
+DOCS_FILENAME = 'docs.txt'
+LOCK_FILENAME = '.lock'
+
+# DF数组的初始容量（词数），不够时按倍数扩容
+INITIAL_CAPACITY = 4096
+
+# 参与统计的最短词长
+MIN_WORD_LENGTH = 2
+
+# 停用词：虚词和几乎每篇笔记都会出现的口语词
+KEYWORD_STOPWORDS = frozenset({
+    '的', '是', '在', '有', '和', '与', '了', '着', '过',
+    '一个', '这个', '那个', '我们', '你们', '他们', '大家', '自己', '什么', '怎么',
+    '就是', '还是', '但是', '因为', '所以', '如果', '然后', '已经', '可以', '没有',
+    '真的', '非常', '这样', '那么', '还有', '一下', '一些', '今天', '时候', '觉得',
+})
+
+
+def _is_candidate(word: str, stopwords: Iterable[str]) -> bool:
+    """候选关键词：至少两个字符、不是停用词、不是纯数字或标点"""
+    return len(word) >= MIN_WORD_LENGTH and word not in stopwords and any(ch.isalpha() for ch in word)
+
+
+def document_words(note: Dict[str, Any]) -> List[str]:
+    """笔记的标题、正文、标签分词结果（兼容搜索结果和笔记详情的字段名）"""
+    title = note.get('title') or ''
+    body = note.get('content') or note.get('desc') or ''
+    tags = note.get('tags') or []
+    text = f"{title} {body if isinstance(body, str) else ''} {' '.join(str(tag) for tag in tags)}"
+    return lcut(text)
+
+
+class KeywordModel:
+    """基于语料文档频率的关键词打分模型"""
+
+    def __init__(self, model_dir: str = os.path.join('cache', 'keyword_model')):
+        """
+        初始化模型（文件在首次使用时加载）
+
+        Args:
+            model_dir: 模型文件目录
+        """
+        self.model_dir = model_dir
+        # 词 -> 词ID
+        self._vocab = {}
+        self._documents = set()
+        self._df = None
+        self._capacity = 0
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(model_dir, LOCK_FILENAME))
+        self._loaded = False
+        # 已读入的词表和笔记ID文件字节数
+        self._vocab_position = 0
+        self._docs_position = 0
+        self._bootstrap_thread = None
+
+    # ==================== 存储 ====================
+
+    def _path(self, filename: str) -> str:
+        """模型文件路径"""
+        return os.path.join(self.model_dir, filename)
+
+    def _ensure_loaded(self):
+        """读取词表、已计入的笔记ID并映射DF数组（调用方需持有锁）"""
+        if self._loaded:
+            return
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        with self._file_lock:
+            self._read_tails()
+            for filename, position in ((VOCAB_FILENAME, self._vocab_position), (DOCS_FILENAME, self._docs_position)):
+                if file_size(self._path(filename)) > position:
+                    # 崩溃时只写了一半的最后一行
+                    os.truncate(self._path(filename), position)
+            existing = file_size(self._path(DF_FILENAME)) // 4
+            self._open_df(max(existing, INITIAL_CAPACITY, len(self._vocab)))
+        self._loaded = True
+
+        if self._vocab:
+            logger.info(f"📚 关键词模型已加载: {len(self._vocab)} 个词, {len(self._documents)} 篇笔记")
+
+    def _read_tails(self) -> bool:
+        """读入词表和笔记ID文件中尚未读取的完整行（包括其他进程追加的），返回是否有新内容（调用方需持有锁）"""
+        vocab_lines, self._vocab_position = read_new_lines(self._path(VOCAB_FILENAME), self._vocab_position)
+        for line in vocab_lines:
+            word = line.decode('utf-8').rstrip('\n')
+            if word:
+                self._vocab.setdefault(word, len(self._vocab))
+        docs_lines, self._docs_position = read_new_lines(self._path(DOCS_FILENAME), self._docs_position)
+        self._documents.update(line.decode('utf-8').rstrip('\n') for line in docs_lines if line.strip())
+        return bool(vocab_lines or docs_lines)
+
+    def _refresh_df(self):
+        """其他进程扩容了DF数组时重新映射；未安装NumPy时重新读入整个数组（调用方需持有锁）"""
+        capacity = max(self._capacity, file_size(self._path(DF_FILENAME)) // 4, len(self._vocab))
+        if capacity != self._capacity or not NUMPY_AVAILABLE:
+            self._open_df(capacity)
+
+    def _refresh(self, exclusive: bool = False):
+        """加载模型，读入其他进程新计入的笔记（调用方需持有锁）"""
+        if not self._loaded:
+            self._ensure_loaded()
+        elif exclusive or file_size(self._path(DOCS_FILENAME)) != self._docs_position:
+            if self._read_tails() or exclusive:
+                self._refresh_df()
+
+    def _open_df(self, capacity: int):
+        """按容量打开DF数组（文件不足时补零扩展）"""
+        df_path = self._path(DF_FILENAME)
+        size = capacity * 4
+        with open(df_path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+
+        if NUMPY_AVAILABLE:
+            if self._df is not None:
+                self._df.flush()
+            self._df = np.memmap(df_path, dtype=np.uint32, mode='r+', shape=(capacity,))
+        else:
+            self._df = array.array('I')
+            with open(df_path, 'rb') as f:
+                self._df.fromfile(f, capacity)
+        self._capacity = capacity
+
+    def _flush_df(self):
+        """DF数组写回磁盘"""
+        if NUMPY_AVAILABLE:
+            self._df.flush()
+        else:
+            with open(self._path(DF_FILENAME), 'r+b') as f:
+                self._df.tofile(f)
+
+    # ==================== 更新 ====================
+
+    def add_document(self, note_id: str, note: Dict[str, Any], stopwords: Iterable[str] = KEYWORD_STOPWORDS) -> bool:
+        """
+        把一篇笔记计入文档频率（同一笔记ID只计一次）
+
+        Args:
+            note_id: 笔记ID
+            note: 笔记内容（title/content/tags）
+            stopwords: 不参与统计的词
+
+        Returns:
+            是否新计入
+        """
+        if not note_id:
+            return False
+        with self._lock:
+            self._refresh()
+            if note_id in self._documents:
+                return False
+
+        words = {word for word in document_words(note) if _is_candidate(word, stopwords)}
+
+        # 词ID是词表中的行号，必须在读入其他进程追加的词之后再分配
+        with self._lock, self._file_lock:
+            self._refresh(exclusive=True)
+            if note_id in self._documents:
+                return False
+
+            new_words = [word for word in words if word not in self._vocab]
+            for word in new_words:
+                self._vocab[word] = len(self._vocab)
+            if new_words:
+                self._vocab_position += self._append(VOCAB_FILENAME, ''.join(f"{word}\n" for word in new_words))
+            if len(self._vocab) > self._capacity:
+                capacity = self._capacity
+                while capacity < len(self._vocab):
+                    capacity *= 2
+                self._open_df(capacity)
+
+            for word in words:
+                self._df[self._vocab[word]] += 1
+            self._flush_df()
+
+            self._documents.add(note_id)
+            self._docs_position += self._append(DOCS_FILENAME, f"{note_id}\n")
+        return True
+
+    def _append(self, filename: str, text: str) -> int:
+        """追加文本到模型文件，返回写入的字节数"""
+        data = text.encode('utf-8')
+        with open(self._path(filename), 'ab') as f:
+            f.write(data)
+        return len(data)
+
+    def start_bootstrap(self, stopwords: Iterable[str] = KEYWORD_STOPWORDS) -> bool:
+        """在后台线程把笔记归档中尚未计入的笔记详情补齐到模型"""
+        with self._lock:
+            if self._bootstrap_thread is not None:
+                return False
+            self._bootstrap_thread = threading.Thread(
+                target=self._bootstrap, args=(frozenset(stopwords),), name='keyword-model-bootstrap', daemon=True
+            )
+        self._bootstrap_thread.start()
+        return True
+
+    def wait_bootstrap(self, timeout: float = None) -> bool:
+        """
+        等待后台补齐完成（未启动补齐时立即返回）
+
+        Returns:
+            补齐是否已结束
+        """
+        thread = self._bootstrap_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def _bootstrap(self, stopwords: frozenset):
+        """补齐归档中的笔记（按笔记ID去重，可重复执行）"""
+        try:
+            with self._lock:
+                self._refresh()
+                known = set(self._documents)
+            pending = [note_id for note_id in note_archive.note_ids(KIND_DETAIL) if note_id not in known]
+            added = sum(
+                1 for note_id in pending
+                if self.add_document(note_id, note_archive.get(note_id, KIND_DETAIL) or {}, stopwords)
+            )
+            if added:
+                logger.info(f"📚 关键词模型已从归档补齐 {added} 篇笔记")
+        except Exception as e:
+            logger.warning(f"关键词模型补齐失败: {str(e)}")
+
+    # ==================== 打分 ====================
+
+    def top_keywords(self, words: List[str], top_k: int = 8, stopwords: Iterable[str] = KEYWORD_STOPWORDS) -> List[str]:
+        """
+        按 TF × IDF 取一篇笔记的关键词（语料为空时退化为按词频排序，得分相同保持首次出现顺序）
+
+        Args:
+            words: 笔记的分词结果
+            top_k: 返回数量
+            stopwords: 停用词
+
+        Returns:
+            关键词列表
+        """
+        candidates = [word for word in words if _is_candidate(word, stopwords)]
+        if not candidates:
+            return []
+
+        # 候选词按首次出现顺序编号
+        local_ids = {}
+        positions = [local_ids.setdefault(word, len(local_ids)) for word in candidates]
+        unique_words = list(local_ids)
+
+        # DF数组扩容时会重新映射，取值需在锁内完成
+        with self._lock:
+            self._refresh()
+            doc_count = len(self._documents)
+            term_ids = [self._vocab.get(word, -1) for word in unique_words]
+            if NUMPY_AVAILABLE:
+                ids = np.asarray(term_ids, dtype=np.int64)
+                known = ids >= 0
+                doc_freq = np.zeros(len(unique_words), dtype=np.float64)
+                doc_freq[known] = self._df[ids[known]]
+            else:
+                doc_freq = [self._df[term_id] if term_id >= 0 else 0 for term_id in term_ids]
+
+        if NUMPY_AVAILABLE:
+            tf = np.bincount(np.asarray(positions, dtype=np.int64), minlength=len(unique_words))
+            scores = tf * (np.log((1.0 + doc_count) / (1.0 + doc_freq)) + 1.0)
+            order = np.argsort(-scores, kind='stable')[:top_k]
+            return [unique_words[i] for i in order]
+
+        tf = Counter(positions)
+        scores = [
+            tf[i] * (math.log((1.0 + doc_count) / (1.0 + doc_freq[i])) + 1.0)
+            for i in range(len(unique_words))
+        ]
+        order = sorted(range(len(unique_words)), key=lambda i: -scores[i])[:top_k]
+        return [unique_words[i] for i in order]
+
+    def document_frequency(self, word: str) -> int:
+        """词的文档频率"""
+        with self._lock:
+            self._refresh()
+            term_id = self._vocab.get(word)
+            return int(self._df[term_id]) if term_id is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """模型统计信息"""
+        with self._lock:
+            self._refresh()
+            return {
+                'documents': len(self._documents),
+                'vocabulary': len(self._vocab),
+                'capacity': self._capacity,
+                'numpy': NUMPY_AVAILABLE,
+            }
+
+
+# 全局关键词模型实例
+keyword_model = KeywordModel()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+可选重型依赖的延迟导入
+jieba、NumPy 这类模块导入本身就要上百毫秒（jieba 还会扫描已安装的包），
+而服务启动后的前几个请求（首页、本地检索、进度查询）根本用不到它们：
+1. 导入时只确认模块已安装（importlib 查找模块规格，不执行模块代码）
+2. 首次访问模块属性时才真正导入，多线程同时首次访问时只导入一次
+未安装时 lazy_import 直接抛出 ImportError，调用方沿用原来的 try/except 写法
+"""
+
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyModule:
+    """模块代理：首次访问属性时导入真实模块"""
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        """
+        Args:
+            name: 模块名
+            on_load: 真实模块导入后执行一次的初始化（如设置日志级别）
+        """
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """导入真实模块（双重检查，只导入一次）"""
+        with self._lock:
+            if self._module is None:
+                module = importlib.import_module(self._name)
+                if self._on_load is not None:
+                    self._on_load(module)
+                self._module = module
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """真实模块是否已导入"""
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str, on_load: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    """
+    延迟导入模块
+
+    Args:
+        name: 模块名
+        on_load: 真实模块导入后执行一次的初始化
+
+    Returns:
+        模块代理
+
+    Raises:
+        ImportError: 模块未安装
+    """
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return LazyModule(name, on_load)
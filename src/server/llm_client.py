@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大模型调用客户端
+笔记生成通过 LLMClient 调用可替换的模型服务（LLMProvider）：
+1. 连接池 - HTTP实现复用同一个 requests.Session，连接数与并发上限一致
+2. 并发上限 - 批量请求与流式请求共用一个信号量，同时进行的请求数不超过 max_concurrency
+3. 微批处理 - 短时间内提交的多个提示词合并为一个请求（需要服务端支持批量接口）
+4. 结果缓存 - 以 (提示词哈希, 模型, 模板版本) 为键的LRU缓存，相同请求进行中时只发送一次
+5. 流式输出 - stream() 逐段产出模型输出，结束后写入缓存
+
+通过环境变量 LLM_BASE_URL 等配置，未配置时不启用（笔记生成退回模板）
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.server.metrics import LLM_REQUEST_SECONDS, LLM_BATCH_PROMPTS, CACHE_REQUESTS
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """模型服务调用失败"""
+
+
+class LLMProvider:
+    """模型服务接口：子类至少实现 complete()"""
+
+    name = 'base'
+
+    # 单个请求最多携带的提示词数量（1表示不支持批量）
+    max_batch_size = 1
+
+    def complete(self, prompts: List[str], model: str, **params) -> List[str]:
+        """
+        补全一批提示词
+
+        Returns:
+            与 prompts 顺序一致的输出文本
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str, model: str, **params) -> Iterator[str]:
+        """流式补全（默认一次性返回完整输出）"""
+        yield self.complete([prompt], model, **params)[0]
+
+    def close(self):
+        """释放连接等资源"""
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """OpenAI兼容的HTTP接口（/chat/completions，批量时使用 /completions）"""
+
+    name = 'openai'
+
+    def __init__(self, base_url: str, api_key: str = '', timeout: float = 60,
+                 pool_size: int = 8, batch_endpoint: bool = False, max_batch_size: int = 16):
+        """
+        初始化HTTP客户端
+
+        Args:
+            base_url: 接口地址，如 http://127.0.0.1:8765/v1
+            api_key: API密钥
+            timeout: 单个请求超时秒数
+            pool_size: 连接池大小
+            batch_endpoint: 服务端 /completions 是否接受提示词列表
+            max_batch_size: 启用批量接口时单个请求的提示词上限
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size if batch_endpoint else 1
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def _post(self, path: str, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """发送请求并检查状态码"""
+        response = self.session.post(f'{self.base_url}{path}', data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                                     timeout=self.timeout, stream=stream)
+        if response.status_code != 200:
+            message = response.text[:200]
+            response.close()
+            raise LLMError(f"模型服务返回 {response.status_code}: {message}")
+        return response
+
+    def complete(self, prompts: List[str], model: str, **params) -> List[str]:
+        if len(prompts) > 1 and self.max_batch_size > 1:
+            with LLM_REQUEST_SECONDS.time('batch'):
+                data = self._post('/completions', {'model': model, 'prompt': prompts, **params}).json()
+            choices = sorted(data.get('choices', []), key=lambda choice: choice.get('index', 0))
+            if len(choices) != len(prompts):
+                raise LLMError(f"批量结果数量不一致: {len(choices)} != {len(prompts)}")
+            return [choice.get('text', '') for choice in choices]
+
+        outputs = []
+        for prompt in prompts:
+            with LLM_REQUEST_SECONDS.time('single'):
+                data = self._post('/chat/completions', {
+                    'model': model,
+                    'messages': [{'role': 'user', 'content': prompt}],
+                    **params
+                }).json()
+            outputs.append(data['choices'][0]['message']['content'])
+        return outputs
+
+    def stream(self, prompt: str, model: str, **params) -> Iterator[str]:
+        response = self._post('/chat/completions', {
+            'model': model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'stream': True,
+            **params
+        }, stream=True)
+
+        with response:
+            for line in response.iter_lines(decode_unicode=False):
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+    def close(self):
+        self.session.close()
+
+
+# 可通过 LLM_PROVIDER 环境变量选择的实现
+PROVIDERS = {
+    OpenAICompatibleProvider.name: OpenAICompatibleProvider,
+}
+
+
+class LLMClient:
+    """带并发上限、微批处理和结果缓存的模型调用客户端"""
+
+    def __init__(self, provider: LLMProvider, model: str, max_concurrency: int = 4,
+                 max_batch_size: int = 8, batch_wait: float = 0.02, cache_size: int = 1024,
+                 params: Optional[Dict[str, Any]] = None):
+        """
+        初始化客户端（调度线程在首次请求时启动）
+
+        Args:
+            provider: 模型服务实现
+            model: 模型名称
+            max_concurrency: 同时进行的请求数上限
+            max_batch_size: 每批最多合并的提示词数量（不超过 provider.max_batch_size）
+            batch_wait: 凑批时最多等待的秒数
+            cache_size: 结果缓存条目数
+            params: 每次请求附带的参数（如 temperature、max_tokens）
+        """
+        self.provider = provider
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max(1, min(max_batch_size, provider.max_batch_size))
+        self.batch_wait = batch_wait
+        self.cache_size = cache_size
+        self.params = params or {}
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._pending = []
+        self._cond = threading.Condition()
+        self._dispatcher = None
+        self._closed = False
+        self._stats = {'requests': 0, 'prompts': 0, 'cache_hits': 0, 'coalesced': 0, 'streams': 0}
+
+    # ==================== 缓存 ====================
+
+    def cache_key(self, prompt: str, template_version: str = '') -> str:
+        """缓存键：提示词哈希 + 模型 + 模板版本"""
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+        return f"{digest}:{self.model}:{template_version}"
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        """读取缓存（调用方需持有 self._cond）"""
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+        return text
+
+    def _cache_put(self, key: str, text: str):
+        """写入缓存（调用方需持有 self._cond）"""
+        self._cache[key] = text
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ==================== 批量请求 ====================
+
+    def submit(self, prompt: str, template_version: str = '') -> Future:
+        """
+        提交一个提示词，返回输出文本的 Future
+
+        缓存命中时直接返回已完成的 Future；相同提示词正在请求时共用同一个 Future
+        """
+        key = self.cache_key(prompt, template_version)
+        with self._cond:
+            if self._closed:
+                raise LLMError("模型客户端已关闭")
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._stats['cache_hits'] += 1
+                CACHE_REQUESTS.inc('llm', 'hit')
+                future = Future()
+                future.set_result(cached)
+                return future
+            if key in self._inflight:
+                self._stats['coalesced'] += 1
+                CACHE_REQUESTS.inc('llm', 'coalesced')
+                return self._inflight[key]
+
+            CACHE_REQUESTS.inc('llm', 'miss')
+            future = Future()
+            self._inflight[key] = future
+            self._pending.append((key, prompt, future))
+            self._ensure_dispatcher()
+            self._cond.notify()
+            return future
+
+    def generate(self, prompt: str, template_version: str = '', timeout: Optional[float] = None) -> str:
+        """生成单个提示词的输出（与其他线程同时提交的提示词合并成批）"""
+        return self.submit(prompt, template_version).result(timeout)
+
+    def generate_many(self, prompts: List[str], template_version: str = '',
+                      timeout: Optional[float] = None) -> List[str]:
+        """一次提交多个提示词，按输入顺序返回输出"""
+        futures = [self.submit(prompt, template_version) for prompt in prompts]
+        return [future.result(timeout) for future in futures]
+
+    def _ensure_dispatcher(self):
+        """启动调度线程（调用方需持有 self._cond）"""
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='llm-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """凑批：第一个提示词到达后最多再等 batch_wait 秒或凑满一批，拿到并发名额后交给线程池发送"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+
+                deadline = time.monotonic() + self.batch_wait
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self._slots.acquire()
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        """发送一批提示词并设置各自的结果"""
+        try:
+            LLM_BATCH_PROMPTS.inc('batch' if len(batch) > 1 else 'single', amount=len(batch))
+            outputs = self.provider.complete([prompt for _, prompt, _ in batch], self.model, **self.params)
+            error = None
+        except Exception as e:
+            logger.warning(f"模型请求失败（{len(batch)} 个提示词）: {str(e)}")
+            outputs, error = None, e
+        finally:
+            self._slots.release()
+
+        with self._cond:
+            self._stats['requests'] += 1
+            self._stats['prompts'] += len(batch)
+            for i, (key, _, _) in enumerate(batch):
+                self._inflight.pop(key, None)
+                if error is None:
+                    self._cache_put(key, outputs[i])
+
+        for i, (_, _, future) in enumerate(batch):
+            if error is None:
+                future.set_result(outputs[i])
+            else:
+                future.set_exception(error)
+
+    # ==================== 流式请求 ====================
+
+    def stream(self, prompt: str, template_version: str = '') -> Iterator[str]:
+        """
+        流式生成：逐段产出输出文本，完整结束后写入缓存（缓存命中时一次产出全部内容）
+        """
+        key = self.cache_key(prompt, template_version)
+        with self._cond:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._stats['cache_hits'] += 1
+        if cached is not None:
+            CACHE_REQUESTS.inc('llm', 'hit')
+            yield cached
+            return
+
+        CACHE_REQUESTS.inc('llm', 'miss')
+        chunks = []
+        with self._slots:
+            with self._cond:
+                self._stats['streams'] += 1
+            LLM_BATCH_PROMPTS.inc('stream')
+            with LLM_REQUEST_SECONDS.time('stream'):
+                for chunk in self.provider.stream(prompt, self.model, **self.params):
+                    chunks.append(chunk)
+                    yield chunk
+
+        with self._cond:
+            self._cache_put(key, ''.join(chunks))
+
+    # ==================== 其他 ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """调用统计"""
+        with self._cond:
+            return {
+                **self._stats,
+                'provider': self.provider.name,
+                'model': self.model,
+                'cached': len(self._cache),
+                'pending': len(self._pending),
+                'max_concurrency': self.max_concurrency,
+                'max_batch_size': self.max_batch_size,
+            }
+
+    def close(self):
+        """发送完已提交的请求后关闭"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5.0)
+        self._executor.shutdown(wait=True)
+        self.provider.close()
+
+
+def llm_client_from_env() -> Optional[LLMClient]:
+    """
+    根据环境变量创建客户端，未设置 LLM_BASE_URL 时返回None
+
+    环境变量:
+        LLM_PROVIDER: 实现名称（默认 openai）
+        LLM_BASE_URL / LLM_API_KEY / LLM_MODEL: 接口地址、密钥、模型
+        LLM_MAX_CONCURRENCY: 并发上限（默认4）
+        LLM_BATCH_ENDPOINT: 服务端是否支持批量 /completions（默认false）
+        LLM_MAX_BATCH_SIZE / LLM_BATCH_WAIT_MS: 每批提示词上限（默认8）、凑批等待毫秒数（默认20）
+    """
+    base_url = os.environ.get('LLM_BASE_URL')
+    if not base_url:
+        return None
+
+    provider_name = os.environ.get('LLM_PROVIDER', OpenAICompatibleProvider.name)
+    provider_class = PROVIDERS.get(provider_name)
+    if provider_class is None:
+        logger.error(f"未知的模型服务实现: {provider_name}")
+        return None
+
+    max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+    max_batch_size = int(os.environ.get('LLM_MAX_BATCH_SIZE', 8))
+    provider = provider_class(
+        base_url,
+        api_key=os.environ.get('LLM_API_KEY', ''),
+        pool_size=max_concurrency,
+        batch_endpoint=os.environ.get('LLM_BATCH_ENDPOINT', 'false').lower() == 'true',
+        max_batch_size=max_batch_size,
+    )
+    client = LLMClient(
+        provider,
+        model=os.environ.get('LLM_MODEL', 'gpt-4o-mini'),
+        max_concurrency=max_concurrency,
+        max_batch_size=max_batch_size,
+        batch_wait=float(os.environ.get('LLM_BATCH_WAIT_MS', 20)) / 1000,
+    )
+    logger.info(f"🤖 已启用大模型生成: {provider_name} {client.model} @ {base_url}")
+    return client
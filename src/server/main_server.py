@@ -20,20 +20,26 @@ import hashlib
 import traceback
 import json
 import threading
-import urllib3
-
-# 禁用SSL警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import queue
+from collections import OrderedDict
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
-from flask import Flask, request, jsonify, send_from_directory, redirect, url_for
+from flask import Flask, Response, request, jsonify, send_from_directory, redirect, url_for
 from flask_cors import CORS
-from src.crawler.XHS_crawler import XiaoHongShuCrawler
 from src.server.debug_manager import debug_manager
-from src.server.note_generator import NoteContentGenerator
-from src.server.note_content_extractor import NoteContentExtractor
+from src.crawler.crawl_progress import crawl_progress, FINISHED_STATUSES
+from src.crawler.note_archive import note_archive, KIND_DETAIL, KIND_EXTRACTED
+from src.crawler.note_search_index import note_search_index
+from src.server.metrics import metrics, metrics_snapshots, CONTENT_TYPE_LATEST
+from src.server.extraction_cache import extraction_cache
+from src.crawler.browser_pool import browser_pool
+from src.crawler.browser_warmup import browser_warmup_from_env
+from src.server.text_analysis import jieba_warmup
+from src.server.keyword_model import keyword_model
+from src.server.text_patterns import text_patterns
+from src.crawler.crawl_service import crawl_service_client_from_env, CrawlServiceError
 
 # ==================== 配置和初始化 ====================
 
@@ -50,18 +56,43 @@ CORS(app)  # 允许跨域请求
 # Cookie文件路径
 COOKIES_FILE = os.path.join('cache', 'cookies', 'xiaohongshu_cookies.json')
 
+# 批量分析API单次最多处理的笔记数
+MAX_ANALYZE_NOTES = 200
+
+# 批量生成API单次最多处理的笔记数
+MAX_GENERATE_NOTES = 50
+
+# 最近搜索会话的结果（会话ID -> 笔记列表），供批量生成按会话取笔记
+MAX_SEARCH_SESSIONS = 100
+
+# 独立爬虫层模式下轮询后台爬虫进度的间隔（秒）
+BACKEND_PROGRESS_POLL_INTERVAL = 1.0
+
 # 全局爬虫实例（延迟初始化）
 crawler = None
+crawler_lock = threading.Lock()
+
+# 爬虫层客户端：CRAWL_TIER=remote 时爬虫调用都作为任务提交给爬虫工作进程，本进程不启动浏览器
+crawl_client = crawl_service_client_from_env()
+
+# 浏览器预热与保活（见 start_browser_warmup）
+browser_warmup = None
 
-# 笔记内容生成器实例
-note_generator = NoteContentGenerator()
+# 笔记内容生成器、笔记内容提取器（首次使用时创建，见 get_note_generator / get_note_extractor）
+note_generator = None
+note_extractor = None
+components_lock = threading.Lock()
 
-# 笔记内容提取器实例
-note_extractor = NoteContentExtractor()
+# 后台预热jieba词典，避免首个生成请求承担词典加载时间
+jieba_warmup.start()
 
 # HTML结果内存缓存（避免文件路径问题）
 html_results_cache = {}
 
+# 最近搜索会话的结果
+search_session_notes = OrderedDict()
+search_session_lock = threading.Lock()
+
 # ==================== 工具函数 ====================
 
 def store_html_result(html_hash, html_content):
@@ -76,6 +107,30 @@ def store_html_result(html_hash, html_content):
     html_results_cache[html_hash] = html_content
     logger.info(f"HTML内容已存储到内存缓存: {html_hash}")
 
+def get_note_generator():
+    """
+    获取笔记内容生成器（首次调用时导入并创建，不计入服务启动时间）
+    同时在后台把归档中尚未计入关键词模型的笔记补齐（导入时不读写模型文件）
+    """
+    global note_generator
+    if note_generator is None:
+        with components_lock:
+            if note_generator is None:
+                from src.server.note_generator import NoteContentGenerator
+                note_generator = NoteContentGenerator()
+                keyword_model.start_bootstrap()
+    return note_generator
+
+def get_note_extractor():
+    """获取笔记内容提取器（首次调用时导入并创建）"""
+    global note_extractor
+    if note_extractor is None:
+        with components_lock:
+            if note_extractor is None:
+                from src.server.note_content_extractor import NoteContentExtractor
+                note_extractor = NoteContentExtractor()
+    return note_extractor
+
 def init_crawler():
     """
     延迟初始化爬虫实例
@@ -85,9 +140,14 @@ def init_crawler():
         bool: 初始化是否成功
     """
     global crawler
-    if crawler is None:
+    if crawler is not None:
+        return True
+    with crawler_lock:
+        if crawler is not None:
+            return True
         try:
             logger.info("正在初始化小红书爬虫...")
+            from src.crawler.XHS_crawler import XiaoHongShuCrawler
             crawler = XiaoHongShuCrawler(
                 use_selenium=True, 
                 headless=True, 
@@ -102,7 +162,98 @@ def init_crawler():
             logger.error(traceback.format_exc())
             crawler = None
             return False
-    return True
+
+def _prewarm_crawler():
+    """创建搜索爬虫（供浏览器预热使用），失败时返回None"""
+    return crawler if init_crawler() else None
+
+def start_browser_warmup():
+    """
+    启动浏览器预热与保活（见 browser_warmup_from_env）
+    独立爬虫层模式下本进程没有浏览器，由爬虫工作进程自行预热；
+    gunicorn 预加载时不能在主进程启动浏览器，由 gunicorn_conf.post_fork 在工作进程中调用
+    
+    Returns:
+        bool: 是否已启动
+    """
+    global browser_warmup
+    if crawl_client is not None:
+        return False
+    with crawler_lock:
+        if browser_warmup is None:
+            browser_warmup = browser_warmup_from_env(_prewarm_crawler, lambda: crawler)
+        warmup = browser_warmup
+    return warmup.start() if warmup is not None else False
+
+def call_crawler(method, **params):
+    """
+    调用爬虫方法：独立爬虫层模式下提交给爬虫工作进程，否则使用本进程的爬虫实例
+    
+    Raises:
+        CrawlServiceError: 爬虫初始化失败或爬虫层不可用
+    """
+    if crawl_client is not None:
+        return crawl_client.call(method, **params)
+    if not init_crawler():
+        raise CrawlServiceError("爬虫初始化失败")
+    return getattr(crawler, method)(**params)
+
+def run_search(keyword, max_results, use_cache, session_id):
+    """执行实时搜索，搜索过程的调试信息记录到会话"""
+    if crawl_client is not None:
+        result = crawl_client.call('search', keyword=keyword, max_results=max_results, use_cache=use_cache)
+        for message, level in result['debug']:
+            debug_manager.store_debug_info(session_id, message, level)
+        for html_hash, html_content in result['html'].items():
+            store_html_result(html_hash, html_content)
+        return result['notes']
+    
+    # 设置爬虫的debug回调
+    debug_callback = debug_manager.create_debug_callback(session_id)
+    
+    # 如果爬虫支持debug回调，设置它
+    if hasattr(crawler, 'set_debug_callback'):
+        crawler.set_debug_callback(debug_callback)
+    
+    return crawler.search(keyword, max_results=max_results, use_cache=use_cache)
+
+def submit_backend_extraction(search_results, session_id):
+    """排队后台笔记内容提取任务（独立爬虫层模式下提交给爬虫工作进程）"""
+    backend_session_id = f"{session_id}_backend"
+    if crawl_client is not None:
+        crawl_client.submit_backend_extraction(search_results, backend_session_id)
+        return
+    crawl_progress.queue_session(backend_session_id, len(search_results))
+    threading.Thread(
+        target=start_backend_extraction,
+        args=(search_results, session_id),
+        daemon=True
+    ).start()
+
+def warm_up():
+    """
+    在当前线程完成各项预热（生产模式下在 fork 工作进程前调用）
+    词典、关键词模型、本地检索索引在主进程加载后由工作进程写时复制共享。
+    jieba预热和关键词模型补齐不设超时，一直等到后台线程结束：
+    fork 时若线程仍持有 jieba 或 keyword_model 的锁，子进程中没有线程会释放它，工作进程会死锁
+    """
+    started = time.perf_counter()
+    get_note_generator()
+    get_note_extractor()
+    jieba_warmup.wait()
+    keyword_model.wait_bootstrap()
+    text_patterns.groups()
+    note_search_index.stats()
+    logger.info(f"🔥 预热完成，耗时 {time.perf_counter() - started:.2f} 秒")
+
+def load_hot_keywords():
+    """读取配置中的热门关键词（app.py 的 HOT_KEYWORDS）"""
+    try:
+        from app import HOT_KEYWORDS
+        return list(HOT_KEYWORDS)
+    except ImportError:
+        logger.warning("无法读取热门关键词配置")
+        return []
 
 def get_project_root():
     """获取项目根目录路径"""
@@ -198,6 +349,7 @@ def login():
     """
     try:
         # 创建专门用于登录的爬虫实例（非无头模式）
+        from src.crawler.XHS_crawler import XiaoHongShuCrawler
         login_crawler = XiaoHongShuCrawler(use_selenium=True, headless=False)
         success = login_crawler.login()
         login_crawler.close()
@@ -206,6 +358,8 @@ def login():
             # 登录成功后重置主爬虫实例，以使用新的cookie
             global crawler
             crawler = None
+            if crawl_client is not None:
+                crawl_client.reset_crawler()
             return redirect(url_for('index'))
         else:
             return jsonify({"error": "登录失败，请重试"}), 500
@@ -231,36 +385,32 @@ def search():
     返回:
         JSON格式的搜索结果，包含笔记列表和HTML页面URL
     """
-    # 初始化爬虫
-    if not init_crawler():
-        return jsonify({"error": "爬虫初始化失败，请检查网络连接和Chrome浏览器"}), 500
-        
-    # 获取参数
+    # 获取参数（max_results 无法解析时使用默认值，本地索引回退路径也使用同一个值）
     keyword = request.args.get('keyword', '').strip()
     session_id = request.args.get('session_id', f"search_{int(time.time())}")
+    max_results = request.args.get('max_results', 21, type=int)
     
     if not keyword:
         return jsonify({"error": "缺少关键词参数"}), 400
     
+    # 初始化爬虫，失败时回退到本地索引（独立爬虫层模式下由爬虫工作进程负责初始化）
+    if crawl_client is None and not init_crawler():
+        local_response = _local_search_response(keyword, session_id, max_results)
+        if local_response:
+            return local_response
+        return jsonify({"error": "爬虫初始化失败，请检查网络连接和Chrome浏览器"}), 500
+    
     try:
         # 解析参数
-        max_results = int(request.args.get('max_results', 21))
         use_cache = request.args.get('use_cache', 'true').lower() == 'true'
         
         # 记录开始搜索
         debug_manager.store_debug_info(session_id, f"🔍 开始搜索关键词: {keyword}", "INFO")
         debug_manager.store_debug_info(session_id, f"📊 最大结果数: {max_results}, 使用缓存: {use_cache}", "INFO")
         
-        # 设置爬虫的debug回调
-        debug_callback = debug_manager.create_debug_callback(session_id)
-        
-        # 如果爬虫支持debug回调，设置它
-        if hasattr(crawler, 'set_debug_callback'):
-            crawler.set_debug_callback(debug_callback)
-        
         # 执行搜索
         debug_manager.store_debug_info(session_id, "🚀 正在执行搜索...", "INFO")
-        search_results = crawler.search(keyword, max_results=max_results, use_cache=use_cache)
+        search_results = run_search(keyword, max_results, use_cache, session_id)
         
         # 调试信息：检查搜索结果
         logger.info(f"搜索结果类型: {type(search_results)}")
@@ -283,6 +433,12 @@ def search():
             except Exception as cache_error:
                 logger.error(f"从缓存恢复失败: {cache_error}")
         
+        # 缓存中也没有时回退到本地索引（不启动后台爬虫）
+        if not search_results:
+            local_response = _local_search_response(keyword, session_id, max_results)
+            if local_response:
+                return local_response
+        
         # 根据配置决定是否启动后台爬虫提取详细内容
         if search_results and len(search_results) > 0:
             # 获取配置（从环境变量或配置文件）
@@ -290,11 +446,11 @@ def search():
             
             if enable_backend_extraction:
                 debug_manager.store_debug_info(session_id, "🔍 启动后台爬虫提取笔记详细内容...", "INFO")
-                threading.Thread(
-                    target=start_backend_extraction,
-                    args=(search_results, session_id),
-                    daemon=True
-                ).start()
+                try:
+                    submit_backend_extraction(search_results, session_id)
+                except CrawlServiceError as e:
+                    logger.error(f"后台提取任务提交失败: {str(e)}")
+                    debug_manager.store_debug_info(session_id, f"❌ 后台提取任务提交失败: {str(e)}", "ERROR")
             else:
                 debug_manager.store_debug_info(session_id, "⚠️ 后台笔记内容提取已禁用", "INFO")
         
@@ -305,6 +461,7 @@ def search():
             notes = search_results if isinstance(search_results, list) else []
         
         debug_manager.store_debug_info(session_id, f"✅ 搜索完成，找到 {len(notes)} 条笔记", "INFO")
+        _remember_search_session(session_id, notes)
         
         # 🔧 修复：只有在有有效笔记数据时才生成HTML URL
         if notes and len(notes) > 0:
@@ -341,12 +498,105 @@ def search():
             "notes": [],
             "message": "未找到相关笔记"
         })
+    except CrawlServiceError as e:
+        # 爬虫层不可用时回退到本地索引
+        logger.error(f"爬虫层不可用: {str(e)}")
+        debug_manager.store_debug_info(session_id, f"❌ 爬虫层不可用: {str(e)}", "ERROR")
+        local_response = _local_search_response(keyword, session_id, max_results)
+        if local_response:
+            return local_response
+        return jsonify({"error": "爬虫层不可用", "message": str(e), "session_id": session_id}), 503
     except Exception as e:
         logger.error(f"搜索出错: {str(e)}")
         logger.error(traceback.format_exc())
         debug_manager.store_debug_info(session_id, f"❌ 搜索失败: {str(e)}", "ERROR")
         return jsonify({"error": "搜索失败", "message": str(e), "session_id": session_id}), 500
 
+def _remember_search_session(session_id, notes):
+    """记录搜索会话的结果（只保留最近的会话）"""
+    if not session_id or not notes:
+        return
+    with search_session_lock:
+        search_session_notes[session_id] = list(notes)
+        search_session_notes.move_to_end(session_id)
+        while len(search_session_notes) > MAX_SEARCH_SESSIONS:
+            search_session_notes.popitem(last=False)
+
+def _notes_for_session(session_id):
+    """
+    取搜索会话的笔记：优先使用内存中的搜索结果，
+    服务重启后退回到该会话后台爬虫归档的笔记ID
+    """
+    with search_session_lock:
+        notes = search_session_notes.get(session_id)
+    if notes:
+        return notes
+    return [{'id': note_id} for note_id in note_archive.note_ids(KIND_DETAIL, session_id=f"{session_id}_backend")]
+
+def _local_search_response(keyword, session_id, max_results):
+    """
+    使用本地索引回答搜索请求
+    
+    Returns:
+        有结果时返回JSON响应，否则返回None
+    """
+    try:
+        notes = note_search_index.search(keyword, limit=max_results)
+    except Exception as e:
+        logger.error(f"本地索引检索失败: {str(e)}")
+        return None
+    
+    if not notes:
+        return None
+    
+    logger.info(f"使用本地索引返回 {len(notes)} 条结果: {keyword}")
+    _remember_search_session(session_id, notes)
+    debug_manager.store_debug_info(session_id, f"📚 实时搜索不可用，从本地索引返回 {len(notes)} 条结果", "WARNING")
+    return jsonify({
+        "keyword": keyword,
+        "session_id": session_id,
+        "timestamp": int(time.time()),
+        "count": len(notes),
+        "notes": notes,
+        "source": "local_index"
+    })
+
+@app.route('/api/local-search')
+def local_search():
+    """
+    本地全文检索API
+    在已爬取的笔记上做BM25检索，不需要浏览器
+    
+    参数:
+        keyword: 搜索关键词（必需）
+        limit: 返回结果数量（可选，默认20）
+    
+    返回:
+        JSON格式的搜索结果
+    """
+    keyword = request.args.get('keyword', '').strip()
+    if not keyword:
+        return jsonify({"error": "缺少关键词参数"}), 400
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 200))
+        started = time.perf_counter()
+        notes = note_search_index.search(keyword, limit=limit)
+        
+        return jsonify({
+            "keyword": keyword,
+            "timestamp": int(time.time()),
+            "count": len(notes),
+            "notes": notes,
+            "source": "local_index",
+            "took_ms": round((time.perf_counter() - started) * 1000, 3),
+            "index": note_search_index.stats()
+        })
+    except Exception as e:
+        logger.error(f"本地检索出错: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "本地检索失败", "message": str(e)}), 500
+
 @app.route('/api/note/<note_id>')
 def get_note(note_id):
     """
@@ -358,14 +608,12 @@ def get_note(note_id):
     返回:
         JSON格式的笔记详情
     """
-    if not init_crawler():
-        return jsonify({"error": "爬虫初始化失败"}), 500
-        
     if not note_id:
         return jsonify({"error": "缺少笔记ID参数"}), 400
     
     try:
-        note = crawler.get_note_detail(note_id)
+        # 只读取本地已爬取的笔记（归档或保存的页面源码），不启动浏览器
+        note = get_note_generator().load_local_note_detail(note_id)
         
         if note:
             return jsonify({"note": note})
@@ -384,11 +632,9 @@ def hot_keywords():
     返回:
         JSON格式的热门关键词列表
     """
-    if not init_crawler():
-        return jsonify({"error": "爬虫初始化失败"}), 500
-        
     try:
-        keywords = crawler.get_hot_keywords()
+        # 热门关键词来自配置，不需要爬虫
+        keywords = load_hot_keywords()
         return jsonify({"keywords": keywords})
     except Exception as e:
         logger.error(f"获取热门关键词出错: {str(e)}")
@@ -425,23 +671,13 @@ def create_similar_note(note_id):
         return jsonify({"success": False, "message": "缺少笔记ID参数"}), 400
     
     try:
-        # 初始化爬虫
-        if not init_crawler():
-            return jsonify({"success": False, "message": "系统初始化失败"}), 500
-        
-        # 获取原笔记详情
-        logger.info(f"正在获取原笔记详情: {note_id}")
-        original_note = crawler.get_note_detail(note_id)
-        
-        if not original_note:
-            return jsonify({"success": False, "message": "无法获取原笔记内容"}), 404
-        
-        # 添加note_id到原笔记信息中
-        original_note['note_id'] = note_id
+        original_note, error_response = _load_original_note(note_id)
+        if error_response:
+            return error_response
         
         # 使用内容生成器生成同类笔记
         logger.info(f"正在生成同类笔记，基于笔记: {note_id}")
-        generated_note = note_generator.generate_similar_note(original_note)
+        generated_note = get_note_generator().generate_similar_note(original_note)
         
         # 返回成功结果
         return jsonify({
@@ -460,6 +696,190 @@ def create_similar_note(note_id):
             "message": f"创建同类笔记失败: {str(e)}"
         }), 500
 
+def _load_original_note(note_id):
+    """
+    获取原笔记详情：本地已爬取过的笔记直接使用，无需启动搜索爬虫
+    
+    Returns:
+        (原笔记信息, None) 或 (None, 错误响应)
+    """
+    logger.info(f"正在获取原笔记详情: {note_id}")
+    original_note = get_note_generator().load_local_note_detail(note_id)
+    if not original_note:
+        try:
+            original_note = call_crawler('get_note_detail', note_id=note_id)
+        except CrawlServiceError as e:
+            logger.error(f"获取原笔记详情失败: {str(e)}")
+            return None, (jsonify({"success": False, "message": "系统初始化失败"}), 500)
+    
+    if not original_note:
+        return None, (jsonify({"success": False, "message": "无法获取原笔记内容"}), 404)
+    
+    # 添加note_id到原笔记信息中
+    original_note['note_id'] = note_id
+    return original_note, None
+
+@app.route('/api/create-similar-note/<note_id>/stream', methods=['POST'])
+def create_similar_note_stream(note_id):
+    """
+    流式创建同类笔记API
+    启用大模型时以 type=delta 事件逐段推送模型输出，生成完成后推送 type=note 事件
+    
+    返回:
+        text/event-stream，若干 delta 事件，最后一个 note 或 error 事件
+    """
+    try:
+        original_note, error_response = _load_original_note(note_id)
+        if error_response:
+            return error_response
+    except Exception as e:
+        logger.error(f"获取原笔记失败: {str(e)}")
+        return jsonify({"success": False, "message": f"获取原笔记失败: {str(e)}"}), 500
+    
+    events = queue.Queue()
+    
+    def run():
+        try:
+            generated_note = get_note_generator().generate_similar_note(
+                original_note, on_delta=lambda text: events.put({'type': 'delta', 'text': text})
+            )
+            events.put({
+                'type': 'note',
+                'generated_note': generated_note,
+                'original_note_id': note_id,
+                'debug_session_id': generated_note.get('debug_session_id')
+            })
+        except Exception as e:
+            logger.error(f"流式创建同类笔记失败: {str(e)}")
+            events.put({'type': 'error', 'message': str(e)})
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, name=f'generate-{note_id}', daemon=True).start()
+    
+    def generate():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/create-similar-notes', methods=['POST'])
+def create_similar_notes():
+    """
+    批量创建同类笔记API
+    本地已有详情的笔记批量分析后先返回，其余笔记通过浏览器池有界并发获取，
+    每生成一篇就以SSE事件推送一篇
+    
+    请求体:
+        {"note_ids": ["...", ...]} 或 {"session_id": "搜索会话ID", "limit": 20}
+    
+    返回:
+        text/event-stream，每篇笔记一个 type=note 事件，最后一个 type=done 事件
+    """
+    payload = request.get_json(silent=True) or {}
+    note_ids = payload.get('note_ids')
+    session_id = payload.get('session_id')
+    
+    if note_ids is not None:
+        if not isinstance(note_ids, list) or not all(isinstance(note_id, str) and note_id for note_id in note_ids):
+            return jsonify({"success": False, "message": "note_ids必须是非空字符串列表"}), 400
+        # 搜索结果中有的笔记带上标题等信息，详情获取失败时仍可据此生成
+        with search_session_lock:
+            known = {
+                note.get('id'): note
+                for notes in search_session_notes.values() for note in notes if isinstance(note, dict)
+            }
+        source_notes = [known.get(note_id) or {'id': note_id} for note_id in note_ids]
+    elif session_id:
+        source_notes = _notes_for_session(session_id)
+    else:
+        return jsonify({"success": False, "message": "缺少note_ids或session_id参数"}), 400
+    
+    try:
+        limit = max(1, min(int(payload.get('limit') or MAX_GENERATE_NOTES), MAX_GENERATE_NOTES))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "limit必须是整数"}), 400
+    original_notes = []
+    seen = set()
+    for note in source_notes:
+        note_id = note.get('id') or note.get('note_id')
+        if note_id and note_id not in seen:
+            seen.add(note_id)
+            original_notes.append({
+                **note,
+                'note_id': note_id,
+                'content': note.get('content') or note.get('desc', ''),
+            })
+    original_notes = original_notes[:limit]
+    
+    if not original_notes:
+        return jsonify({"success": False, "message": "没有可生成的笔记"}), 404
+    
+    logger.info(f"批量生成同类笔记: {len(original_notes)} 篇")
+    
+    def generate():
+        started = time.perf_counter()
+        success_count = 0
+        try:
+            for item in get_note_generator().generate_similar_notes(original_notes):
+                success_count += 1 if item.get('success') else 0
+                yield f"data: {json.dumps({'type': 'note', **item}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"批量生成同类笔记失败: {str(e)}")
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+        summary = {
+            'type': 'done',
+            'total': len(original_notes),
+            'success_count': success_count,
+            'duration_seconds': round(time.perf_counter() - started, 3)
+        }
+        yield f"data: {json.dumps(summary, ensure_ascii=False)}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/analyze-notes', methods=['POST'])
+def analyze_notes():
+    """
+    批量笔记分析API
+    
+    请求体:
+        {"notes": [{"title": ..., "content": ..., "tags": [...]}, ...]}
+    
+    返回:
+        JSON格式的分析结果列表（与输入顺序一致）
+    """
+    payload = request.get_json(silent=True) or {}
+    notes = payload.get('notes')
+    if not isinstance(notes, list) or not notes:
+        return jsonify({"success": False, "message": "缺少notes参数"}), 400
+    if len(notes) > MAX_ANALYZE_NOTES:
+        return jsonify({"success": False, "message": f"单次最多分析 {MAX_ANALYZE_NOTES} 篇笔记"}), 400
+    if not all(isinstance(note, dict) for note in notes):
+        return jsonify({"success": False, "message": "notes中的每一项必须是对象"}), 400
+    
+    try:
+        started = time.perf_counter()
+        analyses = get_note_generator().analyze_notes(notes)
+        return jsonify({
+            "success": True,
+            "analyses": analyses,
+            "count": len(analyses),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "jieba": jieba_warmup.stats()
+        })
+    except Exception as e:
+        logger.error(f"批量分析笔记失败: {str(e)}")
+        return jsonify({"success": False, "message": f"批量分析笔记失败: {str(e)}"}), 500
+
 @app.route('/api/note-generation-debug/<session_id>')
 def get_note_generation_debug(session_id):
     """
@@ -472,7 +892,7 @@ def get_note_generation_debug(session_id):
         JSON格式的debug信息
     """
     try:
-        debug_info = note_generator.get_debug_info(session_id)
+        debug_info = get_note_generator().get_debug_info(session_id)
         return jsonify({
             "success": True,
             "debug_info": debug_info,
@@ -489,6 +909,7 @@ def get_note_generation_debug(session_id):
 def get_backend_crawl_status(session_id):
     """
     获取后台爬虫状态API
+    优先从内存进度注册表读取，只有服务重启后注册表中没有记录时才回退到磁盘
     
     参数:
         session_id: 会话ID
@@ -499,57 +920,18 @@ def get_backend_crawl_status(session_id):
     try:
         backend_session_id = f"{session_id}_backend"
         
-        # 检查后台爬虫结果目录
-        temp_notes_dir = os.path.join(get_project_root(), 'temp', 'notes')
-        batch_dir = os.path.join(temp_notes_dir, f"batch_{backend_session_id}")
-        
-        if not os.path.exists(batch_dir):
+        progress = _backend_progress(backend_session_id)
+        if progress:
             return jsonify({
-                'success': False,
-                'status': 'not_started',
-                'message': '后台爬虫任务尚未开始'
+                'success': True,
+                'session_id': session_id,
+                'backend_session_id': backend_session_id,
+                'status': progress['status'],
+                'progress': progress,
+                'source': 'memory'
             })
         
-        # 读取任务信息
-        task_file = os.path.join(batch_dir, 'task_info.json')
-        stats_file = os.path.join(batch_dir, 'crawl_stats.json')
-        
-        result = {
-            'success': True,
-            'session_id': session_id,
-            'backend_session_id': backend_session_id,
-            'batch_dir': batch_dir
-        }
-        
-        # 读取任务信息
-        if os.path.exists(task_file):
-            with open(task_file, 'r', encoding='utf-8') as f:
-                task_info = json.load(f)
-                result['task_info'] = task_info
-        
-        # 读取统计信息
-        if os.path.exists(stats_file):
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                stats = json.load(f)
-                result['stats'] = stats
-                result['status'] = 'completed'
-        else:
-            result['status'] = 'running'
-        
-        # 统计已完成的文件
-        files = os.listdir(batch_dir) if os.path.exists(batch_dir) else []
-        source_files = [f for f in files if f.endswith('_source.html')]
-        detail_files = [f for f in files if f.endswith('_detail.json')]
-        image_dirs = [f for f in files if f.endswith('_images') and os.path.isdir(os.path.join(batch_dir, f))]
-        
-        result['file_counts'] = {
-            'source_files': len(source_files),
-            'detail_files': len(detail_files),
-            'image_dirs': len(image_dirs),
-            'total_files': len(files)
-        }
-        
-        return jsonify(result)
+        return jsonify(_load_backend_crawl_status_from_disk(session_id, backend_session_id))
         
     except Exception as e:
         logger.error(f"获取后台爬虫状态失败: {str(e)}")
@@ -558,6 +940,133 @@ def get_backend_crawl_status(session_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/backend-crawl-status/<session_id>/stream')
+def stream_backend_crawl_status(session_id):
+    """
+    后台爬虫状态SSE推送API
+    每当进度更新时推送一次状态快照，任务结束后关闭连接
+    
+    参数:
+        session_id: 会话ID
+    """
+    backend_session_id = f"{session_id}_backend"
+    
+    def generate():
+        version = -1
+        while True:
+            progress = _wait_backend_progress(backend_session_id, version)
+            if progress is None:
+                # 注册表中没有该任务，返回磁盘状态后结束
+                status = _load_backend_crawl_status_from_disk(session_id, backend_session_id)
+                yield f"data: {json.dumps(status, ensure_ascii=False)}\n\n"
+                return
+            
+            if progress['version'] == version:
+                # 超时未更新，发送心跳保持连接
+                yield ": keepalive\n\n"
+                continue
+            
+            version = progress['version']
+            yield f"data: {json.dumps(progress, ensure_ascii=False)}\n\n"
+            if progress['status'] in FINISHED_STATUSES:
+                return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _backend_progress(backend_session_id):
+    """后台爬虫进度：本进程的注册表，独立爬虫层模式下读取工作进程发布的进度快照"""
+    progress = crawl_progress.get_status(backend_session_id)
+    if progress or crawl_client is None:
+        return progress
+    try:
+        return crawl_client.backend_progress(backend_session_id)
+    except Exception as e:
+        logger.warning(f"读取爬虫工作进程进度失败: {str(e)}")
+        return None
+
+def _wait_backend_progress(backend_session_id, since_version, timeout=15.0):
+    """
+    等待进度更新（版本号变化或超时后返回当前状态，没有该任务时返回None）
+    独立爬虫层模式下进度由工作进程发布到结果存储，按固定间隔轮询
+    """
+    if crawl_client is None:
+        return crawl_progress.wait_for_update(backend_session_id, since_version, timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while True:
+        progress = _backend_progress(backend_session_id)
+        if progress is None or progress['version'] != since_version or time.monotonic() >= deadline:
+            return progress
+        time.sleep(BACKEND_PROGRESS_POLL_INTERVAL)
+
+def _load_backend_crawl_status_from_disk(session_id, backend_session_id):
+    """
+    从磁盘读取后台爬虫状态（服务重启后的回退方案）
+    
+    参数:
+        session_id: 会话ID
+        backend_session_id: 后台爬虫会话ID
+    
+    返回:
+        状态信息字典
+    """
+    notes_dir = os.path.join(get_project_root(), 'cache', 'notes')
+    batch_dir = os.path.join(notes_dir, f"batch_{backend_session_id}")
+    results_file = os.path.join(notes_dir, f"batch_{backend_session_id}_results.json")
+    
+    result = {
+        'success': True,
+        'session_id': session_id,
+        'backend_session_id': backend_session_id,
+        'source': 'disk'
+    }
+    
+    # 人为行为模式只生成一个汇总结果文件
+    if not os.path.exists(batch_dir):
+        if os.path.exists(results_file):
+            with open(results_file, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            result['status'] = 'completed'
+            result['stats'] = {'success_count': len(results)}
+            return result
+        
+        return {
+            'success': False,
+            'status': 'not_started',
+            'message': '后台爬虫任务尚未开始'
+        }
+    
+    result['batch_dir'] = batch_dir
+    
+    # 读取任务信息
+    task_file = os.path.join(batch_dir, 'task_info.json')
+    if os.path.exists(task_file):
+        with open(task_file, 'r', encoding='utf-8') as f:
+            result['task_info'] = json.load(f)
+    
+    # 读取统计信息
+    stats_file = os.path.join(batch_dir, 'crawl_stats.json')
+    if os.path.exists(stats_file):
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            result['stats'] = json.load(f)
+            result['status'] = 'completed'
+    else:
+        # 进程重启前未完成的任务不会再继续
+        result['status'] = 'interrupted'
+    
+    # 统计已完成的文件
+    files = os.listdir(batch_dir)
+    result['file_counts'] = {
+        'source_files': len([f for f in files if f.endswith('_source.html')]),
+        'detail_files': note_archive.count(KIND_DETAIL, backend_session_id),
+        'image_dirs': len([f for f in files if f.endswith('_images') and os.path.isdir(os.path.join(batch_dir, f))]),
+        'total_files': len(files)
+    }
+    
+    return result
+
 @app.route('/cache/notes/<path:filename>')
 def serve_note_files(filename):
     """
@@ -582,9 +1091,19 @@ def serve_note_files(filename):
 def get_note_data():
     """
     获取笔记提取数据的API接口
-    支持通过文件路径加载已提取的JSON数据
+    支持通过文件路径加载已提取的JSON数据，或通过 note_id 从笔记归档读取
     """
     try:
+        note_id = request.args.get('note_id')
+        if note_id:
+            kind = request.args.get('kind', KIND_EXTRACTED)
+            if kind not in (KIND_DETAIL, KIND_EXTRACTED):
+                return jsonify({'error': '不支持的记录类型'}), 400
+            data = note_archive.get(note_id, kind)
+            if data is None:
+                return jsonify({'error': '归档中不存在该笔记'}), 404
+            return jsonify(data)
+        
         file_path = request.args.get('file')
         if not file_path:
             return jsonify({'error': '缺少文件路径参数'}), 400
@@ -602,24 +1121,29 @@ def get_note_data():
         if not full_path.startswith(cache_dir):
             return jsonify({'error': '非法的文件路径'}), 403
         
-        # 如果是HTML文件，尝试提取数据
+        # 如果是HTML文件，优先从提取缓存返回，文件变化时才重新提取
         if file_path.endswith('.html'):
             if os.path.exists(full_path):
-                logger.info(f"从HTML文件提取数据: {full_path}")
-                extracted_data = note_extractor.extract_from_html_file(full_path)
+                etag, body, extracted = extraction_cache.get_or_extract(full_path, get_note_extractor().extract_from_html_file)
+                
+                if body is None:
+                    return jsonify({'error': '无法从HTML文件中提取数据'}), 422
                 
-                if extracted_data:
-                    # 尝试保存提取的数据
+                if extracted:
+                    logger.info(f"从HTML文件提取数据: {full_path}")
+                    # 尝试保存提取的数据（只在重新提取时保存）
                     try:
+                        extracted_data = json.loads(body)
                         note_id = extracted_data.get('note_id')
-                        saved_path = note_extractor.save_extracted_data(extracted_data, note_id)
+                        saved_path = get_note_extractor().save_extracted_data(extracted_data, note_id)
                         logger.info(f"已保存提取数据到: {saved_path}")
                     except Exception as save_error:
                         logger.warning(f"保存提取数据失败: {save_error}")
-                    
-                    return jsonify(extracted_data)
-                else:
-                    return jsonify({'error': '无法从HTML文件中提取数据'}), 422
+                
+                response = Response(body, mimetype='application/json')
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response.make_conditional(request)
             else:
                 return jsonify({'error': 'HTML文件不存在'}), 404
         
@@ -704,6 +1228,18 @@ def get_result_html(html_hash):
 
 
 
+# ==================== 监控指标路由 ====================
+
+@app.route('/metrics')
+def get_metrics():
+    """
+    Prometheus监控指标
+    
+    返回:
+        Prometheus文本格式的计数器和延迟直方图（合并其他Web工作进程和爬虫工作进程的快照）
+    """
+    return metrics.render(metrics_snapshots.collect()), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
 # ==================== 错误处理 ====================
 
 @app.errorhandler(404)
@@ -716,14 +1252,42 @@ def server_error(e):
     """处理500错误"""
     return jsonify({"error": "服务器内部错误"}), 500
 
+@app.route('/api/health')
+def health():
+    """
+    健康检查API
+    
+    返回:
+        爬虫层模式、浏览器预热与保活状态（独立爬虫层模式下为是否有存活的爬虫工作进程）
+    """
+    status = {"status": "ok", "crawl_tier": "remote" if crawl_client is not None else "inline"}
+    if crawl_client is not None:
+        status["crawl_workers_alive"] = crawl_client.ping()
+    else:
+        status["browsers"] = browser_warmup.stats() if browser_warmup is not None else {"pool": browser_pool.stats()}
+    return jsonify(status)
+
+# ==================== 浏览器预热 ====================
+
+# gunicorn 预加载应用的主进程中不启动浏览器，fork 后由 post_fork 在各工作进程中启动
+if os.environ.get('XHS_PRELOAD_APP') != 'true':
+    start_browser_warmup()
+
 # ==================== 清理函数 ====================
 
 def cleanup():
     """应用退出时的清理工作"""
     global crawler
+    if browser_warmup is not None:
+        browser_warmup.stop()
     if crawler:
         crawler.close()
         crawler = None
+    browser_pool.shutdown()
+    if note_generator is not None:
+        note_generator.debug_store.close()
+        if note_generator.llm_client:
+            note_generator.llm_client.close()
 
 # ==================== 主程序入口 ====================
 
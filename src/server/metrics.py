@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能指标模块
+提供计数器和延迟直方图，以Prometheus文本格式导出到 /metrics
+热路径上只做一次二分查找和几次整数加法，开销可以忽略
+
+多进程部署（gunicorn工作进程、爬虫工作进程）时每个进程的指标只在本进程内存中：
+各进程定期把指标快照写入快照目录（METRICS_DIR，默认 cache/metrics），
+/metrics 合并本进程的实时指标和其他进程未过期的快照后导出
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple, Sequence
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认延迟分桶（秒），覆盖从毫秒级解析到分钟级爬取
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape_label_value(value: str) -> str:
+    """转义Prometheus标签值"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = '') -> str:
+    """格式化标签字符串，如 {strategy="explore_links",le="0.5"}"""
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    """格式化数值"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """单调递增计数器"""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """
+        计数器加一（或加指定值）
+
+        Args:
+            labelvalues: 按labelnames顺序给出的标签值
+            amount: 增加的数量
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self) -> List[List[Any]]:
+        """导出可序列化的快照: [[标签值列表, 数值], ...]"""
+        with self._lock:
+            return [[list(labelvalues), value] for labelvalues, value in self._values.items()]
+
+    def render(self, snapshots: Iterable[List[List[Any]]] = ()) -> List[str]:
+        """生成Prometheus文本行（合并其他进程的快照）"""
+        with self._lock:
+            values = dict(self._values)
+        for rows in snapshots:
+            for labelvalues, value in rows:
+                key = tuple(labelvalues)
+                values[key] = values.get(key, 0) + value
+        items = sorted(values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+            for labelvalues, value in items
+        ]
+
+
+class _Timer:
+    """直方图计时上下文管理器"""
+
+    __slots__ = ('_histogram', '_labelvalues', '_start')
+
+    def __init__(self, histogram: 'Histogram', labelvalues: Tuple[str, ...]):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labelvalues)
+        return False
+
+
+class Histogram:
+    """延迟直方图"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数(非累计，最后一个为+Inf), 总和, 总数]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值（秒）
+            labelvalues: 按labelnames顺序给出的标签值
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[labelvalues] = entry
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labelvalues: str) -> _Timer:
+        """
+        计时上下文管理器
+
+        用法:
+            with HISTOGRAM.time('label'):
+                do_work()
+        """
+        return _Timer(self, labelvalues)
+
+    def snapshot(self) -> List[List[Any]]:
+        """导出可序列化的快照: [[标签值列表, 各分桶计数, 总和, 总数], ...]"""
+        with self._lock:
+            return [[list(labelvalues), list(entry[0]), entry[1], entry[2]]
+                    for labelvalues, entry in self._values.items()]
+
+    def render(self, snapshots: Iterable[List[List[Any]]] = ()) -> List[str]:
+        """生成Prometheus文本行（合并其他进程的快照）"""
+        with self._lock:
+            values = {labelvalues: [list(entry[0]), entry[1], entry[2]]
+                      for labelvalues, entry in self._values.items()}
+        for rows in snapshots:
+            for labelvalues, bucket_counts, total_sum, total_count in rows:
+                # 分桶定义不同（进程运行的代码版本不同）时无法合并
+                if len(bucket_counts) != len(self.buckets) + 1:
+                    continue
+                entry = values.setdefault(tuple(labelvalues), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], bucket_counts)]
+                entry[1] += total_sum
+                entry[2] += total_count
+        items = sorted(values.items())
+
+        lines = []
+        for labelvalues, (bucket_counts, total_sum, total_count) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {total_count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        """注册指标，同名指标只创建一次"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, *args, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        """导出全部指标的快照（指标名 -> 快照行）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self, snapshots: Iterable[Dict[str, List[List[Any]]]] = ()) -> str:
+        """
+        导出Prometheus文本格式
+
+        Args:
+            snapshots: 其他进程的指标快照（见 snapshot()），与本进程的指标相加
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshots = list(snapshots)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.render([snapshot[metric.name] for snapshot in snapshots if metric.name in snapshot]))
+        return '\n'.join(lines) + '\n'
+
+
+class SnapshotDirectory:
+    """
+    多进程指标快照目录：每个进程一个 <进程号>.json 文件（写临时文件后原子替换），
+    超过有效期未更新的快照视为进程已退出，读取时删除
+    """
+
+    def __init__(self, directory: str, interval: float = 5.0):
+        """
+        Args:
+            directory: 快照目录
+            interval: 后台写入快照的间隔（秒），快照有效期为3个间隔
+        """
+        self.directory = directory
+        self.interval = interval
+        self.max_age = interval * 3
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def publish(self, registry: 'MetricsRegistry' = None):
+        """写入本进程的指标快照"""
+        registry = registry or metrics
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(registry.snapshot(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def collect(self) -> List[Dict[str, List[List[Any]]]]:
+        """读取其他进程未过期的快照（不含本进程）"""
+        if not os.path.isdir(self.directory):
+            return []
+        own = f"{os.getpid()}.json"
+        now = time.time()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def remove(self):
+        """删除本进程的快照（进程退出时调用）"""
+        try:
+            os.remove(self._path(os.getpid()))
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logger.warning(f"写入指标快照失败: {str(e)}")
+            time.sleep(self.interval)
+
+    def start(self) -> bool:
+        """在后台线程定期写入快照（每个进程只启动一次，fork后的子进程需要重新调用）"""
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return False
+            self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+            self._thread_pid = os.getpid()
+        self._thread.start()
+        return True
+
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 全局指标注册表实例
+metrics = MetricsRegistry()
+
+# 全局指标快照目录实例
+metrics_snapshots = SnapshotDirectory(os.environ.get('METRICS_DIR', os.path.join('cache', 'metrics')))
+
+# ==================== 热点路径指标 ====================
+
+DRIVER_LAUNCH_SECONDS = metrics.histogram(
+    'xhs_driver_launch_seconds', 'Time to launch a Chrome WebDriver instance', ('component',))
+
+PAGE_NAVIGATION_SECONDS = metrics.histogram(
+    'xhs_page_navigation_seconds', 'Time spent in driver.get page navigation', ('component',))
+
+ANTI_BOT_SECONDS = metrics.histogram(
+    'xhs_anti_bot_seconds', 'Time spent detecting and handling anti-bot pages')
+
+EXTRACTION_STRATEGY_SECONDS = metrics.histogram(
+    'xhs_extraction_strategy_seconds', 'Time spent in each search result extraction strategy', ('strategy',))
+
+EXTRACTION_STRATEGY_RESULTS = metrics.counter(
+    'xhs_extraction_strategy_results_total', 'Notes returned by each extraction strategy', ('strategy',))
+
+TOKEN_EXTRACTION_SECONDS = metrics.histogram(
+    'xhs_token_extraction_seconds', 'Time spent extracting xsec_token values from the search page')
+
+VALIDATION_SECONDS = metrics.histogram(
+    'xhs_validation_seconds', 'Time spent validating search results', ('level',))
+
+CACHE_REQUESTS = metrics.counter(
+    'xhs_cache_requests_total', 'Cache lookups by cache name and result', ('cache', 'result'))
+
+HTML_RENDER_SECONDS = metrics.histogram(
+    'xhs_html_render_seconds', 'Time spent rendering search result HTML pages')
+
+BACKEND_NOTE_CRAWL_SECONDS = metrics.histogram(
+    'xhs_backend_note_crawl_seconds', 'End-to-end time to crawl one note in the backend crawler', ('result',))
+
+IMAGE_DOWNLOAD_SECONDS = metrics.histogram(
+    'xhs_image_download_seconds', 'Time to download one note image', ('component', 'result'))
+
+IMAGE_DOWNLOAD_BYTES = metrics.counter(
+    'xhs_image_download_bytes_total', 'Bytes of note images downloaded', ('component',))
+
+NOTE_GENERATION_STEP_SECONDS = metrics.histogram(
+    'xhs_note_generation_step_seconds', 'Time spent in each NoteContentGenerator step', ('step',))
+
+LLM_REQUEST_SECONDS = metrics.histogram(
+    'xhs_llm_request_seconds', 'Time spent in one LLM provider request', ('mode',))
+
+LLM_BATCH_PROMPTS = metrics.counter(
+    'xhs_llm_batch_prompts_total', 'Prompts sent to the LLM provider by request mode', ('mode',))
+
+BROWSER_HEALTH_PINGS = metrics.counter(
+    'xhs_browser_health_pings_total', 'Browser keepalive health pings by component and result', ('component', 'result'))
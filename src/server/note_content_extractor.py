@@ -11,15 +11,32 @@ import re
 import os
 import logging
 import hashlib
+import multiprocessing
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any
 from bs4 import BeautifulSoup
 from urllib.parse import unquote, urlparse
+from src.crawler.note_archive import note_archive, KIND_EXTRACTED
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 增量批量提取使用的清单文件和汇总结果文件
+MANIFEST_FILENAME = 'extraction_manifest.json'
+CONSOLIDATED_FILENAME = 'extracted_notes.jsonl'
+
+# JSON快速路径：笔记详情通常位于这些位置，优先在这些子树中查找字段
+# '*' 表示匹配该层字典的所有值（如 noteDetailMap 以笔记ID为键）
+JSON_FAST_PATHS = [
+    ('note', 'noteDetailMap', '*', 'note'),
+    ('note', 'note'),
+    ('noteData',),
+]
+
+
 class NoteContentExtractor:
     """小红书笔记内容提取器 - 生产版本"""
     
@@ -41,7 +58,10 @@ class NoteContentExtractor:
             'processed': 0,
             'success': 0,
             'failed': 0,
-            'start_time': None
+            'skipped': 0,
+            'start_time': None,
+            # 各提取层级的运行次数、命中次数（至少补齐一个字段）和补齐的字段数
+            'tiers': {tier: {'runs': 0, 'hits': 0, 'fields': 0} for tier in ('json', 'html', 'regex')},
         }
     
     def _setup_field_mappings(self):
@@ -56,10 +76,12 @@ class NoteContentExtractor:
             'images': ['images', 'imageList', 'pics'],
             'video': ['video', 'videoUrl'],
             'tags': ['tags', 'tagList'],
-            'like_count': ['likes', 'likeCount', 'interactInfo'],
-            'collect_count': ['collects', 'collectCount'],
-            'comment_count': ['comments', 'commentCount'],
+            'author_name': ['nickname', 'nickName'],
+            'like_count': ['likedCount', 'likes', 'likeCount'],
+            'collect_count': ['collectedCount', 'collects', 'collectCount'],
+            'comment_count': ['commentCount', 'comments'],
         }
+        self._compile_json_plan()
         
         # HTML选择器映射
         self.html_selectors = {
@@ -78,6 +100,18 @@ class NoteContentExtractor:
             'title': [r'<title[^>]*>([^<]+)</title>'],
             'image_urls': [r'src=["\']([^"\']+xhscdn[^"\']*)["\']'],
         }
+        self._compiled_regex_patterns = {
+            field: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for field, patterns in self.regex_patterns.items()
+        }
+        
+        # 一篇笔记需要补齐的核心字段，前面的层级已补齐的字段后面的层级不再提取
+        self.target_fields = [
+            'title', 'content', 'note_id', 'user_id', 'author_name', 'images', 'tags',
+            'like_count', 'collect_count', 'comment_count',
+        ]
+        # 正则层中字段名与核心字段不同的映射（image_urls 补的是 images）
+        self.regex_field_targets = {'image_urls': 'images'}
         
         # Meta标签映射
         self.meta_mappings = {
@@ -89,6 +123,16 @@ class NoteContentExtractor:
             'keywords': 'page_keywords',
         }
     
+    def _compile_json_plan(self):
+        """
+        编译JSON提取计划：把字段→别名列表反转为别名→[(字段, 优先级)]的哈希表，
+        遍历时每个键只需一次字典查找
+        """
+        self._json_alias_index = {}
+        for field, aliases in self.json_fields_mapping.items():
+            for rank, alias in enumerate(aliases):
+                self._json_alias_index.setdefault(alias, []).append((field, rank))
+    
     def extract_from_html_file(self, html_file_path: str) -> Optional[Dict[str, Any]]:
         """
         从HTML文件提取笔记内容
@@ -126,45 +170,39 @@ class NoteContentExtractor:
         try:
             logger.info(f"开始提取笔记内容，HTML大小: {len(html_content)} 字符")
             
-            # 按优先级提取数据
-            all_data = {}
-            
-            # 1. 尝试JSON数据提取
-            json_data = self._extract_from_json(html_content)
-            if json_data:
-                all_data.update(json_data)
-                logger.info(f"JSON提取成功: {len(json_data)} 个字段")
-            
-            # 2. HTML结构解析
-            html_data = self._extract_from_html_structure(html_content)
-            if html_data:
-                # 合并数据，已有的不覆盖
-                for key, value in html_data.items():
-                    if key not in all_data or not all_data[key]:
-                        all_data[key] = value
-                logger.info(f"HTML解析成功: {len(html_data)} 个字段")
-            
-            # 3. 正则表达式提取
-            regex_data = self._extract_with_regex(html_content)
-            if regex_data:
-                for key, value in regex_data.items():
-                    if key not in all_data or not all_data[key]:
-                        all_data[key] = value
-                logger.info(f"正则提取成功: {len(regex_data)} 个字段")
-            
-            # 数据清洗和验证
-            cleaned_data = self._clean_and_validate_data(all_data)
+            # 按优先级分层提取：JSON → HTML结构 → 正则，后面的层级只补缺失的核心字段
+            cleaned_data = {}
+            # 前面层级已给出的字段（包括评论数为0、标签为空列表这类合法的空值）
+            resolved = set()
+            
+            # 1. JSON数据提取（只扫描一次脚本数据，通常即可补齐全部字段）
+            self._merge_tier('json', cleaned_data, self._extract_from_json(html_content), resolved)
+            
+            # 2. HTML结构解析：只有仍缺字段时才构建DOM，且只执行缺失字段的选择器
+            missing = self._missing_fields(resolved)
+            html_fields = missing & (set(self.html_selectors) | {'images', 'tags'})
+            if html_fields:
+                self._merge_tier('html', cleaned_data, self._extract_from_html_structure(html_content, html_fields), resolved)
+            
+            # 3. 正则表达式提取：只运行仍缺失字段对应的模式
+            missing = self._missing_fields(resolved)
+            regex_fields = {
+                field for field in self.regex_patterns
+                if self.regex_field_targets.get(field, field) in missing
+            }
+            if regex_fields:
+                self._merge_tier('regex', cleaned_data, self._extract_with_regex(html_content, regex_fields), resolved)
             
             # 添加元数据
             cleaned_data['extraction_info'] = {
                 'source_file': source_file,
                 'extracted_at': datetime.now().isoformat(),
                 'extractor_version': '1.0.0',
-                'fields_count': len(cleaned_data) - 1,  # 减去extraction_info
+                'fields_count': len(cleaned_data),
             }
             
             self.stats['success'] += 1
-            logger.info(f"✅ 笔记内容提取成功，共提取 {len(cleaned_data)-1} 个字段")
+            logger.info(f"✅ 笔记内容提取成功，共提取 {cleaned_data['extraction_info']['fields_count']} 个字段")
             
             return cleaned_data
             
@@ -173,6 +211,36 @@ class NoteContentExtractor:
             logger.error(f"❌ 笔记内容提取失败: {e}")
             return None
     
+    def _missing_fields(self, resolved: set) -> set:
+        """返回前面层级都没有给出的核心字段（image_urls 视为已补齐 images）"""
+        missing = set(self.target_fields) - resolved
+        if 'image_urls' in resolved:
+            missing.discard('images')
+        return missing
+    
+    def _merge_tier(self, tier: str, data: Dict[str, Any], tier_data: Dict[str, Any], resolved: set):
+        """
+        清洗某一层级的提取结果并合并到data中，同时记录层级命中统计
+        前面层级已给出的字段（resolved）不覆盖，数值0或空列表也算已给出；合并后把本层级给出的字段加入resolved
+        """
+        tier_stats = self.stats['tiers'][tier]
+        tier_stats['runs'] += 1
+        
+        cleaned = self._clean_and_validate_data(tier_data)
+        added = 0
+        for key, value in cleaned.items():
+            if key not in resolved and key not in data:
+                data[key] = value
+                added += 1
+        # 清洗后保留的字段（数值0会保留），以及明确给出空列表的字段（没有标签、没有图片）
+        resolved.update(cleaned)
+        resolved.update(key for key, value in tier_data.items() if isinstance(value, list) and not value)
+        
+        if added:
+            tier_stats['hits'] += 1
+            tier_stats['fields'] += added
+            logger.info(f"{tier.upper()}层提取成功: 新增 {added} 个字段")
+    
     def _extract_from_json(self, html_content: str) -> Dict[str, Any]:
         """从JSON数据提取信息"""
         data = {}
@@ -205,7 +273,8 @@ class NoteContentExtractor:
                 if match:
                     try:
                         json_data = json.loads(match.group(1))
-                        data.update(self._parse_json_structure(json_data))
+                        for key, value in self._parse_json_structure(json_data).items():
+                            data.setdefault(key, value)
                     except:
                         continue
                         
@@ -215,35 +284,72 @@ class NoteContentExtractor:
         return data
     
     def _parse_json_structure(self, json_data: Any) -> Dict[str, Any]:
-        """解析JSON数据结构"""
+        """
+        解析JSON数据结构
+        
+        找到已知的笔记详情子树（快速路径）时只遍历该子树：video 等可选字段缺失是正常的，
+        不能因此再去整棵树或相邻的其他笔记中查找，否则会把别的笔记的字段填进来；
+        没有快速路径时对整棵树做广度优先遍历。每个字段取最先找到的值（同一对象内按别名优先级）
+        """
         data = {}
         
         try:
-            # 递归搜索关键字段
-            def search_fields(obj, path=""):
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        # 检查是否是目标字段
-                        for target_field, possible_keys in self.json_fields_mapping.items():
-                            if key in possible_keys and value:
-                                data[target_field] = value
-                        
-                        # 递归搜索
-                        if isinstance(value, (dict, list)):
-                            search_fields(value, f"{path}.{key}" if path else key)
-                            
-                elif isinstance(obj, list):
-                    for i, item in enumerate(obj):
-                        if isinstance(item, dict):
-                            search_fields(item, f"{path}[{i}]")
-            
-            search_fields(json_data)
+            fast_nodes = self._resolve_fast_paths(json_data)
+            self._walk_json(fast_nodes[0] if fast_nodes else json_data, data)
             
         except Exception as e:
             logger.warning(f"JSON结构解析失败: {e}")
         
         return data
     
+    def _resolve_fast_paths(self, json_data: Any) -> List[Dict[str, Any]]:
+        """解析快速路径，返回存在的笔记详情子树"""
+        nodes = []
+        for path in JSON_FAST_PATHS:
+            current = [json_data]
+            for step in path:
+                next_nodes = []
+                for node in current:
+                    if not isinstance(node, dict):
+                        continue
+                    if step == '*':
+                        next_nodes.extend(node.values())
+                    elif step in node:
+                        next_nodes.append(node[step])
+                current = next_nodes
+            nodes.extend(node for node in current if isinstance(node, dict) and node)
+        return nodes
+    
+    def _walk_json(self, root: Any, data: Dict[str, Any]):
+        """广度优先遍历JSON树，填充data中尚缺失的字段（原地修改）"""
+        alias_index = self._json_alias_index
+        total_fields = len(self.json_fields_mapping)
+        queue = deque([root])
+        
+        while queue:
+            obj = queue.popleft()
+            
+            if isinstance(obj, dict):
+                # 同一对象内多个别名命中同一字段时，取优先级最高的别名
+                node_hits = {}
+                for key, value in obj.items():
+                    targets = alias_index.get(key)
+                    # 0 和空列表是合法的值（评论数为0、没有标签），只跳过 None 和空字符串
+                    if targets and value is not None and value != '':
+                        for field, rank in targets:
+                            if field not in data and (field not in node_hits or rank < node_hits[field][0]):
+                                node_hits[field] = (rank, value)
+                    if isinstance(value, (dict, list)):
+                        queue.append(value)
+                
+                for field, (_, value) in node_hits.items():
+                    data[field] = value
+                if len(data) == total_fields:
+                    return
+                    
+            elif isinstance(obj, list):
+                queue.extend(item for item in obj if isinstance(item, (dict, list)))
+    
     def _try_fix_json(self, json_str: str) -> Optional[Dict[str, Any]]:
         """尝试修复损坏的JSON"""
         fixes = [
@@ -263,8 +369,14 @@ class NoteContentExtractor:
         
         return None
     
-    def _extract_from_html_structure(self, html_content: str) -> Dict[str, Any]:
-        """从HTML结构提取数据"""
+    def _extract_from_html_structure(self, html_content: str, fields: set = None) -> Dict[str, Any]:
+        """
+        从HTML结构提取数据
+        
+        Args:
+            html_content: HTML内容
+            fields: 需要提取的字段（None表示全部）
+        """
         data = {}
         
         try:
@@ -272,6 +384,8 @@ class NoteContentExtractor:
             
             # 提取文本数据
             for field, selectors in self.html_selectors.items():
+                if fields is not None and field not in fields:
+                    continue
                 for selector in selectors:
                     elements = soup.select(selector)
                     if elements:
@@ -281,18 +395,20 @@ class NoteContentExtractor:
                             break
             
             # 提取图片
-            images = self._extract_images(soup)
-            if images:
-                data['images'] = images
+            if fields is None or 'images' in fields:
+                images = self._extract_images(soup)
+                if images:
+                    data['images'] = images
             
-            # 提取Meta标签
+            # 提取Meta标签（DOM已构建，顺带提取）
             meta_data = self._extract_meta_tags(soup)
             data.update(meta_data)
             
             # 提取标签信息
-            tags = self._extract_tags(soup)
-            if tags:
-                data['tags'] = tags
+            if fields is None or 'tags' in fields:
+                tags = self._extract_tags(soup)
+                if tags:
+                    data['tags'] = tags
             
         except Exception as e:
             logger.warning(f"HTML结构解析失败: {e}")
@@ -372,14 +488,22 @@ class NoteContentExtractor:
         
         return tags[:10]  # 限制标签数量
     
-    def _extract_with_regex(self, html_content: str) -> Dict[str, Any]:
-        """使用正则表达式提取数据"""
+    def _extract_with_regex(self, html_content: str, fields: set = None) -> Dict[str, Any]:
+        """
+        使用正则表达式提取数据
+        
+        Args:
+            html_content: HTML内容
+            fields: 需要提取的字段（None表示全部）
+        """
         data = {}
         
         try:
-            for field, patterns in self.regex_patterns.items():
+            for field, patterns in self._compiled_regex_patterns.items():
+                if fields is not None and field not in fields:
+                    continue
                 for pattern in patterns:
-                    matches = re.findall(pattern, html_content, re.IGNORECASE)
+                    matches = pattern.findall(html_content)
                     if matches:
                         if field in ['image_urls']:
                             # 去重并限制数量
@@ -446,78 +570,201 @@ class NoteContentExtractor:
     
     def save_extracted_data(self, note_data: Dict[str, Any], note_id: str = None) -> str:
         """
-        保存提取的数据到JSON文件
+        保存提取的数据到笔记归档
         
         Args:
             note_data: 笔记数据
             note_id: 笔记ID（可选）
             
         Returns:
-            保存的文件路径
+            归档中的记录位置
         """
         try:
-            # 生成文件名
-            if note_id:
-                filename = f"{note_id}_extracted.json"
-            else:
-                # 使用数据哈希作为文件名
+            if not note_id:
+                # 使用数据哈希作为笔记ID
                 data_hash = hashlib.md5(json.dumps(note_data, sort_keys=True).encode()).hexdigest()
-                filename = f"note_{data_hash}_extracted.json"
+                note_id = f"note_{data_hash}"
             
-            file_path = self.cache_dir / filename
+            location = note_archive.append(note_id, KIND_EXTRACTED, note_data)
             
-            # 保存数据
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(note_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"✅ 数据已保存到: {file_path}")
-            return str(file_path)
+            logger.info(f"✅ 数据已保存到: {location}")
+            return location
             
         except Exception as e:
             logger.error(f"❌ 保存数据失败: {e}")
             raise
     
-    def batch_extract_from_cache(self, pattern: str = "*.html") -> List[Dict[str, Any]]:
+    def batch_extract_from_cache(self, pattern: str = "*.html", workers: int = None,
+                                 incremental: bool = True, archive: bool = True,
+                                 progress_callback: Callable[[int, int], None] = None) -> List[Dict[str, Any]]:
         """
         批量处理缓存目录中的HTML文件
         
+        通过清单文件记录每个HTML文件的(大小, 修改时间, 内容哈希)，未变化的文件直接跳过；
+        变化的文件交给进程池并行提取，结果汇总写入一个JSONL文件
+        
         Args:
             pattern: 文件匹配模式
+            workers: 并行进程数（默认为CPU核数，1表示在当前进程串行处理）
+            incremental: 是否跳过未变化的文件
+            archive: 是否同时把每篇笔记的提取结果写入笔记归档
+            progress_callback: 进度回调函数，参数为(已完成数, 待处理总数)
             
         Returns:
-            提取结果列表
+            提取结果列表（包含未变化文件的历史结果）
         """
         self.stats['start_time'] = datetime.now()
-        results = []
+        self.stats['skipped'] = 0
         
         try:
-            html_files = list(self.cache_dir.glob(pattern))
-            logger.info(f"找到 {len(html_files)} 个HTML文件待处理")
+            html_files = sorted(self.cache_dir.glob(pattern))
+            logger.info(f"找到 {len(html_files)} 个HTML文件待检查")
             
+            manifest = self._load_manifest() if incremental else {}
+            records = self._load_consolidated() if incremental else {}
+            new_manifest = {}
+            changed_files = []
+            
+            # 1. 根据清单判断哪些文件需要重新提取
             for html_file in html_files:
-                logger.info(f"处理文件: {html_file.name}")
+                key = html_file.relative_to(self.cache_dir).as_posix()
+                stat = html_file.stat()
+                entry = manifest.get(key)
+                
+                if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime and key in records:
+                    new_manifest[key] = entry
+                    continue
                 
-                extracted_data = self.extract_from_html_file(str(html_file))
+                content_hash = self._hash_file(html_file)
+                if entry and entry['hash'] == content_hash and key in records:
+                    # 内容未变，只更新修改时间
+                    new_manifest[key] = {**entry, 'mtime': stat.st_mtime}
+                    continue
+                
+                new_manifest[key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': content_hash}
+                changed_files.append((key, html_file))
+            
+            self.stats['skipped'] = len(html_files) - len(changed_files)
+            logger.info(f"📋 {len(changed_files)} 个文件需要提取，{self.stats['skipped']} 个未变化已跳过")
+            
+            # 2. 并行提取变化的文件
+            for done, (key, extracted_data) in enumerate(self._extract_files(changed_files, workers), 1):
                 if extracted_data:
-                    # 保存提取的数据
-                    note_id = extracted_data.get('note_id')
-                    saved_path = self.save_extracted_data(extracted_data, note_id)
-                    
-                    extracted_data['saved_path'] = saved_path
-                    results.append(extracted_data)
-                    
-                    logger.info(f"✅ 成功处理: {html_file.name}")
+                    if archive:
+                        extracted_data['saved_path'] = self.save_extracted_data(extracted_data, extracted_data.get('note_id'))
+                    records[key] = extracted_data
                 else:
-                    logger.warning(f"⚠️ 处理失败: {html_file.name}")
+                    records.pop(key, None)
+                    logger.warning(f"⚠️ 处理失败: {key}")
+                
+                if progress_callback:
+                    progress_callback(done, len(changed_files))
+                if done % 100 == 0 or done == len(changed_files):
+                    logger.info(f"⏳ 提取进度: {done}/{len(changed_files)}")
+            
+            # 3. 删除已不存在的文件记录，写回清单和汇总结果
+            records = {key: records[key] for key in new_manifest if key in records}
+            self._save_manifest(new_manifest)
+            self._save_consolidated(records)
+            
+            results = list(records.values())
                     
         except Exception as e:
             logger.error(f"❌ 批量处理失败: {e}")
+            results = []
         
         # 输出统计信息
         self._print_stats()
         
         return results
     
+    def _extract_files(self, changed_files: List[Tuple[str, Path]], workers: int = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """提取文件列表，文件较多时使用进程池并行处理"""
+        workers = workers or os.cpu_count() or 1
+        
+        if workers <= 1 or len(changed_files) <= 1:
+            for key, html_file in changed_files:
+                yield key, self.extract_from_html_file(str(html_file))
+            return
+        
+        # Web进程中有请求线程和后台线程，用 spawn 启动子进程，避免 fork 复制被其他线程持有的锁
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(str(self.cache_dir),),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {
+                executor.submit(_batch_extract_worker, str(html_file)): key
+                for key, html_file in changed_files
+            }
+            for future in as_completed(futures):
+                # 子进程中的统计不会回传，在这里补记
+                self.stats['processed'] += 1
+                try:
+                    extracted_data = future.result()
+                except Exception as e:
+                    logger.error(f"❌ 提取进程异常 {futures[future]}: {e}")
+                    extracted_data = None
+                self.stats['success' if extracted_data else 'failed'] += 1
+                yield futures[future], extracted_data
+    
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        """计算文件内容哈希"""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """加载增量提取清单"""
+        manifest_path = self.cache_dir / MANIFEST_FILENAME
+        if not manifest_path.exists():
+            return {}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取提取清单失败，将全量处理: {e}")
+            return {}
+    
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]):
+        """原子写入增量提取清单"""
+        self._atomic_write(self.cache_dir / MANIFEST_FILENAME, json.dumps(manifest, ensure_ascii=False))
+    
+    def _load_consolidated(self) -> Dict[str, Dict[str, Any]]:
+        """加载汇总提取结果（JSONL，每行一个 {"source": 相对路径, "data": 提取结果}）"""
+        consolidated_path = self.cache_dir / CONSOLIDATED_FILENAME
+        records = {}
+        if not consolidated_path.exists():
+            return records
+        try:
+            with open(consolidated_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record['source']] = record['data']
+        except Exception as e:
+            logger.warning(f"读取汇总结果失败，将全量处理: {e}")
+            return {}
+        return records
+    
+    def _save_consolidated(self, records: Dict[str, Dict[str, Any]]):
+        """原子写入汇总提取结果"""
+        lines = [
+            json.dumps({'source': key, 'data': data}, ensure_ascii=False)
+            for key, data in records.items()
+        ]
+        self._atomic_write(self.cache_dir / CONSOLIDATED_FILENAME, '\n'.join(lines) + ('\n' if lines else ''))
+        logger.info(f"💾 汇总结果已保存: {self.cache_dir / CONSOLIDATED_FILENAME} ({len(lines)} 条)")
+    
+    @staticmethod
+    def _atomic_write(file_path: Path, content: str):
+        """先写临时文件再替换，避免中断时留下半个文件"""
+        tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+    
     def _print_stats(self):
         """打印统计信息"""
         if self.stats['start_time']:
@@ -528,10 +775,29 @@ class NoteContentExtractor:
             logger.info(f"总处理数: {self.stats['processed']}")
             logger.info(f"成功数: {self.stats['success']}")
             logger.info(f"失败数: {self.stats['failed']}")
+            logger.info(f"跳过数: {self.stats.get('skipped', 0)}")
+            for tier, tier_stats in self.stats['tiers'].items():
+                logger.info(f"{tier.upper()}层: 运行 {tier_stats['runs']} 次, 命中 {tier_stats['hits']} 次, 补齐 {tier_stats['fields']} 个字段")
             logger.info(f"成功率: {self.stats['success']/max(self.stats['processed'], 1)*100:.1f}%")
             logger.info(f"处理时间: {duration.total_seconds():.1f} 秒")
             logger.info("="*50)
 
+
+# 批量提取子进程中的提取器实例
+_worker_extractor = None
+
+
+def _init_batch_worker(cache_dir: str):
+    """批量提取子进程初始化：每个进程只创建一次提取器"""
+    global _worker_extractor
+    _worker_extractor = NoteContentExtractor(cache_dir)
+
+
+def _batch_extract_worker(html_file_path: str) -> Optional[Dict[str, Any]]:
+    """批量提取子进程任务"""
+    return _worker_extractor.extract_from_html_file(html_file_path)
+
+
 def main():
     """主函数 - 用于测试"""
     import sys
@@ -557,7 +823,7 @@ def main():
         else:
             print("❌ 提取失败")
     else:
-        # 批量处理
+        # 批量处理（增量 + 多进程）
         logger.info("开始批量处理缓存目录中的HTML文件")
         results = extractor.batch_extract_from_cache()
         print(f"✅ 批量处理完成，共处理 {len(results)} 个文件")
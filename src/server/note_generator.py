@@ -8,23 +8,59 @@ import json
 import logging
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
 import random
 import requests
+import glob
+import copy
 import hashlib
+import threading
+from collections import OrderedDict
 from urllib.parse import urlparse, urljoin
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 
+from src.server.metrics import (
+    IMAGE_DOWNLOAD_SECONDS, IMAGE_DOWNLOAD_BYTES,
+    NOTE_GENERATION_STEP_SECONDS, CACHE_REQUESTS
+)
+from src.server.extraction_cache import extraction_cache
+from src.crawler.note_archive import note_archive, KIND_DETAIL, KIND_EXTRACTED
+from src.crawler.browser_pool import browser_pool
+from src.server.text_analysis import lcut, lcut_batch, JIEBA_AVAILABLE
+from src.crawler.near_duplicate import near_duplicate_index
+from src.server.debug_store import DebugStore
+from src.server.llm_client import llm_client_from_env
+from src.server.keyword_model import keyword_model
+from src.server.text_patterns import text_patterns
+from src.crawler.crawl_service import fetch_note_page, crawl_service_client_from_env
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 笔记分析结果LRU缓存的最大条目数
+ANALYSIS_CACHE_SIZE = 512
+
+# 改为分段存储之前按步骤单独保存的debug文件（<会话ID>_<步骤>.json）
+LEGACY_DEBUG_SUFFIXES = ('_session.json', '_analysis.json', '_generated_note.json')
+
+# 大模型提示词模板（修改模板时同步修改版本号，使旧的缓存结果失效）
+PROMPT_TEMPLATE_VERSION = 'note-v1'
+PROMPT_TEMPLATE = """你是一名小红书内容创作者。请参考下面这篇笔记，写一篇主题相同但内容原创的新笔记。
+
+原笔记标题：{title}
+原笔记正文：{content}
+原笔记标签：{tags}
+内容类型：{content_type}
+语言风格：{tone}
+主题：{topics}
+关键词：{keywords}
+
+要求：标题不超过20字并带表情符号，正文300字以内，分段清晰，给出3-8个标签。
+只输出JSON：{{"title": "标题", "content": "正文", "tags": ["标签"]}}"""
+
 class NoteContentGenerator:
     """笔记内容生成器"""
     
@@ -39,21 +75,36 @@ class NoteContentGenerator:
         # 确保目录存在
         os.makedirs(self.debug_dir, exist_ok=True)
         os.makedirs(self.notes_dir, exist_ok=True)
+
+        # 调试信息追加写入按天滚动的分段文件，由后台线程落盘
+        self.debug_store = DebugStore(self.debug_dir)
+        # 改为分段存储之前的旧debug文件是否已全部清理
+        self._legacy_debug_cleared = False
+
+        # 大模型客户端（根据 LLM_BASE_URL 等环境变量创建，见 llm_client_from_env）
+        self.llm_client = llm_client_from_env()
+        self.ai_enabled = self.llm_client is not None  # 默认关闭，设置 LLM_BASE_URL 等环境变量后开启
+
+        # 爬虫层客户端（CRAWL_TIER=remote 时创建，本地没有的笔记页面交给爬虫工作进程获取）
+        self.crawl_client = crawl_service_client_from_env()
         
-        # 初始化大模型设置（这里使用模拟，实际可以接入OpenAI, Claude等）
-        self.ai_enabled = False  # 默认关闭，可以通过环境变量开启
+        # 本地页面源码的提取器（首次使用时创建）
+        self._extractor = None
         
-        # Cookie文件路径
-        self.cookies_file = os.path.join('cache', 'cookies', 'xiaohongshu_cookies.json')
+        # 分析结果缓存：内容哈希 -> 分析结果
+        self._analysis_cache = OrderedDict()
+        self._analysis_lock = threading.Lock()
         
         logger.info("笔记内容生成器初始化完成")
     
-    def generate_similar_note(self, original_note: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_similar_note(self, original_note: Dict[str, Any],
+                              on_delta: Callable[[str], None] = None) -> Dict[str, Any]:
         """
         根据原笔记生成同类笔记内容
         
         Args:
             original_note: 原笔记信息，包含title, content, tags等
+            on_delta: 接收大模型流式输出片段的回调（未启用大模型时不会调用）
             
         Returns:
             Dict: 生成的笔记内容，包含title, content, tags, suggestions等
@@ -64,46 +115,239 @@ class NoteContentGenerator:
             # 创建debug会话
             session_id = self._create_debug_session(original_note)
             
-            # 获取原笔记的完整内容（通过代理访问）
-            note_detail = self._fetch_note_detail(original_note.get('note_id'), session_id)
-            self._save_debug_info(session_id, "note_detail", note_detail)
+            # 获取原笔记的完整内容：依次尝试本地已爬取的详情、近似重复笔记的归档详情，都没有时才通过浏览器池访问
+            with NOTE_GENERATION_STEP_SECONDS.time('fetch_detail'):
+                note_detail = self._find_known_detail(original_note)
+                if not note_detail:
+                    note_detail = self._fetch_note_detail(original_note.get('note_id'), session_id)
             
-            # 分析原笔记内容
-            analysis_result = self._analyze_original_note(note_detail if note_detail.get('success') else original_note)
-            self._save_debug_info(session_id, "analysis", analysis_result)
+            return self._generate_from_detail(original_note, note_detail, session_id, on_delta=on_delta)
             
-            # 生成新笔记内容
-            source_note = note_detail if note_detail.get('success') else original_note
+        except Exception as e:
+            logger.error(f"生成同类笔记失败: {str(e)}")
+            raise
+    
+    def generate_similar_notes(self, original_notes: List[Dict[str, Any]],
+                               max_workers: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        批量生成同类笔记，每篇生成完成后立即产出
+        
+        本地已有详情的笔记一次性批量分析后先产出；本地没有的笔记通过浏览器池并发获取，
+        并发数不超过浏览器池上限，获取完成一篇就生成一篇
+        
+        Args:
+            original_notes: 原笔记信息列表（需包含note_id）
+            max_workers: 并发获取详情的线程数（默认等于浏览器池上限）
+            
+        Yields:
+            {'index', 'note_id', 'success', 'generated_note' 或 'error'}
+        """
+        sessions = [self._create_debug_session(note) for note in original_notes]
+        details = [None] * len(original_notes)
+        
+        with NOTE_GENERATION_STEP_SECONDS.time('fetch_detail'):
+            for i, note in enumerate(original_notes):
+                details[i] = self._find_known_detail(note)
+        
+        # 本地命中的笔记：一次批量分词分析，逐篇生成
+        known = [i for i, detail in enumerate(details) if detail]
+        with NOTE_GENERATION_STEP_SECONDS.time('analysis'):
+            analyses = self.analyze_notes([details[i] for i in known])
+        if self.ai_enabled and len(known) > 1:
+            # 同时提交多篇，大模型客户端才能把提示词合并成批
+            workers = min(len(known), self.llm_client.max_concurrency * self.llm_client.max_batch_size)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='note-generate') as executor:
+                futures = [
+                    executor.submit(self._batch_item, i, original_notes[i], details[i], sessions[i], analysis)
+                    for i, analysis in zip(known, analyses)
+                ]
+                for future in as_completed(futures):
+                    yield future.result()
+        else:
+            for i, analysis in zip(known, analyses):
+                yield self._batch_item(i, original_notes[i], details[i], sessions[i], analysis)
+        
+        # 本地未命中的笔记：有界并发获取，完成顺序产出
+        missing = [i for i, detail in enumerate(details) if not detail]
+        if not missing:
+            return
+        
+        workers = max(1, min(max_workers or browser_pool.max_size, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='note-fetch') as executor:
+            futures = {
+                executor.submit(self._fetch_note_detail, original_notes[i].get('note_id'), sessions[i]): i
+                for i in missing
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    detail = future.result()
+                except Exception as e:
+                    detail = {"success": False, "error": str(e)}
+                yield self._batch_item(i, original_notes[i], detail, sessions[i])
+    
+    def _batch_item(self, index: int, original_note: Dict[str, Any], note_detail: Dict[str, Any],
+                    session_id: str, analysis: Dict[str, Any] = None) -> Dict[str, Any]:
+        """生成单篇笔记并包装为批量结果（单篇失败不影响其他笔记）"""
+        note_id = original_note.get('note_id')
+        try:
+            generated_note = self._generate_from_detail(original_note, note_detail, session_id, analysis)
+            return {'index': index, 'note_id': note_id, 'success': True, 'generated_note': generated_note}
+        except Exception as e:
+            logger.error(f"批量生成同类笔记失败 {note_id}: {str(e)}")
+            return {'index': index, 'note_id': note_id, 'success': False, 'error': str(e)}
+    
+    def _find_known_detail(self, original_note: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查找无需访问网络即可获得的笔记详情：本地已爬取的详情 > 近似重复笔记的归档详情"""
+        return (
+            self.load_local_note_detail(original_note.get('note_id'))
+            or self._find_duplicate_detail(original_note)
+        )
+    
+    def _generate_from_detail(self, original_note: Dict[str, Any], note_detail: Dict[str, Any],
+                              session_id: str, analysis_result: Dict[str, Any] = None,
+                              on_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """
+        基于已获取的笔记详情完成分析和生成
+        
+        Args:
+            original_note: 原笔记信息
+            note_detail: 笔记详情（获取失败时success为False，退回使用原笔记信息）
+            session_id: debug会话ID
+            analysis_result: 已完成的分析结果（批量分析时传入）
+            on_delta: 接收大模型流式输出片段的回调
+        """
+        self._save_debug_info(session_id, "note_detail", note_detail)
+        
+        # 分析原笔记内容
+        if analysis_result is None:
+            with NOTE_GENERATION_STEP_SECONDS.time('analysis'):
+                analysis_result = self._analyze_original_note(note_detail if note_detail.get('success') else original_note)
+        self._save_debug_info(session_id, "analysis", analysis_result)
+        
+        # 生成新笔记内容
+        source_note = note_detail if note_detail.get('success') else original_note
+        with NOTE_GENERATION_STEP_SECONDS.time('generation'):
             if self.ai_enabled:
-                generated_note = self._generate_with_ai(source_note, analysis_result)
+                generated_note = self._generate_with_ai(source_note, analysis_result, on_delta)
             else:
                 generated_note = self._generate_with_templates(source_note, analysis_result)
+        
+        self._save_debug_info(session_id, "generated_note", generated_note)
+        
+        # 添加生成时间和会话ID
+        generated_note['generated_at'] = datetime.now().isoformat()
+        generated_note['debug_session_id'] = session_id
+        
+        # 添加原笔记详细信息
+        if note_detail and note_detail.get('success'):
+            generated_note['original_note_detail'] = {
+                'title': note_detail.get('title', ''),
+                'content': note_detail.get('content', ''),
+                'tags': note_detail.get('tags', []),
+                'images': note_detail.get('images', []),
+                'author': note_detail.get('author', ''),
+                'note_id': original_note.get('note_id', ''),
+                'source_file': note_detail.get('source_file', ''),
+                'images_dir': note_detail.get('images_dir', '')
+            }
+        
+        logger.info(f"笔记生成完成，会话ID: {session_id}")
+        return generated_note
+    
+    def load_local_note_detail(self, note_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查找本地已有的笔记详情：后台爬虫归档的详情 > 提取器归档的提取结果 > cache/notes 下保存的页面源码
+        
+        Returns:
+            笔记详情（带success标记），本地没有时返回None
+        """
+        if not note_id:
+            return None
+        
+        try:
+            for kind in (KIND_DETAIL, KIND_EXTRACTED):
+                detail = note_archive.get(note_id, kind)
+                if detail and (detail.get('title') or detail.get('content')):
+                    CACHE_REQUESTS.inc('note_detail', kind)
+                    logger.info(f"使用本地归档的笔记详情({kind}): {note_id}")
+                    return self._normalize_local_detail(detail)
+            
+            source_file = self._find_page_source(note_id)
+            if source_file:
+                _, body, _ = extraction_cache.get_or_extract(source_file, self._get_extractor().extract_from_html_file)
+                if body:
+                    CACHE_REQUESTS.inc('note_detail', 'page_source')
+                    logger.info(f"使用本地保存的页面源码: {source_file}")
+                    return self._normalize_local_detail(json.loads(body), source_file)
+        except Exception as e:
+            logger.warning(f"读取本地笔记详情失败: {str(e)}")
+        
+        CACHE_REQUESTS.inc('note_detail', 'miss')
+        return None
+    
+    def _find_page_source(self, note_id: str) -> Optional[str]:
+        """查找该笔记最新保存的页面源码（生成器和后台爬虫保存的文件名格式不同）"""
+        patterns = [
+            os.path.join(self.notes_dir, f"{glob.escape(note_id)}_*_source.html"),
+            os.path.join(self.notes_dir, 'batch_*', f"*_{glob.escape(note_id)}_source.html"),
+        ]
+        candidates = [path for pattern in patterns for path in glob.glob(pattern)]
+        return max(candidates, key=os.path.getmtime) if candidates else None
+    
+    def _get_extractor(self):
+        """获取页面源码提取器"""
+        if self._extractor is None:
+            from src.server.note_content_extractor import NoteContentExtractor
+            self._extractor = NoteContentExtractor()
+        return self._extractor
+    
+    @staticmethod
+    def _normalize_local_detail(detail: Dict[str, Any], source_file: str = '') -> Dict[str, Any]:
+        """把归档详情/提取结果统一为生成器使用的字段"""
+        images = [
+            image if isinstance(image, dict) else {'original_url': image}
+            for image in detail.get('images') or []
+        ]
+        return {
+            **detail,
+            'title': detail.get('title', ''),
+            'content': detail.get('content') or detail.get('description', ''),
+            'tags': detail.get('tags') or [],
+            'author': detail.get('author') or detail.get('author_name', ''),
+            'images': images,
+            'source_file': detail.get('source_file') or source_file,
+            'from_local_cache': True,
+            'success': True
+        }
+    
+    def _find_duplicate_detail(self, original_note: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        查找与原笔记近似重复、且已归档详情的笔记
+        
+        Returns:
+            归档的笔记详情（带success标记），没有时返回None
+        """
+        try:
+            note_id = original_note.get('note_id')
+            canonical = near_duplicate_index.find_duplicate(note_id, original_note)
+            if not canonical:
+                return None
             
-            self._save_debug_info(session_id, "generated_note", generated_note)
-            
-            # 添加生成时间和会话ID
-            generated_note['generated_at'] = datetime.now().isoformat()
-            generated_note['debug_session_id'] = session_id
-            
-            # 添加原笔记详细信息
-            if note_detail and note_detail.get('success'):
-                generated_note['original_note_detail'] = {
-                    'title': note_detail.get('title', ''),
-                    'content': note_detail.get('content', ''),
-                    'tags': note_detail.get('tags', []),
-                    'images': note_detail.get('images', []),
-                    'author': note_detail.get('author', ''),
-                    'note_id': original_note.get('note_id', ''),
-                    'source_file': note_detail.get('source_file', ''),
-                    'images_dir': note_detail.get('images_dir', '')
-                }
-            
-            logger.info(f"笔记生成完成，会话ID: {session_id}")
-            return generated_note
+            detail = note_archive.get(canonical, KIND_DETAIL)
+            if not detail:
+                return None
             
+            logger.info(f"原笔记与已归档笔记近似重复，复用详情: {note_id} -> {canonical}")
+            return {
+                **detail,
+                'content': detail.get('content') or detail.get('description', ''),
+                'duplicate_of': canonical,
+                'success': True
+            }
         except Exception as e:
-            logger.error(f"生成同类笔记失败: {str(e)}")
-            raise
+            logger.warning(f"查找近似重复笔记失败: {str(e)}")
+            return None
     
     def _create_debug_session(self, original_note: Dict[str, Any]) -> str:
         """创建debug会话"""
@@ -117,146 +361,133 @@ class NoteContentGenerator:
             "status": "started"
         }
         
-        session_file = os.path.join(self.debug_dir, f"{session_id}_session.json")
-        with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_info, f, ensure_ascii=False, indent=2)
-        
+        self.debug_store.append(session_id, "session", session_info)
+
         return session_id
     
     def _save_debug_info(self, session_id: str, step: str, data: Any):
         """保存debug信息"""
         try:
-            debug_file = os.path.join(self.debug_dir, f"{session_id}_{step}.json")
             debug_data = {
                 "session_id": session_id,
                 "step": step,
                 "timestamp": datetime.now().isoformat(),
                 "data": data
             }
-            
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                json.dump(debug_data, f, ensure_ascii=False, indent=2)
-                
+            self.debug_store.append(session_id, step, debug_data)
+
         except Exception as e:
             logger.error(f"保存debug信息失败: {str(e)}")
     
     def _analyze_original_note(self, original_note: Dict[str, Any]) -> Dict[str, Any]:
-        """分析原笔记内容"""
+        """分析原笔记内容（相同内容的分析结果直接从缓存返回）"""
+        return self.analyze_notes([original_note])[0]
+    
+    def analyze_notes(self, notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量分析笔记：命中缓存的直接返回，其余笔记一次性分词后逐条分析
+        
+        Args:
+            notes: 笔记列表，每条包含title, content, tags
+            
+        Returns:
+            与输入顺序一致的分析结果列表
+        """
+        keys = [self._analysis_key(note) for note in notes]
+        results = [None] * len(notes)
+        
+        with self._analysis_lock:
+            for i, key in enumerate(keys):
+                cached = self._analysis_cache.get(key)
+                if cached is not None:
+                    self._analysis_cache.move_to_end(key)
+                    results[i] = copy.deepcopy(cached)
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        CACHE_REQUESTS.inc('note_analysis', 'hit', amount=len(notes) - len(missing))
+        CACHE_REQUESTS.inc('note_analysis', 'miss', amount=len(missing))
+        if not missing:
+            return results
+        
+        texts = [f"{notes[i].get('title', '')} {notes[i].get('content', '')}" for i in missing]
+        word_lists = lcut_batch(texts) if JIEBA_AVAILABLE else [None] * len(missing)
+        
+        for i, words in zip(missing, word_lists):
+            analysis = self._build_analysis(notes[i], words)
+            results[i] = analysis
+            with self._analysis_lock:
+                self._analysis_cache[keys[i]] = copy.deepcopy(analysis)
+                self._analysis_cache.move_to_end(keys[i])
+                while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+        
+        return results
+    
+    @staticmethod
+    def _analysis_key(note: Dict[str, Any]) -> str:
+        """分析缓存键：标题、正文和标签的内容哈希"""
+        raw = json.dumps(
+            [note.get('title', ''), note.get('content', ''), note.get('tags', [])],
+            ensure_ascii=False, default=str
+        )
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _build_analysis(self, original_note: Dict[str, Any], words: Optional[List[str]] = None) -> Dict[str, Any]:
+        """执行各项检测，生成分析结果"""
         title = original_note.get('title', '')
         content = original_note.get('content', '')
         tags = original_note.get('tags', [])
         
+        # 内容类型、语调、主题、吸引元素的词典一次扫描完成
+        hits = text_patterns.match(title + " " + content)
+        
         analysis = {
-            "content_type": self._detect_content_type(title, content),
-            "tone": self._detect_tone(title, content), 
-            "topics": self._extract_topics(title, content),
-            "keywords": self._extract_keywords(title, content),
+            "content_type": self._detect_content_type(title, content, hits),
+            "tone": self._detect_tone(title, content, hits), 
+            "topics": self._extract_topics(title, content, hits),
+            "keywords": self._extract_keywords(title, content, words),
             "structure": self._analyze_structure(content),
-            "engagement_elements": self._find_engagement_elements(title, content),
+            "engagement_elements": self._find_engagement_elements(title, content, hits),
             "original_tags": tags
         }
         
         return analysis
     
-    def _detect_content_type(self, title: str, content: str) -> str:
-        """检测内容类型"""
-        text = (title + " " + content).lower()
-        
-        if any(word in text for word in ['教程', '攻略', '步骤', '方法', '如何', '怎么']):
-            return "教程攻略"
-        elif any(word in text for word in ['分享', '推荐', '种草', '好物', '值得']):
-            return "分享推荐"
-        elif any(word in text for word in ['穿搭', '搭配', '服装', '衣服', '时尚']):
-            return "穿搭时尚"
-        elif any(word in text for word in ['美食', '吃', '餐厅', '菜谱', '料理']):
-            return "美食"
-        elif any(word in text for word in ['旅行', '旅游', '景点', '打卡', '出行']):
-            return "旅行"
-        elif any(word in text for word in ['护肤', '化妆', '美妆', '保养', '护理']):
-            return "美妆护肤"
-        elif any(word in text for word in ['生活', '日常', 'vlog', '记录']):
-            return "生活日常"
-        else:
-            return "综合分享"
-    
-    def _detect_tone(self, title: str, content: str) -> str:
-        """检测语调风格"""
-        text = (title + " " + content).lower()
-        
-        if any(word in text for word in ['！', '!', '哇', '太好了', '超级', '巨']):
-            return "活泼兴奋"
-        elif any(word in text for word in ['温柔', '轻松', '舒适', '静谧']):
-            return "温柔治愈"
-        elif any(word in text for word in ['专业', '建议', '推荐', '分析']):
-            return "专业理性"
-        elif any(word in text for word in ['可爱', '萌', '小仙女', '宝贝']):
-            return "可爱甜美"
-        else:
-            return "自然亲和"
+    def _detect_content_type(self, title: str, content: str, hits: Dict[str, List[str]] = None) -> str:
+        """检测内容类型（按词典顺序取第一个命中的类型）"""
+        if hits is None:
+            hits = text_patterns.match(title + " " + content)
+        return text_patterns.first(hits, 'content_type') or "综合分享"
+    
+    def _detect_tone(self, title: str, content: str, hits: Dict[str, List[str]] = None) -> str:
+        """检测语调风格（按词典顺序取第一个命中的语调）"""
+        if hits is None:
+            hits = text_patterns.match(title + " " + content)
+        return text_patterns.first(hits, 'tone') or "自然亲和"
     
-    def _extract_topics(self, title: str, content: str) -> List[str]:
+    def _extract_topics(self, title: str, content: str, hits: Dict[str, List[str]] = None) -> List[str]:
         """提取主题关键词"""
-        text = title + " " + content
-        
-        # 简单的主题提取逻辑
-        topics = []
-        
-        # 常见主题关键词
-        topic_keywords = {
-            "美食": ["美食", "吃", "餐厅", "菜谱", "料理", "小食", "甜品"],
-            "穿搭": ["穿搭", "服装", "衣服", "搭配", "时尚", "风格"],
-            "护肤": ["护肤", "保养", "肌肤", "面膜", "精华", "乳液"],
-            "化妆": ["化妆", "彩妆", "口红", "眼影", "粉底", "美妆"],
-            "旅行": ["旅行", "旅游", "景点", "打卡", "出行", "度假"],
-            "生活": ["生活", "日常", "家居", "收纳", "整理"],
-            "学习": ["学习", "读书", "知识", "技能", "提升"],
-            "健身": ["健身", "运动", "锻炼", "瑜伽", "减肥"]
-        }
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                topics.append(topic)
-        
-        return topics[:3]  # 最多返回3个主题
+        if hits is None:
+            hits = text_patterns.match(title + " " + content)
+        return hits.get('topic', [])[:3]  # 最多返回3个主题
     
-    def _extract_keywords(self, title: str, content: str) -> List[str]:
-        """提取关键词"""
-        text = title + " " + content
-        
-        # 简单的关键词提取（实际项目中可以使用更sophisticated的NLP技术）
-        keywords = []
+    def _extract_keywords(self, title: str, content: str, words: Optional[List[str]] = None) -> List[str]:
+        """
+        提取关键词
         
-        # 使用正则表达式提取可能的关键词
-        # 这里简化处理，提取一些常见的名词性短语
-        try:
-            import jieba
-            # 分词
-            words = jieba.lcut(text)
-            
-            # 过滤词汇
-            filtered_words = [
-                word for word in words 
-                if len(word) >= 2 and word not in ['的', '是', '在', '有', '和', '与', '了', '着', '过']
-            ]
-            
-            # 统计词频（简化版）
-            word_freq = {}
-            for word in filtered_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
-            
-            # 按频率排序，取前8个
-            keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:8]
-            keywords = [word[0] for word in keywords]
-            
-        except:
-            # 如果jieba不可用，使用简单的方法
-            keywords = re.findall(r'[\u4e00-\u9fff]{2,4}', text)[:8]
+        Args:
+            words: 已完成的分词结果（批量分析时传入），为None时在这里分词
+        """
+        # 分词（词典已在后台预热；jieba不可用时为正则提取的中文词）
+        if words is None:
+            words = lcut(title + " " + content)
         
-        return keywords
+        # 按语料TF-IDF打分，取前8个
+        return keyword_model.top_keywords(words, top_k=8)
     
     def _fetch_note_detail(self, note_id: str, session_id: str) -> Dict[str, Any]:
         """
-        通过代理方式获取笔记详细内容
+        通过浏览器池或爬虫工作进程获取笔记详细内容（本地没有该笔记时使用）
         
         Args:
             note_id: 笔记ID
@@ -268,112 +499,27 @@ class NoteContentGenerator:
         try:
             logger.info(f"开始获取笔记详情: {note_id}")
             
-            # 构建笔记URL
-            note_url = f"https://www.xiaohongshu.com/explore/{note_id}"
+            # 独立爬虫层模式下由爬虫工作进程打开页面，否则从本进程的浏览器池借出浏览器
+            if self.crawl_client is not None:
+                page_source = self.crawl_client.call('fetch_note_page', note_id=note_id)
+            else:
+                page_source = fetch_note_page(note_id)
             
-            # 创建浏览器实例
-            driver = self._create_browser_instance()
-            if not driver:
-                return {"success": False, "error": "无法创建浏览器实例"}
+            # 保存页面源码
+            source_file = self._save_page_source(note_id, page_source, session_id)
             
-            try:
-                # 加载cookies
-                self._load_cookies_to_browser(driver)
-                
-                # 访问笔记页面
-                logger.info(f"访问笔记页面: {note_url}")
-                driver.get(note_url)
-                
-                # 等待页面加载
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                
-                # 等待内容加载
-                time.sleep(3)
-                
-                # 获取页面源码
-                page_source = driver.page_source
-                
-                # 保存页面源码
-                source_file = self._save_page_source(note_id, page_source, session_id)
-                
-                # 解析页面内容
-                note_detail = self._parse_note_content(page_source, note_id, session_id)
-                note_detail['source_file'] = source_file
-                note_detail['success'] = True
-                
-                logger.info(f"笔记详情获取成功: {note_id}")
-                return note_detail
-                
-            finally:
-                driver.quit()
+            # 解析页面内容
+            note_detail = self._parse_note_content(page_source, note_id, session_id)
+            note_detail['source_file'] = source_file
+            note_detail['success'] = True
+            
+            logger.info(f"笔记详情获取成功: {note_id}")
+            return note_detail
                 
         except Exception as e:
             logger.error(f"获取笔记详情失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def _create_browser_instance(self):
-        """创建浏览器实例"""
-        try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--disable-web-security')
-            chrome_options.add_argument('--ignore-certificate-errors')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            
-            # 尝试不同的ChromeDriver路径
-            driver_paths = [
-                'drivers/chromedriver-mac-arm64/chromedriver',
-                'drivers/chromedriver',
-                '/usr/local/bin/chromedriver',
-                '/opt/homebrew/bin/chromedriver'
-            ]
-            
-            for driver_path in driver_paths:
-                if os.path.exists(driver_path):
-                    from selenium.webdriver.chrome.service import Service
-                    service = Service(driver_path)
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                    return driver
-            
-            # 如果没有找到指定路径，尝试系统PATH中的chromedriver
-            driver = webdriver.Chrome(options=chrome_options)
-            return driver
-            
-        except Exception as e:
-            logger.error(f"创建浏览器实例失败: {str(e)}")
-            return None
-    
-    def _load_cookies_to_browser(self, driver):
-        """加载cookies到浏览器"""
-        try:
-            if os.path.exists(self.cookies_file):
-                # 先访问主页以设置域名
-                driver.get("https://www.xiaohongshu.com")
-                time.sleep(1)
-                
-                with open(self.cookies_file, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
-                
-                for cookie in cookies:
-                    try:
-                        driver.add_cookie(cookie)
-                    except Exception as e:
-                        logger.debug(f"添加cookie失败: {str(e)}")
-                        continue
-                
-                logger.info("Cookies加载完成")
-            else:
-                logger.warning("Cookies文件不存在")
-                
-        except Exception as e:
-            logger.error(f"加载cookies失败: {str(e)}")
-    
     def _save_page_source(self, note_id: str, page_source: str, session_id: str) -> str:
         """保存页面源码"""
         try:
@@ -637,6 +783,7 @@ class NoteContentGenerator:
     
     def _download_single_image(self, url: str, save_dir: str, filename_prefix: str) -> Optional[Dict[str, str]]:
         """下载单张图片"""
+        started = time.perf_counter()
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -663,6 +810,9 @@ class NoteContentGenerator:
             with open(file_path, 'wb') as f:
                 f.write(response.content)
             
+            IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - started, 'generator', 'success')
+            IMAGE_DOWNLOAD_BYTES.inc('generator', amount=len(response.content))
+            
             # 生成Web访问路径
             web_path = f"/cache/notes/{os.path.basename(save_dir)}/{filename}"
             
@@ -674,6 +824,7 @@ class NoteContentGenerator:
             }
             
         except Exception as e:
+            IMAGE_DOWNLOAD_SECONDS.observe(time.perf_counter() - started, 'generator', 'failure')
             logger.error(f"下载图片失败 {url}: {str(e)}")
             return None
     
@@ -691,28 +842,11 @@ class NoteContentGenerator:
         
         return structure
     
-    def _find_engagement_elements(self, title: str, content: str) -> List[str]:
-        """找出吸引人的元素"""
-        text = title + " " + content
-        elements = []
-        
-        # 检测各种吸引人的元素
-        if '?' in text or '？' in text:
-            elements.append("互动问句")
-        
-        if any(word in text for word in ['分享', '推荐', '必买', '必看']):
-            elements.append("推荐语气")
-            
-        if any(word in text for word in ['超级', '巨', '特别', '非常']):
-            elements.append("强调词汇")
-            
-        if re.search(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', text):
-            elements.append("表情符号")
-            
-        if any(word in text for word in ['攻略', '秘籍', '技巧', '妙招']):
-            elements.append("实用价值")
-        
-        return elements
+    def _find_engagement_elements(self, title: str, content: str, hits: Dict[str, List[str]] = None) -> List[str]:
+        """找出吸引人的元素（互动问句、推荐语气、强调词汇、表情符号、实用价值等）"""
+        if hits is None:
+            hits = text_patterns.match(title + " " + content)
+        return list(hits.get('engagement', []))
     
     def _generate_with_templates(self, original_note: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
         """使用模板生成新笔记内容（当AI不可用时的备选方案）"""
@@ -748,14 +882,67 @@ class NoteContentGenerator:
             "tone": tone
         }
     
-    def _generate_with_ai(self, original_note: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """使用大模型生成新笔记内容（需要配置AI API）"""
-        # 这里是AI生成的接口，需要根据实际使用的大模型进行实现
-        # 比如OpenAI GPT, Claude, 或者本地模型等
+    def _generate_with_ai(self, original_note: Dict[str, Any], analysis: Dict[str, Any],
+                          on_delta: Callable[[str], None] = None) -> Dict[str, Any]:
+        """使用大模型生成新笔记内容，调用失败或输出无法解析时退回模板生成"""
+        prompt = self._build_prompt(original_note, analysis)
+        try:
+            if on_delta:
+                chunks = []
+                for chunk in self.llm_client.stream(prompt, PROMPT_TEMPLATE_VERSION):
+                    chunks.append(chunk)
+                    on_delta(chunk)
+                output = ''.join(chunks)
+            else:
+                output = self.llm_client.generate(prompt, PROMPT_TEMPLATE_VERSION)
+        except Exception as e:
+            logger.warning(f"大模型生成失败，使用模板生成: {str(e)}")
+            return self._generate_with_templates(original_note, analysis)
+        
+        parsed = self._parse_ai_output(output)
+        if not parsed.get('title') or not parsed.get('content'):
+            logger.warning("大模型输出无法解析，使用模板生成")
+            return self._generate_with_templates(original_note, analysis)
+        
+        tags = [str(tag).lstrip('#') for tag in parsed.get('tags') or [] if tag]
+        return {
+            "title": parsed['title'],
+            "content": parsed['content'],
+            "tags": tags[:8] or self._generate_tags(analysis['topics'], analysis['keywords'], analysis['original_tags']),
+            "suggestions": self._generate_suggestions(analysis['content_type'], analysis['tone'], analysis),
+            "generation_method": "ai",
+            "model": self.llm_client.model,
+            "content_type": analysis['content_type'],
+            "tone": analysis['tone']
+        }
+    
+    def _build_prompt(self, original_note: Dict[str, Any], analysis: Dict[str, Any]) -> str:
+        """根据原笔记和分析结果构造提示词"""
+        return PROMPT_TEMPLATE.format(
+            title=original_note.get('title', ''),
+            content=(original_note.get('content') or original_note.get('desc', ''))[:1000],
+            tags='、'.join(analysis.get('original_tags') or []),
+            content_type=analysis.get('content_type', ''),
+            tone=analysis.get('tone', ''),
+            topics='、'.join(analysis.get('topics') or []),
+            keywords='、'.join(analysis.get('keywords') or [])
+        )
+    
+    def _parse_ai_output(self, output: str) -> Dict[str, Any]:
+        """解析大模型输出：优先取其中的JSON对象，否则首行作为标题、其余作为正文"""
+        start, end = output.find('{'), output.rfind('}')
+        if start != -1 and end > start:
+            try:
+                parsed = json.loads(output[start:end + 1])
+                if isinstance(parsed, dict):
+                    return parsed
+            except ValueError:
+                pass
         
-        # 暂时返回模板生成的结果
-        logger.info("AI生成功能暂未配置，使用模板生成")
-        return self._generate_with_templates(original_note, analysis)
+        lines = [line.strip() for line in output.strip().splitlines() if line.strip()]
+        if len(lines) < 2:
+            return {}
+        return {'title': lines[0], 'content': '\n'.join(lines[1:])}
     
     def _get_templates_by_type(self, content_type: str) -> List[Dict[str, Any]]:
         """根据内容类型获取模板"""
@@ -911,40 +1098,44 @@ class NoteContentGenerator:
         debug_info = {}
         
         try:
-            # 读取会话信息
-            session_file = os.path.join(self.debug_dir, f"{session_id}_session.json")
-            if os.path.exists(session_file):
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    debug_info['session'] = json.load(f)
-            
-            # 读取分析结果
-            analysis_file = os.path.join(self.debug_dir, f"{session_id}_analysis.json")
-            if os.path.exists(analysis_file):
-                with open(analysis_file, 'r', encoding='utf-8') as f:
-                    debug_info['analysis'] = json.load(f)
-            
-            # 读取生成结果
-            generated_file = os.path.join(self.debug_dir, f"{session_id}_generated_note.json")
-            if os.path.exists(generated_file):
-                with open(generated_file, 'r', encoding='utf-8') as f:
-                    debug_info['generated_note'] = json.load(f)
-                    
+            records = self.debug_store.get_session(session_id)
+            for step in ('session', 'analysis', 'generated_note'):
+                if step in records:
+                    debug_info[step] = records[step]
+                    continue
+
+                # 兼容改为分段存储之前按步骤单独保存的文件（由 cleanup_old_debug_files 按保留天数删除）
+                legacy_file = os.path.join(self.debug_dir, f"{session_id}_{step}.json")
+                if os.path.exists(legacy_file):
+                    with open(legacy_file, 'r', encoding='utf-8') as f:
+                        debug_info[step] = json.load(f)
+
         except Exception as e:
             logger.error(f"获取debug信息失败: {str(e)}")
         
         return debug_info
     
     def cleanup_old_debug_files(self, days: int = 7):
-        """清理旧的debug文件"""
+        """
+        清理旧的debug信息（按整个分段删除，不再逐个文件检查）
+        改为分段存储之前按步骤保存的旧文件仍按修改时间逐个删除，全部删除后不再扫描目录
+        """
         try:
-            current_time = time.time()
-            cutoff_time = current_time - (days * 24 * 60 * 60)
-            
-            for filename in os.listdir(self.debug_dir):
-                file_path = os.path.join(self.debug_dir, filename)
-                if os.path.getmtime(file_path) < cutoff_time:
-                    os.remove(file_path)
-                    logger.info(f"删除旧debug文件: {filename}")
-                    
+            self.debug_store.apply_retention(days)
+
+            if not self._legacy_debug_cleared:
+                cutoff_time = time.time() - days * 24 * 60 * 60
+                remaining = 0
+                for filename in os.listdir(self.debug_dir):
+                    if not filename.endswith(LEGACY_DEBUG_SUFFIXES):
+                        continue
+                    file_path = os.path.join(self.debug_dir, filename)
+                    if os.path.getmtime(file_path) < cutoff_time:
+                        os.remove(file_path)
+                        logger.info(f"删除旧debug文件: {filename}")
+                    else:
+                        remaining += 1
+                self._legacy_debug_cleared = remaining == 0
+
         except Exception as e:
             logger.error(f"清理debug文件失败: {str(e)}") 
\ No newline at end of file
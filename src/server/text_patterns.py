@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多模式词典匹配
+内容类型、语调、主题、吸引元素检测以及标签过滤原先各自对文本做多次 `keyword in text` 检查和表情正则匹配，
+这里把所有词典编译成一个 Aho-Corasick 自动机，一次扫描得到全部分类命中：
+1. 词典文件 - 分组/分类/关键词定义在 data/text_patterns.json（可用 TEXT_PATTERNS_FILE 环境变量指定其他文件），
+   表情等字符区间以 ranges 给出，展开为单字符模式
+2. 单次扫描 - 扫描耗时只与文本长度有关，不随词典规模增长
+3. 热更新 - 使用时定期检查词典文件的修改时间，变化后重新编译并整体替换自动机
+自动机为纯Python实现：需要的是命中的分类集合，pyahocorasick 逐个产出匹配位置，在笔记这种命中密集的文本上反而更慢
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERNS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'text_patterns.json')
+
+# 检查词典文件是否变化的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 5.0
+
+
+def _expand_range(spec: str) -> List[str]:
+    """把 "1F600-1F64F" 形式的码位区间展开为单字符列表"""
+    start, _, end = spec.partition('-')
+    return [chr(code) for code in range(int(start, 16), int(end or start, 16) + 1)]
+
+
+class _Automaton:
+    """Aho-Corasick 自动机"""
+
+    def __init__(self, patterns: Dict[str, Tuple[int, ...]]):
+        """
+        Args:
+            patterns: 模式串 -> 命中时产出的分类编号
+        """
+        self._goto = [{}]
+        outputs = [()]
+        for pattern, ids in patterns.items():
+            node = 0
+            for ch in pattern:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    outputs.append(())
+                node = next_node
+            outputs[node] = outputs[node] + ids
+
+        # 广度优先计算失配指针（第一层节点指向根），并把失配链上的输出合并到各节点
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                outputs[child] = outputs[child] + outputs[self._fail[child]]
+                queue.append(child)
+        self._outputs = outputs
+
+    def hits(self, text: str) -> set:
+        """扫描文本，返回命中的分类编号集合"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set()
+        node = 0
+        for ch in text:
+            next_node = goto[node].get(ch)
+            while next_node is None and node:
+                node = fail[node]
+                next_node = goto[node].get(ch)
+            # 根节点不会是任何节点的子节点，next_node 为0只表示失配回到根
+            node = next_node or 0
+            if outputs[node]:
+                found.update(outputs[node])
+        return found
+
+
+class _CompiledPatterns:
+    """一次编译的结果：自动机 + 分类编号与 (分组, 分类) 的对应关系"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.categories = []
+        self.groups = {}
+        self.defaults = {}
+        patterns = {}
+
+        for group, spec in (config.get('groups') or {}).items():
+            names = []
+            for category in spec.get('categories') or []:
+                category_id = len(self.categories)
+                self.categories.append((group, category['name']))
+                names.append(category['name'])
+                words = [str(word).lower() for word in category.get('keywords') or [] if word]
+                for spec_range in category.get('ranges') or []:
+                    words.extend(_expand_range(spec_range))
+                for word in words:
+                    patterns[word] = patterns.get(word, ()) + (category_id,)
+            self.groups[group] = names
+            self.defaults[group] = spec.get('default')
+
+        self.pattern_count = len(patterns)
+        self.automaton = _Automaton(patterns)
+
+
+class TextPatternMatcher:
+    """可热更新的多分组词典匹配器"""
+
+    def __init__(self, patterns_file: str = DEFAULT_PATTERNS_FILE, check_interval: float = RELOAD_CHECK_INTERVAL):
+        """
+        初始化匹配器（词典在首次匹配时编译）
+
+        Args:
+            patterns_file: 词典文件路径
+            check_interval: 检查词典文件变化的最小间隔（秒），0表示每次匹配都检查
+        """
+        self.patterns_file = patterns_file
+        self.check_interval = check_interval
+        self._compiled = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> _CompiledPatterns:
+        """返回当前编译结果，词典文件变化时重新编译"""
+        now = time.monotonic()
+        compiled = self._compiled
+        if compiled is not None and now - self._checked_at < self.check_interval:
+            return compiled
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.patterns_file)
+            except OSError:
+                mtime = None
+            if self._compiled is None or mtime != self._mtime:
+                self._load(mtime)
+            return self._compiled
+
+    def _load(self, mtime: Optional[float]):
+        """编译词典文件（调用方需持有锁）；文件有误时保留上一次的编译结果"""
+        try:
+            with open(self.patterns_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            compiled = _CompiledPatterns(config)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"加载词典文件失败 {self.patterns_file}: {str(e)}")
+            if self._compiled is None:
+                self._compiled = _CompiledPatterns({})
+            self._mtime = mtime
+            return
+
+        reloaded = self._compiled is not None
+        self._compiled = compiled
+        self._mtime = mtime
+        logger.info(f"📖 词典已{'重新' if reloaded else ''}加载: {len(compiled.categories)} 个分类, "
+                    f"{compiled.pattern_count} 个模式")
+
+    def reload(self):
+        """立即重新编译词典文件"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.patterns_file)
+            except OSError:
+                mtime = None
+            self._load(mtime)
+            self._checked_at = time.monotonic()
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """
+        一次扫描得到全部分组的命中分类（匹配不区分大小写）
+
+        Returns:
+            分组名 -> 命中的分类名列表（按词典中的先后顺序）
+        """
+        compiled = self._ensure_loaded()
+        hits = compiled.automaton.hits((text or '').lower())
+        result = {group: [] for group in compiled.groups}
+        for category_id in sorted(hits):
+            group, name = compiled.categories[category_id]
+            result[group].append(name)
+        return result
+
+    def first(self, hits: Dict[str, List[str]], group: str) -> Optional[str]:
+        """分组中优先级最高的命中分类，没有命中时返回该分组的默认值"""
+        names = hits.get(group)
+        if names:
+            return names[0]
+        return self._ensure_loaded().defaults.get(group)
+
+    def contains(self, text: str, group: str) -> bool:
+        """文本是否命中指定分组的任一关键词"""
+        return bool(self.match(text).get(group))
+
+    def groups(self) -> Dict[str, List[str]]:
+        """各分组的分类名（按优先级顺序）"""
+        return {group: list(names) for group, names in self._ensure_loaded().groups.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """匹配器状态"""
+        compiled = self._ensure_loaded()
+        return {
+            'patterns_file': self.patterns_file,
+            'categories': len(compiled.categories),
+            'patterns': compiled.pattern_count,
+        }
+
+
+# 全局词典匹配器实例
+text_patterns = TextPatternMatcher(os.environ.get('TEXT_PATTERNS_FILE', DEFAULT_PATTERNS_FILE))
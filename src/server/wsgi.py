@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生产环境WSGI入口
+gunicorn 以 preload 方式在主进程导入本模块后再 fork 出工作进程：
+导入时在主进程完成预热（见 main_server.warm_up），工作进程以写时复制方式共享已加载的数据
+
+用法:
+    gunicorn -c src/server/gunicorn_conf.py src.server.wsgi:app
+"""
+
+from src.server.main_server import app, warm_up
+
+warm_up()
+
+# 部分WSGI服务器默认查找 application
+application = app
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记生成调试信息清理测试
+分段存储之前按步骤保存的旧文件（<会话ID>_<步骤>.json）在超过保留天数后删除，未过期的仍可读取
+"""
+
+import os
+import json
+import time
+
+import pytest
+
+from src.server.debug_store import DebugStore
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.delenv('LLM_BASE_URL', raising=False)
+    from src.server.note_generator import NoteContentGenerator
+    generator = NoteContentGenerator()
+    generator.debug_store.close()
+    generator.debug_dir = str(tmp_path)
+    generator.debug_store = DebugStore(str(tmp_path))
+    yield generator
+    generator.debug_store.close()
+
+
+def _write_legacy(debug_dir, session_id, step, age_days):
+    path = os.path.join(debug_dir, f"{session_id}_{step}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'step': step}, f)
+    mtime = time.time() - age_days * 24 * 60 * 60
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_cleanup_removes_expired_legacy_files(generator, tmp_path):
+    expired = [_write_legacy(str(tmp_path), 'old', step, 10) for step in ('session', 'analysis', 'generated_note')]
+    recent = _write_legacy(str(tmp_path), 'new', 'analysis', 1)
+    unrelated = tmp_path / 'notes.json'
+    unrelated.write_text('{}', encoding='utf-8')
+    os.utime(unrelated, (0, 0))
+
+    generator.debug_store.append('current', 'session', {'keyword': '穿搭'})
+    generator.debug_store.flush(5)
+    generator.cleanup_old_debug_files(days=7)
+
+    assert not any(os.path.exists(path) for path in expired)
+    assert os.path.exists(recent)
+    assert unrelated.exists()
+    assert generator.get_debug_info('new') == {'analysis': {'step': 'analysis'}}
+    assert generator.get_debug_info('current')['session']['keyword'] == '穿搭'
+    assert not generator._legacy_debug_cleared
+
+    os.remove(recent)
+    generator.cleanup_old_debug_files(days=7)
+    assert generator._legacy_debug_cleared
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+任务队列测试
+1. 领取互斥 - 多个工作线程同时领取，每个任务只被领取一次
+2. 心跳恢复 - 工作进程心跳过期后，名下的任务重新排队，超过重试次数后标记失败
+SQLite 和 LocalRedis（进程内的Redis兼容实现）两种后端使用同一组测试
+"""
+
+import time
+import threading
+
+import pytest
+
+from src.crawler.job_broker import (
+    JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE,
+    LocalRedis, RedisJobBroker, SQLiteJobBroker,
+)
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def broker(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteJobBroker(str(tmp_path / 'jobs.db'), poll_interval=0.01)
+    return RedisJobBroker(LocalRedis(), prefix='test')
+
+
+def _claim_all(broker, worker_id, claimed, idle_rounds=3):
+    """持续领取并完成任务，连续几次领取不到时退出"""
+    idle = 0
+    while idle < idle_rounds:
+        job = broker.claim(worker_id, timeout=0.05)
+        if job is None:
+            idle += 1
+            continue
+        idle = 0
+        claimed.append((worker_id, job['id']))
+        broker.complete(job['id'], {'worker': worker_id})
+
+
+def test_claim_is_exclusive(broker):
+    job_ids = [broker.submit('search', {'keyword': f'关键词{i}'}) for i in range(60)]
+
+    claimed = []
+    threads = [threading.Thread(target=_claim_all, args=(broker, f'worker-{n}', claimed)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    claimed_ids = [job_id for _, job_id in claimed]
+    assert sorted(claimed_ids) == sorted(job_ids)
+    for worker_id, job_id in claimed:
+        job = broker.get(job_id)
+        assert job['status'] == JOB_DONE
+        assert job['attempts'] == 1
+        assert job['result'] == {'worker': worker_id}
+
+
+def test_claim_prefers_interactive(broker):
+    background = broker.submit('extract', {}, priority=PRIORITY_BACKGROUND)
+    interactive = broker.submit('search', {}, priority=PRIORITY_INTERACTIVE)
+
+    assert broker.claim('worker', timeout=0.1)['id'] == interactive
+    assert broker.claim('worker', timeout=0.1)['id'] == background
+    assert broker.claim('worker', timeout=0.05) is None
+
+
+def test_recover_requeues_then_fails(broker):
+    job_id = broker.submit('search', {'keyword': '穿搭'})
+
+    broker.heartbeat('dead-worker')
+    job = broker.claim('dead-worker', timeout=0.1)
+    assert job['id'] == job_id and job['attempts'] == 1
+
+    # 心跳未过期时不恢复
+    assert broker.recover(max_age=60, max_attempts=2) == 0
+    assert broker.get(job_id)['status'] == JOB_RUNNING
+
+    time.sleep(0.05)
+    assert broker.recover(max_age=0.01, max_attempts=2) == 1
+    assert broker.get(job_id)['status'] == JOB_QUEUED
+
+    # 重试后工作进程再次退出，达到重试次数上限
+    broker.heartbeat('second-worker')
+    job = broker.claim('second-worker', timeout=0.1)
+    assert job['id'] == job_id and job['attempts'] == 2
+
+    time.sleep(0.05)
+    assert broker.recover(max_age=0.01, max_attempts=2) == 0
+    job = broker.get(job_id)
+    assert job['status'] == JOB_FAILED
+    assert job['error'] == '爬虫工作进程已退出'
+
+
+def test_recover_keeps_jobs_of_live_workers(broker):
+    job_id = broker.submit('search', {})
+    broker.heartbeat('live-worker', {'pid': 1})
+    assert broker.claim('live-worker', timeout=0.1)['id'] == job_id
+
+    assert broker.recover(max_age=60) == 0
+    assert broker.get(job_id)['status'] == JOB_RUNNING
+    assert [worker['id'] for worker in broker.workers(max_age=60)] == ['live-worker']
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大模型客户端测试（使用本地模拟大模型服务，不访问外部服务）
+1. 微批处理 - generate_many 合并为少量批量请求
+2. 结果缓存 - 缓存命中不发请求，并发提交的相同提示词只请求一次
+3. 流式输出 - 拼接后与完整输出一致，结束后写入缓存
+4. 退回模板 - 模型服务出错或输出无法解析时 _generate_with_ai 使用模板生成
+"""
+
+import threading
+
+import pytest
+
+from scripts.fake_llm_server import fake_completion, start_fake_server
+from src.server.llm_client import LLMClient, LLMError, OpenAICompatibleProvider
+
+
+@pytest.fixture
+def fake_server():
+    server, base_url = start_fake_server(latency=0.05, chunk_delay=0)
+    yield server, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def _client(base_url, batch_endpoint=True, **kwargs):
+    provider = OpenAICompatibleProvider(base_url, batch_endpoint=batch_endpoint, max_batch_size=8)
+    return LLMClient(provider, model='fake', max_concurrency=2, max_batch_size=8, batch_wait=0.05, **kwargs)
+
+
+def test_generate_many_batches_prompts(fake_server):
+    server, base_url = fake_server
+    client = _client(base_url)
+    prompts = [f'提示词{i}' for i in range(20)]
+
+    assert client.generate_many(prompts, timeout=30) == [fake_completion(prompt) for prompt in prompts]
+    assert server.stats['prompts'] == 20
+    assert server.stats['chat_requests'] == 0
+    assert 0 < server.stats['batch_requests'] < len(prompts)
+    assert client.stats()['requests'] == server.stats['batch_requests']
+    client.close()
+
+
+def test_cache_hits_and_coalesces_identical_prompts(fake_server):
+    server, base_url = fake_server
+    client = _client(base_url, batch_endpoint=False)
+
+    barrier = threading.Barrier(6)
+    outputs = []
+
+    def generate():
+        barrier.wait()
+        outputs.append(client.generate('同一个提示词', timeout=30))
+
+    threads = [threading.Thread(target=generate) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert outputs == [fake_completion('同一个提示词')] * 6
+    assert server.stats['requests'] == 1
+    assert client.stats()['coalesced'] == 5
+
+    # 已缓存的提示词不再请求；模板版本不同视为不同请求
+    assert client.generate('同一个提示词', timeout=30) == outputs[0]
+    assert server.stats['requests'] == 1
+    assert client.stats()['cache_hits'] == 1
+    client.generate('同一个提示词', template_version='v2', timeout=30)
+    assert server.stats['requests'] == 2
+    client.close()
+
+
+def test_stream_reassembles_and_caches_output(fake_server):
+    server, base_url = fake_server
+    client = _client(base_url)
+
+    chunks = list(client.stream('流式提示词'))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == fake_completion('流式提示词')
+    assert server.stats['stream_requests'] == 1
+
+    assert client.generate('流式提示词', timeout=30) == ''.join(chunks)
+    assert list(client.stream('流式提示词')) == [''.join(chunks)]
+    assert server.stats['requests'] == 1
+    client.close()
+
+
+def test_error_status_fails_futures(fake_server):
+    server, base_url = fake_server
+    server.error_status = 500
+    client = _client(base_url)
+
+    with pytest.raises(LLMError):
+        client.generate('出错的提示词', timeout=30)
+    # 失败的结果不写入缓存，服务恢复后重新请求
+    server.error_status = None
+    assert client.generate('出错的提示词', timeout=30) == fake_completion('出错的提示词')
+    assert server.stats['requests'] == 1
+    client.close()
+
+
+# ==================== 笔记生成 ====================
+
+@pytest.fixture
+def generator(fake_server, monkeypatch):
+    _, base_url = fake_server
+    monkeypatch.setenv('LLM_BASE_URL', base_url)
+    monkeypatch.setenv('LLM_MODEL', 'fake')
+    from src.server.note_generator import NoteContentGenerator
+    generator = NoteContentGenerator()
+    yield generator
+    generator.llm_client.close()
+    generator.debug_store.close()
+
+
+def _generate(generator, title, on_delta=None):
+    note = {'title': title, 'content': '周末去了一家新开的餐厅，分享一下用餐体验和推荐的菜品。', 'tags': ['美食']}
+    return generator._generate_with_ai(note, generator._analyze_original_note(note), on_delta)
+
+
+def test_generate_with_ai_uses_model_output(generator):
+    result = _generate(generator, '餐厅探店分享')
+    assert result['generation_method'] == 'ai'
+    assert result['model'] == 'fake'
+    assert result['title'] and result['content'] and result['tags']
+
+    deltas = []
+    result = _generate(generator, '餐厅探店分享（流式）', on_delta=deltas.append)
+    assert result['generation_method'] == 'ai'
+    assert len(deltas) > 1
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_generate_with_ai_falls_back_on_error_status(generator, fake_server, streaming):
+    server, _ = fake_server
+    server.error_status = 500
+    result = _generate(generator, f'服务出错{streaming}', on_delta=(lambda delta: None) if streaming else None)
+    assert result['generation_method'] == 'template_based'
+    assert result['title'] and result['content']
+
+
+@pytest.mark.parametrize('output', ['好', '', '{"title": "只有标题"}'])
+def test_generate_with_ai_falls_back_on_unparseable_output(generator, fake_server, output):
+    server, _ = fake_server
+    server.output = output
+    result = _generate(generator, f'无法解析的输出{output}')
+    assert result['generation_method'] == 'template_based'
+    assert result['title'] and result['content']
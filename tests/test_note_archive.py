@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记归档测试
+归档会被多个进程同时追加，每个写入方都要看到其他写入方的记录：
+1. 两个实例 - 交替写入同一目录，互相可读，新实例读到全部记录
+2. 多进程 - 多个进程同时写入，记录不丢失、不重复
+"""
+
+import multiprocessing
+
+from src.crawler.note_archive import KIND_DETAIL, KIND_EXTRACTED, NoteArchive
+
+
+def _note(i):
+    return {'title': f'token{i} 穿搭分享', 'desc': f'第{i}篇笔记 marker{i % 7}', 'likes': i}
+
+
+def test_archive_two_writers_round_trip(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    first = NoteArchive(archive_dir, segment_max_bytes=2048)
+    second = NoteArchive(archive_dir, segment_max_bytes=2048)
+
+    for i in range(40):
+        writer = first if i % 2 == 0 else second
+        writer.append(f'note{i}', KIND_DETAIL, _note(i), session_id=f'session{i % 2}')
+    second.append('note0', KIND_EXTRACTED, {'content': '提取结果'})
+    # 覆盖另一个实例写入的记录
+    first.append('note1', KIND_DETAIL, {'title': '更新后的标题'})
+
+    for archive in (first, second):
+        assert archive.count(KIND_DETAIL) == 40
+        assert archive.get('note2') == _note(2)
+        assert archive.get('note3') == _note(3)
+        assert archive.get('note1') == {'title': '更新后的标题'}
+        assert archive.get('note0', KIND_EXTRACTED) == {'content': '提取结果'}
+        assert len(archive.note_ids(session_id='session0')) == 20
+    first.close()
+    second.close()
+
+    reopened = NoteArchive(archive_dir)
+    assert sorted(reopened.note_ids(KIND_DETAIL)) == sorted(f'note{i}' for i in range(40))
+    assert reopened.get('note39') == _note(39)
+    assert reopened.get('note1') == {'title': '更新后的标题'}
+    # 顺序扫描只返回最新版本
+    records = list(reopened.scan(KIND_DETAIL))
+    assert len(records) == 40
+    reopened.close()
+
+
+def _write_notes(archive_dir, worker, count):
+    """子进程：向同一目录的归档写入笔记"""
+    archive = NoteArchive(archive_dir, segment_max_bytes=4096)
+    for i in range(count):
+        note_id = f'w{worker}n{i}'
+        archive.append(note_id, KIND_DETAIL, {'title': note_id})
+    archive.close()
+
+
+def test_archive_multiple_processes(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_write_notes, args=(archive_dir, worker, 30)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    expected = {f'w{worker}n{i}' for worker in range(3) for i in range(30)}
+    archive = NoteArchive(archive_dir)
+    assert set(archive.note_ids(KIND_DETAIL)) == expected
+    assert len(list(archive.scan(KIND_DETAIL, latest_only=False))) == len(expected)
+    assert all(archive.get(note_id) == {'title': note_id} for note_id in expected)
+    archive.close()
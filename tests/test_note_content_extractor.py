@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+笔记内容提取分层测试
+JSON层给出的字段（包括评论数为0、标签为空列表）不再由HTML结构层和正则层补充或覆盖，
+JSON层全部给出时不构建DOM
+"""
+
+import json
+
+from src.server.note_content_extractor import NoteContentExtractor
+
+
+def _html(note, body=''):
+    state = {'note': {'noteDetailMap': {'abc': {'note': note}}}}
+    return (f'<html><head><title>页面标题</title></head><body>'
+            f'<script>window.__INITIAL_STATE__={json.dumps(state, ensure_ascii=False)};</script>{body}</body></html>')
+
+
+NOTE = {
+    'noteId': '0123456789abcdef01234567',
+    'title': '周末探店',
+    'desc': '新开的餐厅',
+    'user': {'userId': 'u1', 'nickname': '作者'},
+    'imageList': [{'url': 'https://sns-img.xhscdn.com/1.jpg'}],
+    'tagList': [],
+    'interactInfo': {'likedCount': '5', 'collectedCount': 0, 'commentCount': '0'},
+}
+
+DOM = '<div class="comment"><span class="total">99</span></div><div class="collect"><span class="count">7</span></div>'
+
+
+def test_zero_counts_and_empty_tags_from_json_are_kept():
+    extractor = NoteContentExtractor()
+    data = extractor.extract_from_html_content(_html(NOTE, DOM))
+
+    assert data['comment_count'] == 0
+    assert data['collect_count'] == 0
+    assert data['like_count'] == 5
+    assert 'tags' not in data
+    assert extractor.stats['tiers']['html']['runs'] == 0
+    assert extractor.stats['tiers']['regex']['runs'] == 0
+
+
+def test_missing_json_fields_are_filled_by_later_tiers():
+    note = {key: value for key, value in NOTE.items() if key not in ('interactInfo', 'tagList')}
+    extractor = NoteContentExtractor()
+    data = extractor.extract_from_html_content(_html(note, DOM))
+
+    assert data['comment_count'] == 99
+    assert data['collect_count'] == 7
+    assert data['title'] == '周末探店'
+    assert extractor.stats['tiers']['html']['runs'] == 1
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地索引测试
+本地索引会被多个进程同时追加，每个写入方都要能检索到其他写入方的笔记：
+1. 两个实例 - 交替写入同一目录，互相可检索，合并为新一代索引后仍可检索
+2. 多进程 - 多个进程同时写入（期间多次合并），笔记不丢失、不重复
+"""
+
+import multiprocessing
+
+from src.crawler.note_search_index import NoteSearchIndex
+
+
+def _note(i):
+    return {'title': f'token{i} 穿搭分享', 'desc': f'第{i}篇笔记 marker{i % 7}', 'likes': i}
+
+
+def _search_ids(index, query, limit=100):
+    return {result['id'] for result in index.search(query, limit=limit)}
+
+
+def test_search_index_two_writers_round_trip(tmp_path):
+    index_dir = str(tmp_path / 'search_index')
+    first = NoteSearchIndex(index_dir, compact_threshold=10 ** 6)
+    second = NoteSearchIndex(index_dir, compact_threshold=10 ** 6)
+
+    for i in range(30):
+        writer = first if i % 2 == 0 else second
+        assert writer.add_note(f'note{i}', _note(i), source='search')
+
+    for index in (first, second):
+        assert index.stats()['notes'] == 30
+        assert _search_ids(index, 'token4') == {'note4'}
+        assert _search_ids(index, 'token5') == {'note5'}
+        assert _search_ids(index, 'marker3') == {f'note{i}' for i in range(30) if i % 7 == 3}
+
+    # 一个实例合并为新一代索引，另一个实例检索和写入都基于新一代
+    first.compact()
+    assert second.add_note('note30', _note(30), source='search')
+    assert first.add_note('note4', {'title': 'token4 renamed'}, source='detail')
+    for index in (first, second):
+        assert index.stats()['generation'] == first.stats()['generation']
+        assert index.stats()['notes'] == 31
+        assert _search_ids(index, 'token30') == {'note30'}
+        assert _search_ids(index, 'renamed') == {'note4'}
+        assert len(_search_ids(index, '穿搭')) == 30
+    first.close()
+    second.close()
+
+    reopened = NoteSearchIndex(index_dir)
+    assert reopened.stats()['notes'] == 31
+    assert _search_ids(reopened, 'token7') == {'note7'}
+    assert reopened.search('renamed')[0]['likes'] == 4
+    reopened.close()
+
+
+def _write_notes(index_dir, worker, count):
+    """子进程：向同一目录的本地索引写入笔记"""
+    index = NoteSearchIndex(index_dir, compact_threshold=25)
+    for i in range(count):
+        note_id = f'w{worker}n{i}'
+        index.add_note(note_id, {'title': f'{note_id} shared'})
+    index.close()
+
+
+def test_search_index_multiple_processes(tmp_path):
+    index_dir = str(tmp_path / 'search_index')
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_write_notes, args=(index_dir, worker, 30)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    expected = {f'w{worker}n{i}' for worker in range(3) for i in range(30)}
+    index = NoteSearchIndex(index_dir)
+    assert index.stats()['notes'] == len(expected)
+    assert _search_ids(index, 'shared', limit=len(expected) + 10) == expected
+    index.close()
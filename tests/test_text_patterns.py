@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+词典匹配测试
+内容类型、语调、主题、互动元素和无意义标签原来是逐条关键词的 if/elif 判断，
+改为词典一次扫描后结果必须保持一致：这里保留原来的判断作为参照，用随机拼接的文本逐一对比
+"""
+
+import re
+import json
+import random
+
+import pytest
+
+from src.server.text_patterns import DEFAULT_PATTERNS_FILE, TextPatternMatcher
+
+# ==================== 原来的判断 ====================
+
+CONTENT_TYPES = [
+    ('教程攻略', ['教程', '攻略', '步骤', '方法', '如何', '怎么']),
+    ('分享推荐', ['分享', '推荐', '种草', '好物', '值得']),
+    ('穿搭时尚', ['穿搭', '搭配', '服装', '衣服', '时尚']),
+    ('美食', ['美食', '吃', '餐厅', '菜谱', '料理']),
+    ('旅行', ['旅行', '旅游', '景点', '打卡', '出行']),
+    ('美妆护肤', ['护肤', '化妆', '美妆', '保养', '护理']),
+    ('生活日常', ['生活', '日常', 'vlog', '记录']),
+]
+
+TONES = [
+    ('活泼兴奋', ['！', '!', '哇', '太好了', '超级', '巨']),
+    ('温柔治愈', ['温柔', '轻松', '舒适', '静谧']),
+    ('专业理性', ['专业', '建议', '推荐', '分析']),
+    ('可爱甜美', ['可爱', '萌', '小仙女', '宝贝']),
+]
+
+TOPICS = {
+    '美食': ['美食', '吃', '餐厅', '菜谱', '料理', '小食', '甜品'],
+    '穿搭': ['穿搭', '服装', '衣服', '搭配', '时尚', '风格'],
+    '护肤': ['护肤', '保养', '肌肤', '面膜', '精华', '乳液'],
+    '化妆': ['化妆', '彩妆', '口红', '眼影', '粉底', '美妆'],
+    '旅行': ['旅行', '旅游', '景点', '打卡', '出行', '度假'],
+    '生活': ['生活', '日常', '家居', '收纳', '整理'],
+    '学习': ['学习', '读书', '知识', '技能', '提升'],
+    '健身': ['健身', '运动', '锻炼', '瑜伽', '减肥'],
+}
+
+EMOJI_PATTERN = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+
+MEANINGLESS_TAGS = ['点赞', '评论', '收藏', '分享', '关注', '更多', '查看', '详情', '全文', '展开',
+                    '赞', '评', '藏', '更多内容', '阅读全文', '笔记', '小红书', '作者', '发布', '时间',
+                    'like', 'comment', 'share', 'follow']
+
+
+def old_content_type(title, content):
+    text = (title + " " + content).lower()
+    for name, words in CONTENT_TYPES:
+        if any(word in text for word in words):
+            return name
+    return "综合分享"
+
+
+def old_tone(title, content):
+    text = (title + " " + content).lower()
+    for name, words in TONES:
+        if any(word in text for word in words):
+            return name
+    return "自然亲和"
+
+
+def old_topics(title, content):
+    text = title + " " + content
+    topics = [topic for topic, keywords in TOPICS.items() if any(keyword in text for keyword in keywords)]
+    return topics[:3]
+
+
+def old_engagement(title, content):
+    text = title + " " + content
+    elements = []
+    if '?' in text or '？' in text:
+        elements.append("互动问句")
+    if any(word in text for word in ['分享', '推荐', '必买', '必看']):
+        elements.append("推荐语气")
+    if any(word in text for word in ['超级', '巨', '特别', '非常']):
+        elements.append("强调词汇")
+    if EMOJI_PATTERN.search(text):
+        elements.append("表情符号")
+    if any(word in text for word in ['攻略', '秘籍', '技巧', '妙招']):
+        elements.append("实用价值")
+    return elements
+
+
+def old_is_meaningless(text):
+    text = text.lower()
+    return any(word in text for word in MEANINGLESS_TAGS)
+
+
+# ==================== 随机文本 ====================
+
+KEYWORDS = sorted({
+    word
+    for rules in (CONTENT_TYPES, TONES, list(TOPICS.items()))
+    for _, words in rules
+    for word in words
+} | set(MEANINGLESS_TAGS) | {'必买', '必看', '特别', '非常', '秘籍', '技巧', '妙招', '?', '？'})
+
+FILLER = ['今天', '周末', '一起', '这个', '真的', 'ok', 'VLOG', 'Like', 'Share', ' ', '，', '。',
+          '😀', '🌸', '🚀', '🇨🇳', '❤', '✨', '123', '记', '录']
+
+
+def random_text(rng, max_parts=8):
+    parts = [rng.choice(KEYWORDS if rng.random() < 0.3 else FILLER) for _ in range(rng.randint(0, max_parts))]
+    return ''.join(parts)
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return TextPatternMatcher(DEFAULT_PATTERNS_FILE, check_interval=3600)
+
+
+def test_patterns_file_groups(matcher):
+    groups = matcher.groups()
+    assert groups['content_type'] == [name for name, _ in CONTENT_TYPES]
+    assert groups['tone'] == [name for name, _ in TONES]
+    assert groups['topic'] == list(TOPICS)
+
+
+def test_matches_old_keyword_checks(matcher):
+    rng = random.Random(20240601)
+    for _ in range(3000):
+        title, content = random_text(rng, 4), random_text(rng)
+        hits = matcher.match(title + " " + content)
+        context = f'title={title!r} content={content!r}'
+
+        assert (matcher.first(hits, 'content_type') or "综合分享") == old_content_type(title, content), context
+        assert (matcher.first(hits, 'tone') or "自然亲和") == old_tone(title, content), context
+        assert hits.get('topic', [])[:3] == old_topics(title, content), context
+        assert list(hits.get('engagement', [])) == old_engagement(title, content), context
+
+        tag = random_text(rng, 3)
+        assert matcher.contains(tag, 'tag_exclude') == old_is_meaningless(tag), f'tag={tag!r}'
+
+
+@pytest.mark.parametrize('title, content, content_type, tone', [
+    ('', '', '综合分享', '自然亲和'),
+    ('我的VLOG', '周末记录', '生活日常', '自然亲和'),
+    ('超级好吃的餐厅', '推荐给大家', '分享推荐', '活泼兴奋'),
+    ('护肤步骤', '温柔的分析', '教程攻略', '温柔治愈'),
+])
+def test_first_match_priority(matcher, title, content, content_type, tone):
+    hits = matcher.match(title + " " + content)
+    assert matcher.first(hits, 'content_type') == content_type
+    assert matcher.first(hits, 'tone') == tone
+
+
+def test_reloads_changed_patterns_file(tmp_path):
+    patterns_file = tmp_path / 'patterns.json'
+    patterns_file.write_text(json.dumps({'groups': {'tone': {
+        'default': '自然亲和', 'categories': [{'name': '活泼', 'keywords': ['哇']}]}}}), encoding='utf-8')
+    matcher = TextPatternMatcher(str(patterns_file), check_interval=0)
+    assert matcher.match('哇哦')['tone'] == ['活泼']
+
+    patterns_file.write_text(json.dumps({'groups': {'tone': {
+        'default': '自然亲和', 'categories': [{'name': '冷静', 'keywords': ['嗯']}]}}}), encoding='utf-8')
+    matcher.reload()
+    assert matcher.match('哇哦')['tone'] == []
+    assert matcher.first(matcher.match('嗯嗯'), 'tone') == '冷静'
+
+    # 词典文件有误时保留上一次的编译结果
+    patterns_file.write_text('{', encoding='utf-8')
+    matcher.reload()
+    assert matcher.first(matcher.match('嗯'), 'tone') == '冷静'